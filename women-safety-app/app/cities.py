@@ -0,0 +1,83 @@
+import json
+import os
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data')
+
+# Optional list of extra cities, same fields as City (see README)
+CITIES_FILE = os.path.join(DATA_DIR, 'cities.json')
+
+DEFAULT_CITY = 'bangalore'
+
+
+class City:
+    """A served city: its bounding box, safety data files and geocoding hint"""
+
+    def __init__(self, slug, name, bounds, data_files, raster_file=None, geocode_suffix=None, artifact_file=None,
+                 road_graph_file=None):
+        self.slug = slug
+        self.name = name
+        self.bounds = dict(bounds)
+        # (crimes, lighting, population) CSVs under DATA_DIR
+        self.data_files = tuple(data_files)
+        self.raster_file = raster_file or f'{slug}_safety_raster.npy'
+        # Binary tables + prebuilt indexes (build_safety_artifact.py), preferred over the CSVs
+        self.artifact_file = artifact_file or f'{slug}_safety_data.npz'
+        # Optional road network for in-process routing (build_road_graph.py)
+        self.road_graph_file = road_graph_file or f'{slug}_road_graph.npz'
+        # Appended to free-text Nominatim queries to keep results inside the city
+        self.geocode_suffix = geocode_suffix or name
+
+    def contains(self, lat, lon):
+        b = self.bounds
+        return b['min_lat'] <= lat <= b['max_lat'] and b['min_lon'] <= lon <= b['max_lon']
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data['slug'], data.get('name', data['slug'].title()), data['bounds'], data['data_files'],
+                   data.get('raster_file'), data.get('geocode_suffix'), data.get('artifact_file'),
+                   data.get('road_graph_file'))
+
+
+BUILTIN_CITIES = (
+    City(
+        'bangalore', 'Bangalore',
+        {'min_lat': 12.704192, 'max_lat': 13.173706, 'min_lon': 77.269876, 'max_lon': 77.850066},
+        ('bangalore_crimes.csv', 'bangalore_lighting.csv', 'bangalore_population.csv'),
+        raster_file='bangalore_safety_raster.npy',
+        geocode_suffix='Bangalore, Karnataka, India',
+    ),
+)
+
+
+def load_cities(path=CITIES_FILE):
+    """Built-in cities plus any defined in ``path``, keyed by slug (file entries override)"""
+    cities = {city.slug: city for city in BUILTIN_CITIES}
+    if os.path.exists(path):
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                for entry in json.load(f):
+                    city = City.from_dict(entry)
+                    cities[city.slug] = city
+        except Exception as e:
+            print(f"⚠️ Warning: Could not load {path}: {e}")
+    return cities
+
+
+CITIES = load_cities()
+
+
+def get_city(slug=None):
+    """City by slug (the default city for None); None if unknown"""
+    return CITIES.get((slug or DEFAULT_CITY).strip().lower())
+
+
+def city_for_point(lat, lon):
+    """First registered city whose bounds contain the point, or None"""
+    try:
+        lat, lon = float(lat), float(lon)
+    except (TypeError, ValueError):
+        return None
+    for city in CITIES.values():
+        if city.contains(lat, lon):
+            return city
+    return None
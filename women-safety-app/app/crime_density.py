@@ -0,0 +1,121 @@
+import numpy as np
+
+from app.route_optimizer import CRIME_RADIUS, TIME_BUCKET_NAMES, crime_time_weight_columns
+
+# Relative harm of each `Crime type`; unknown types count as DEFAULT_SEVERITY
+CRIME_SEVERITY = {
+    'pickpocketing': 0.6,
+    'theft': 0.8,
+    'snatching': 1.2,
+    'harassment': 1.3,
+    'robbery': 1.6,
+    'assault': 1.8,
+}
+DEFAULT_SEVERITY = 1.0
+
+# ~110 m cells; values are bilinearly interpolated between cell centres
+DEFAULT_RESOLUTION = 0.001
+
+# A Gaussian with peak 1 and this sigma has the same volume as the old
+# 2*CRIME_RADIUS square window, so one crime contributes as much exposure in
+# total as before and the count-based penalty thresholds keep their meaning.
+DEFAULT_BANDWIDTH = 2 * CRIME_RADIUS / np.sqrt(2 * np.pi)
+
+
+def crime_severity(crime_type):
+    """Severity weight of one `Crime type` value (case-insensitive lookup in CRIME_SEVERITY)"""
+    if crime_type is None:
+        return DEFAULT_SEVERITY
+    return CRIME_SEVERITY.get(str(crime_type).strip().lower(), DEFAULT_SEVERITY)
+
+
+class CrimeDensitySurface:
+    """Severity-weighted kernel density of crimes over a bounding box.
+
+    ``grid`` has shape ``(len(layers), n_rows, n_cols)``; layer ``crime`` is the
+    time-blind surface and ``crime_<bucket>`` additionally weights every crime by
+    its time-of-day distance to the bucket (see crime_time_weight_columns).
+    The surface is built once with an FFT convolution and sampled per point by
+    bilinear interpolation, so there is no hard edge at the window boundary.
+    """
+
+    def __init__(self, grid, bounds, resolution, layers):
+        self.grid = grid
+        self.bounds = dict(bounds)
+        self.resolution = float(resolution)
+        self.layers = tuple(layers)
+        self.n_rows, self.n_cols = grid.shape[1], grid.shape[2]
+        self._layer_pos = {name: i for i, name in enumerate(self.layers)}
+
+    @classmethod
+    def build(cls, lats, lons, layer_weights, bounds, resolution=DEFAULT_RESOLUTION, bandwidth=DEFAULT_BANDWIDTH):
+        """Bin weighted points on the grid and convolve each layer with a Gaussian kernel.
+
+        ``layer_weights`` maps layer name to a per-point weight array.
+        """
+        lats = np.asarray(lats, dtype=np.float64)
+        lons = np.asarray(lons, dtype=np.float64)
+        n_rows = int(np.ceil((bounds['max_lat'] - bounds['min_lat']) / resolution))
+        n_cols = int(np.ceil((bounds['max_lon'] - bounds['min_lon']) / resolution))
+
+        rows = np.floor((lats - bounds['min_lat']) / resolution).astype(np.int64)
+        cols = np.floor((lons - bounds['min_lon']) / resolution).astype(np.int64)
+        inside = (rows >= 0) & (rows < n_rows) & (cols >= 0) & (cols < n_cols)
+        cell_ids = rows[inside] * n_cols + cols[inside]
+
+        # Kernel truncated at 4 sigma; zero padding keeps the FFT convolution linear
+        k = int(np.ceil(4 * bandwidth / resolution))
+        offsets = np.arange(-k, k + 1) * resolution
+        kernel_1d = np.exp(-offsets ** 2 / (2 * bandwidth ** 2))
+        shape = (n_rows + 2 * k, n_cols + 2 * k)
+        kernel_fft = np.fft.rfft2(np.outer(kernel_1d, kernel_1d), s=shape)
+
+        layers = tuple(layer_weights)
+        grid = np.empty((len(layers), n_rows, n_cols), dtype=np.float32)
+        for i, name in enumerate(layers):
+            weights = np.asarray(layer_weights[name], dtype=np.float64)[inside]
+            counts = np.bincount(cell_ids, weights=weights, minlength=n_rows * n_cols).reshape(n_rows, n_cols)
+            smoothed = np.fft.irfft2(np.fft.rfft2(counts, s=shape) * kernel_fft, s=shape)
+            grid[i] = np.maximum(smoothed[k:k + n_rows, k:k + n_cols], 0)
+
+        return cls(grid, bounds, resolution, layers)
+
+    def has_layer(self, name):
+        return name in self._layer_pos
+
+    def contains(self, lats, lons):
+        b = self.bounds
+        return ((lats >= b['min_lat']) & (lats < b['max_lat']) &
+                (lons >= b['min_lon']) & (lons < b['max_lon']))
+
+    def sample(self, lats, lons, layer='crime'):
+        """Bilinear interpolation of ``layer`` at each point (clamped at the edges)"""
+        values = self.grid[self._layer_pos[layer]]
+        y = np.clip((np.asarray(lats) - self.bounds['min_lat']) / self.resolution - 0.5, 0, self.n_rows - 1)
+        x = np.clip((np.asarray(lons) - self.bounds['min_lon']) / self.resolution - 0.5, 0, self.n_cols - 1)
+        r0 = np.minimum(np.floor(y).astype(np.int64), max(self.n_rows - 2, 0))
+        c0 = np.minimum(np.floor(x).astype(np.int64), max(self.n_cols - 2, 0))
+        r1 = np.minimum(r0 + 1, self.n_rows - 1)
+        c1 = np.minimum(c0 + 1, self.n_cols - 1)
+        fy, fx = y - r0, x - c0
+        return ((values[r0, c0] * (1 - fx) + values[r0, c1] * fx) * (1 - fy) +
+                (values[r1, c0] * (1 - fx) + values[r1, c1] * fx) * fy).astype(np.float64)
+
+
+def build_crime_surface(crime_data, bounds, resolution=DEFAULT_RESOLUTION, bandwidth=DEFAULT_BANDWIDTH):
+    """CrimeDensitySurface from the crimes SafetyTable (None when there is no crime data)"""
+    if crime_data is None or len(crime_data) == 0:
+        return None
+    if crime_data.has_column('Crime type'):
+        severity = crime_data.map_categories('Crime type', crime_severity)
+    else:
+        severity = np.full(len(crime_data), DEFAULT_SEVERITY)
+    layer_weights = {'crime': severity}
+    if crime_data.has_column('time'):
+        time_weights = crime_time_weight_columns(crime_data.strings('time'))
+        for bucket in TIME_BUCKET_NAMES:
+            layer_weights[f'crime_{bucket}'] = severity * time_weights[f'w_{bucket}']
+    return CrimeDensitySurface.build(
+        crime_data.values('Latitude'), crime_data.values('Longitude'), layer_weights,
+        bounds, resolution, bandwidth
+    )
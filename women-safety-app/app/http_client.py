@@ -0,0 +1,86 @@
+"""Shared outbound HTTP sessions (OSRM, Nominatim, Gemini, Fast2SMS).
+
+Each service gets one requests.Session per process with its own keep-alive
+connection pool, default timeout and retry policy, so repeated calls to the
+same host reuse a TCP/TLS connection instead of handshaking every time. Use
+http_get()/http_post() with a service name instead of bare requests.get/post.
+"""
+
+import os
+import threading
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+HTTP_USER_AGENT = 'SafeSpace-WomenSafety/1.0'
+
+
+class ServicePolicy:
+    """Connection pool size, timeouts and retries for one outbound service"""
+
+    def __init__(self, pool_size, connect_timeout, read_timeout, retries=0, backoff=0.3,
+                 retry_methods=('GET',), retry_statuses=(502, 503, 504), headers=None):
+        self.pool_size = int(pool_size)
+        self.timeout = (connect_timeout, read_timeout)
+        self.retries = int(retries)
+        self.backoff = backoff
+        self.retry_methods = frozenset(retry_methods)
+        self.retry_statuses = tuple(retry_statuses)
+        self.headers = dict(headers or {})
+
+    def retry(self):
+        return Retry(total=self.retries, connect=self.retries, read=self.retries, status=self.retries,
+                     backoff_factor=self.backoff, allowed_methods=self.retry_methods,
+                     status_forcelist=self.retry_statuses, raise_on_status=False)
+
+
+SERVICE_POLICIES = {
+    # Sized for the optimize-route fan-out (OSRM_MAX_CONCURRENCY parallel requests)
+    'osrm': ServicePolicy(int(os.environ.get('OSRM_MAX_CONCURRENCY', 8)), 3.05, 10, retries=1),
+    # Fan-out calls race a per-request deadline: a retry would double their time and hold a pool worker
+    'osrm_fanout': ServicePolicy(int(os.environ.get('OSRM_MAX_CONCURRENCY', 8)), 3.05, 10),
+    # Nominatim's usage policy requires an identifying User-Agent
+    'nominatim': ServicePolicy(4, 3.05, 10, retries=1, headers={'User-Agent': HTTP_USER_AGENT}),
+    # POSTs are not retried here: the chat endpoint has its own backoff loop
+    'gemini': ServicePolicy(4, 5, 30),
+    # Never retried: a retry after a lost response could text a contact twice
+    'fast2sms': ServicePolicy(2, 5, 10),
+}
+
+_sessions = {}
+_sessions_pid = None
+_sessions_lock = threading.Lock()
+
+
+def get_session(service):
+    """The pooled Session of ``service`` (one per process; pools must not cross a fork)"""
+    global _sessions_pid
+    with _sessions_lock:
+        if _sessions_pid != os.getpid():
+            _sessions.clear()
+            _sessions_pid = os.getpid()
+        session = _sessions.get(service)
+        if session is None:
+            policy = SERVICE_POLICIES[service]
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=policy.pool_size, max_retries=policy.retry())
+            session.mount('http://', adapter)
+            session.mount('https://', adapter)
+            session.headers.update(policy.headers)
+            _sessions[service] = session
+        return session
+
+
+def http_request(service, method, url, **kwargs):
+    """``requests.request`` through the service's pooled session, with its default timeout"""
+    kwargs.setdefault('timeout', SERVICE_POLICIES[service].timeout)
+    return get_session(service).request(method, url, **kwargs)
+
+
+def http_get(service, url, **kwargs):
+    return http_request(service, 'GET', url, **kwargs)
+
+
+def http_post(service, url, **kwargs):
+    return http_request(service, 'POST', url, **kwargs)
@@ -0,0 +1,123 @@
+import json
+import os
+import threading
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows: only threads of one process are serialised
+    fcntl = None
+
+
+class LiveIncidentStore:
+    """Append-only JSON Lines file of runtime-reported incidents, shared by every worker.
+
+    Writers append whole lines under a process lock plus an advisory file lock
+    (``<path>.lock``), so concurrent ingests never lose each other's records.
+    Once the file holds more than twice ``max_entries`` lines it is compacted to
+    the newest ``max_entries`` through a temp file and ``os.replace``; readers
+    notice the new inode and start over. A torn last line (crash mid-append) is
+    skipped rather than discarding the file.
+    """
+
+    def __init__(self, path, max_entries=10000, legacy_path=None):
+        self.path = path
+        self.max_entries = int(max_entries)
+        self.legacy_path = legacy_path
+        self._lock = threading.Lock()
+        # Lines are only recounted once the file (appended to by every worker) passes this size
+        self._recount_size = 0
+
+    @contextmanager
+    def _locked(self):
+        with self._lock:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            with open(self.path + '.lock', 'a') as lock_file:
+                if fcntl:
+                    fcntl.flock(lock_file, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    if fcntl:
+                        fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _rewrite(self, records):
+        tmp_path = f'{self.path}.{os.getpid()}.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            for record in records:
+                f.write(json.dumps(record) + '\n')
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+
+    def migrate_legacy(self):
+        """Convert the old single-JSON-array file into the JSONL store (once)"""
+        if not self.legacy_path or not os.path.exists(self.legacy_path):
+            return 0
+        with self._locked():
+            if not os.path.exists(self.legacy_path):
+                return 0
+            with open(self.legacy_path, 'r', encoding='utf-8') as f:
+                records = json.load(f)
+            existing = self._read_all() if os.path.exists(self.path) else []
+            self._rewrite((existing + records)[-self.max_entries:])
+            os.remove(self.legacy_path)
+            return len(records)
+
+    def append(self, records):
+        """Durably add ``records`` (dicts); compacts the file when it has grown too long"""
+        if not records:
+            return
+        payload = ''.join(json.dumps(record) + '\n' for record in records)
+        with self._locked():
+            with open(self.path, 'a+b') as f:
+                # Terminate a line torn by a crash so it can't swallow the first new record
+                if f.tell() > 0:
+                    f.seek(-1, os.SEEK_END)
+                    if f.read(1) != b'\n':
+                        payload = '\n' + payload
+                f.write(payload.encode('utf-8'))
+                f.flush()
+                os.fsync(f.fileno())
+                size = f.tell()
+            if self.max_entries > 0 and size >= self._recount_size:
+                # The records are already durable, so a failed compaction must not fail the append
+                try:
+                    records = self._read_all()
+                    if len(records) > 2 * self.max_entries:
+                        self._rewrite(records[-self.max_entries:])
+                        size = os.path.getsize(self.path)
+                    self._recount_size = size * 3 // 2 + 1
+                except Exception as e:
+                    print(f"⚠️ Warning: Could not compact live incidents: {e}")
+
+    def _read_all(self):
+        return self.read_from(None, 0)[0]
+
+    def read_from(self, inode, offset):
+        """``(records, inode, offset, restarted)`` for the complete lines added since a previous read.
+
+        Pass ``(None, 0)`` for everything. When the file has been replaced
+        (compaction), truncated or removed since the read that returned
+        ``inode``/``offset``, ``restarted`` is True and ``records`` is the whole
+        file again, so callers must drop what they loaded before.
+        """
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return [], None, 0, inode is not None
+        restarted = False
+        if stat.st_ino != inode or stat.st_size < offset:
+            restarted = inode is not None
+            offset = 0
+        with open(self.path, 'rb') as f:
+            f.seek(offset)
+            data = f.read()
+        end = data.rfind(b'\n') + 1  # a line still being written is left for the next read
+        records = []
+        for line in data[:end].splitlines():
+            try:
+                records.append(json.loads(line))
+            except ValueError:
+                continue
+        return records, stat.st_ino, offset + end, restarted
@@ -0,0 +1,236 @@
+"""OSRM route fetching for Safe Routes, including the concurrent waypoint fan-out.
+
+optimize-route asks OSRM for the direct route plus up to 18 waypoint detours.
+RouteFanout issues them in parallel on one process-wide thread pool, whose
+size (OSRM_MAX_CONCURRENCY) caps the requests in flight across all users, and
+stops waiting at a per-request deadline (OSRM_FANOUT_DEADLINE). The local road
+graph searches run on the same pool (submit_to_pool), concurrently with them.
+
+Successful responses are kept in a SQLite cache shared by all workers (see
+app/osrm_cache.py), so popular origin/destination pairs skip OSRM entirely.
+"""
+
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from concurrent.futures import TimeoutError as FuturesTimeoutError
+
+from app.cities import DATA_DIR
+from app.http_client import SERVICE_POLICIES, http_get
+from app.osrm_cache import OsrmResponseCache
+from app.safety_engine import validate_coordinates, haversine_distance
+
+OSRM_URL = os.environ.get('OSRM_URL', 'http://router.project-osrm.org').rstrip('/')
+OSRM_TIMEOUT = 10
+
+# Process-wide cap on concurrent OSRM requests, and how long one optimize-route
+# request waits for its fan-out before scoring whatever has arrived
+OSRM_MAX_CONCURRENCY = int(os.environ.get('OSRM_MAX_CONCURRENCY', 8))
+OSRM_FANOUT_DEADLINE = float(os.environ.get('OSRM_FANOUT_DEADLINE', 12))
+
+# Raw OSRM responses keyed by snapped start/waypoint/end (OSRM_CACHE_TTL=0 disables)
+osrm_response_cache = OsrmResponseCache(
+    os.environ.get('OSRM_CACHE_PATH', os.path.join(DATA_DIR, 'osrm_cache.sqlite3')),
+    ttl=float(os.environ.get('OSRM_CACHE_TTL', 7 * 24 * 3600)),
+    max_entries=int(os.environ.get('OSRM_CACHE_MAX_ENTRIES', 5000)),
+    grid=float(os.environ.get('OSRM_CACHE_GRID', 0.0005)),
+)
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor():
+    # Created on first use, so each forked worker gets its own threads
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=max(OSRM_MAX_CONCURRENCY, 1), thread_name_prefix='osrm')
+        return _executor
+
+
+def submit_to_pool(fn, *args, **kwargs):
+    """Run ``fn`` on the fan-out thread pool (e.g. local road graph searches alongside the OSRM calls)"""
+    return _get_executor().submit(fn, *args, **kwargs)
+
+
+def get_route_from_osrm(start_lat, start_lon, end_lat, end_lon, waypoint=None, timeout=OSRM_TIMEOUT, service='osrm'):
+    """OSRM driving routes (with alternatives) as candidate dicts, or None on failure.
+
+    ``service`` is the app/http_client.py policy to send the request with.
+    """
+    try:
+        if not all(validate_coordinates(x, y) for x, y in [(start_lat, start_lon), (end_lat, end_lon)]):
+            return None
+        
+        if waypoint:
+            url = f"{OSRM_URL}/route/v1/driving/{start_lon},{start_lat};{waypoint['lon']},{waypoint['lat']};{end_lon},{end_lat}"
+        else:
+            url = f"{OSRM_URL}/route/v1/driving/{start_lon},{start_lat};{end_lon},{end_lat}"
+        
+        params = {
+            'overview': 'full',
+            'geometries': 'geojson',
+            'alternatives': 'true',
+            'steps': 'true'
+        }
+        
+        cache_key = osrm_response_cache.make_key(
+            OSRM_URL, (start_lat, start_lon), (end_lat, end_lon),
+            (waypoint['lat'], waypoint['lon']) if waypoint else None
+        )
+        data = osrm_response_cache.get(cache_key)
+        if data is None:
+            response = http_get(service, url, params=params, timeout=timeout)
+            data = response.json()
+            
+            if data['code'] != 'Ok':
+                return None
+            osrm_response_cache.put(cache_key, data)
+        
+        routes = []
+        for route_data in data.get('routes', []):
+            if 'geometry' not in route_data:
+                continue
+            
+            coordinates = route_data['geometry']['coordinates']
+            if not coordinates or len(coordinates) < 2:
+                continue
+            
+            route = [[coord[1], coord[0]] for coord in coordinates]
+            
+            start_dist = haversine_distance(start_lat, start_lon, route[0][0], route[0][1])
+            end_dist = haversine_distance(end_lat, end_lon, route[-1][0], route[-1][1])
+            
+            if start_dist > 0.2 or end_dist > 0.2:
+                continue
+            
+            # Extract turn-by-turn instructions from OSRM
+            steps = []
+            if 'legs' in route_data:
+                step_number = 1
+                for leg in route_data['legs']:
+                    if 'steps' in leg:
+                        for step in leg['steps']:
+                            if 'maneuver' in step:
+                                instruction = step['maneuver'].get('instruction', step.get('name', 'Continue'))
+                                distance = step.get('distance', 0)
+                                steps.append({
+                                    'number': step_number,
+                                    'instruction': instruction,
+                                    'distance': round(distance, 1),
+                                    'distance_text': f"{distance:.0f}m" if distance < 1000 else f"{distance/1000:.1f}km"
+                                })
+                                step_number += 1
+            
+            routes.append({
+                'route': route,
+                'distance_km': route_data['distance'] / 1000,
+                'duration_min': route_data['duration'] / 60,
+                'waypoint': waypoint,
+                'steps': steps
+            })
+        
+        return routes
+        
+    except Exception as e:
+        print(f"❌ OSRM error: {e}")
+        return None
+
+
+class DeadlineExceeded(Exception):
+    """A fan-out request that was cut off (or never sent) because its deadline passed"""
+
+
+def _fetch_before(deadline_at, start_lat, start_lon, end_lat, end_lon, waypoint):
+    remaining = deadline_at - time.monotonic()
+    if remaining <= 0:
+        raise DeadlineExceeded()  # sat in the queue past the deadline; don't spend a request on it
+    # Single attempt, and neither connecting nor any read may outlast the deadline
+    routes = get_route_from_osrm(start_lat, start_lon, end_lat, end_lon, waypoint=waypoint,
+                                 timeout=(min(SERVICE_POLICIES['osrm_fanout'].timeout[0], remaining),
+                                          min(OSRM_TIMEOUT, remaining)),
+                                 service='osrm_fanout')
+    if routes is None and time.monotonic() >= deadline_at:
+        # Failing only once the deadline passed means the deadline-capped timeout
+        # fired: the request was skipped for time, not refused by OSRM
+        raise DeadlineExceeded()
+    return routes
+
+
+class RouteFanout:
+    """get_route_from_osrm for every entry of ``waypoints`` (None = direct route) in parallel.
+
+    The requests are submitted on construction, in ``waypoints`` order, so with
+    more waypoints than workers the first entries (put the direct route first)
+    are fetched first. Iterating yields ``(index, routes)`` as responses arrive
+    (routes is None when a request failed) until all are done or the deadline
+    passes; afterwards ``results`` is aligned with ``waypoints`` and ``skipped``
+    lists the indices that ran out of time: those still unfinished at the
+    deadline (cancelled) and those whose request the deadline cut off.
+    """
+
+    def __init__(self, start_lat, start_lon, end_lat, end_lon, waypoints, deadline=OSRM_FANOUT_DEADLINE):
+        self.deadline = deadline
+        self.deadline_at = time.monotonic() + deadline
+        executor = _get_executor()
+        self.futures = {
+            executor.submit(_fetch_before, self.deadline_at, start_lat, start_lon, end_lat, end_lon, waypoint): i
+            for i, waypoint in enumerate(waypoints)
+        }
+        self.results = [None] * len(waypoints)
+        self.skipped = []
+
+    def _collect(self, future):
+        # Store a finished request's routes; False when it ran out of time
+        index = self.futures[future]
+        try:
+            self.results[index] = future.result()
+        except DeadlineExceeded:
+            return False
+        except Exception as e:
+            print(f"❌ OSRM error: {e}")
+        return True
+
+    def __iter__(self):
+        expired = []
+        collected = set()
+        try:
+            for future in as_completed(self.futures, timeout=max(self.deadline_at - time.monotonic(), 0)):
+                collected.add(future)
+                if not self._collect(future):
+                    expired.append(future)
+                index = self.futures[future]
+                yield index, self.results[index]
+        except FuturesTimeoutError:
+            pass
+        finally:
+            # Also reached when a streaming client disconnects mid-iteration
+            for future in self.futures:
+                if future in collected:
+                    continue
+                if not future.done():
+                    future.cancel()
+                    expired.append(future)
+                elif not self._collect(future):
+                    expired.append(future)
+            self.skipped = sorted(self.futures[future] for future in expired)
+            if expired:
+                print(f"⏱️ OSRM deadline ({self.deadline:.1f}s) reached: "
+                      f"skipped {len(expired)} of {len(self.futures)} requests")
+
+
+def fetch_routes_concurrently(start_lat, start_lon, end_lat, end_lon, waypoints, deadline=OSRM_FANOUT_DEADLINE):
+    """Wait for a RouteFanout to finish; returns ``(results, skipped)``.
+
+    ``results`` is aligned with ``waypoints`` and holds each route list (None
+    when the request failed or missed the deadline), ``skipped`` lists the
+    indices that missed the deadline. Callers merge the results in
+    ``waypoints`` order so the outcome does not depend on which response
+    arrived first.
+    """
+    fanout = RouteFanout(start_lat, start_lon, end_lat, end_lon, waypoints, deadline)
+    for _ in fanout:
+        pass
+    return fanout.results, fanout.skipped
@@ -0,0 +1,139 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+
+# Run the TTL / size pruning once every this many writes per process
+PRUNE_EVERY = 100
+
+
+def snap_coordinate(value, grid):
+    """Grid cell index of one coordinate, so nearby requests share a key"""
+    return int(round(float(value) / grid))
+
+
+class OsrmResponseCache:
+    """Persistent OSRM response cache in SQLite, shared by every worker on the host.
+
+    Keys are the start, optional waypoint and end snapped to ``grid`` degrees,
+    so requests for the same popular origin/destination pair reuse one OSRM
+    response. Values are the raw JSON responses (zlib-compressed); callers still
+    validate the geometry against their exact endpoints. Entries expire after
+    ``ttl`` seconds and the oldest are dropped beyond ``max_entries``.
+
+    Every failure (locked or unwritable database, corrupt row) is logged and
+    treated as a miss, so the cache can never break routing.
+    """
+
+    def __init__(self, path, ttl=7 * 24 * 3600, max_entries=5000, grid=0.0005):
+        self.path = path
+        self.ttl = float(ttl)
+        self.max_entries = int(max_entries)
+        self.grid = float(grid)
+        self.hits = 0
+        self.misses = 0
+        self._writes = 0
+        self._local = threading.local()
+        self._stats_lock = threading.Lock()
+
+    @property
+    def enabled(self):
+        return bool(self.path) and self.ttl > 0 and self.max_entries > 0
+
+    def _connection(self):
+        # One connection per thread and process (sqlite3 connections must not cross a fork)
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None and self._local.pid == os.getpid():
+            return conn
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        conn = sqlite3.connect(self.path, timeout=5, check_same_thread=False)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        conn.execute(
+            'CREATE TABLE IF NOT EXISTS osrm_responses ('
+            'key TEXT PRIMARY KEY, created_at REAL NOT NULL, body BLOB NOT NULL)'
+        )
+        conn.execute('CREATE INDEX IF NOT EXISTS idx_osrm_responses_created ON osrm_responses (created_at)')
+        conn.commit()
+        self._local.conn, self._local.pid = conn, os.getpid()
+        return conn
+
+    def make_key(self, base_url, start, end, waypoint=None):
+        """Key for one OSRM query; ``start``/``end``/``waypoint`` are (lat, lon) pairs"""
+        points = [start] + ([waypoint] if waypoint else []) + [end]
+        cells = ';'.join(f'{snap_coordinate(lat, self.grid)},{snap_coordinate(lon, self.grid)}' for lat, lon in points)
+        return f'{base_url}|{self.grid:g}|{cells}'
+
+    def get(self, key):
+        """Cached response for ``key`` or None"""
+        if not self.enabled:
+            return None
+        try:
+            row = self._connection().execute(
+                'SELECT body FROM osrm_responses WHERE key = ? AND created_at >= ?',
+                (key, time.time() - self.ttl)
+            ).fetchone()
+            value = json.loads(zlib.decompress(row[0])) if row else None
+        except Exception as e:
+            print(f"⚠️ OSRM cache read failed: {e}")
+            value = None
+        with self._stats_lock:
+            if value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return value
+
+    def put(self, key, value):
+        if not self.enabled or value is None:
+            return
+        try:
+            conn = self._connection()
+            body = zlib.compress(json.dumps(value, separators=(',', ':')).encode('utf-8'))
+            conn.execute('INSERT OR REPLACE INTO osrm_responses (key, created_at, body) VALUES (?, ?, ?)',
+                         (key, time.time(), body))
+            conn.commit()
+            self._writes += 1
+            if self._writes % PRUNE_EVERY == 0:
+                self.prune()
+        except Exception as e:
+            print(f"⚠️ OSRM cache write failed: {e}")
+
+    def prune(self):
+        """Drop expired entries, then the oldest ones beyond ``max_entries``"""
+        conn = self._connection()
+        conn.execute('DELETE FROM osrm_responses WHERE created_at < ?', (time.time() - self.ttl,))
+        conn.execute(
+            'DELETE FROM osrm_responses WHERE key IN ('
+            'SELECT key FROM osrm_responses ORDER BY created_at DESC LIMIT -1 OFFSET ?)',
+            (self.max_entries,)
+        )
+        conn.commit()
+
+    def clear(self):
+        if not self.enabled:
+            return
+        conn = self._connection()
+        conn.execute('DELETE FROM osrm_responses')
+        conn.commit()
+
+    def stats(self):
+        size = None
+        if self.enabled:
+            try:
+                size = self._connection().execute('SELECT COUNT(*) FROM osrm_responses').fetchone()[0]
+            except Exception:
+                pass
+        with self._stats_lock:
+            lookups = self.hits + self.misses
+            return {
+                'enabled': self.enabled,
+                'size': size,
+                'max_size': self.max_entries,
+                'ttl_seconds': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0,
+            }
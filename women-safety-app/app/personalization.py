@@ -0,0 +1,160 @@
+"""Per-user route personalization for optimize-route.
+
+A user's saved route preferences and liked-route history are loaded into a
+UserProfile once (three small queries) and kept in a per-process LRU cache.
+/api/user-feedback invalidates the entry when it writes, and entries also
+expire after PERSONALIZATION_CACHE_TTL seconds so that feedback saved through
+another worker is picked up. Ranking bonuses are then computed in memory for
+all candidate routes at once.
+"""
+
+import os
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+from app.models import RouteFeedback, UserPreference
+
+PERSONALIZATION_CACHE_SIZE = int(os.environ.get('PERSONALIZATION_CACHE_SIZE', 1024))
+PERSONALIZATION_CACHE_TTL = float(os.environ.get('PERSONALIZATION_CACHE_TTL', 300))
+
+# Feedback rated at least this counts as liked; route hashes come from the latest FEEDBACK_HISTORY rows
+LIKED_RATING = 4
+FEEDBACK_HISTORY = 100
+
+# Composite score bonus for a previously liked route, and for any route of a
+# trip whose start and end are within NEARBY_TRIP_DEGREES of a liked one
+LIKED_ROUTE_BONUS = 0.15
+NEARBY_TRIP_BONUS = 0.1
+NEARBY_TRIP_DEGREES = 0.01
+
+
+class UserProfile:
+    """Saved preferences (or None), liked route hashes and liked trips' [start_lat, start_lon, end_lat, end_lon]"""
+
+    def __init__(self, preferences=None, liked_hashes=(), liked_trips=None):
+        self.preferences = preferences
+        self.liked_hashes = frozenset(liked_hashes)
+        self.liked_trips = liked_trips if liked_trips is not None else np.empty((0, 4))
+
+    def apply_preferences(self, preferences):
+        """Override the request's ranking preferences with the saved ones (in place)"""
+        if self.preferences is None:
+            return
+        preferences['safety_weight'] = float(self.preferences['safety_weight'] or preferences['safety_weight'])
+        preferences['distance_weight'] = float(self.preferences['distance_weight'] or preferences['distance_weight'])
+        preferences['prefer_main_roads'] = bool(self.preferences['prefer_main_roads'])
+        preferences['prefer_well_lit'] = bool(self.preferences['prefer_well_lit'])
+        preferences['prefer_populated'] = bool(self.preferences['prefer_populated'])
+
+    def liked_nearby_trip(self, start_lat, start_lon, end_lat, end_lon):
+        if len(self.liked_trips) == 0:
+            return False
+        offsets = np.abs(self.liked_trips - np.array([start_lat, start_lon, end_lat, end_lon], dtype=np.float64))
+        return bool((offsets < NEARBY_TRIP_DEGREES).all(axis=1).any())
+
+    def route_bonuses(self, routes, start_lat, start_lon, end_lat, end_lon):
+        """Composite score bonus of every route, aligned with ``routes``"""
+        trip_bonus = NEARBY_TRIP_BONUS if self.liked_nearby_trip(start_lat, start_lon, end_lat, end_lon) else 0.0
+        return [trip_bonus + (LIKED_ROUTE_BONUS if route.get('route_hash') in self.liked_hashes else 0.0)
+                for route in routes]
+
+
+ANONYMOUS_PROFILE = UserProfile()
+
+
+def load_user_profile(user_id):
+    """Build a UserProfile from the database"""
+    prefs = UserPreference.query.filter_by(user_id=user_id).first()
+    preferences = None
+    if prefs:
+        preferences = {
+            'safety_weight': prefs.safety_weight,
+            'distance_weight': prefs.distance_weight,
+            'prefer_main_roads': prefs.prefer_main_roads,
+            'prefer_well_lit': prefs.prefer_well_lit,
+            'prefer_populated': prefs.prefer_populated,
+        }
+    rows = (RouteFeedback.query.with_entities(RouteFeedback.route_hash, RouteFeedback.rating)
+            .filter_by(user_id=user_id).order_by(RouteFeedback.created_at.desc()).limit(FEEDBACK_HISTORY).all())
+    liked_hashes = {route_hash for route_hash, rating in rows if (rating or 0) >= LIKED_RATING and route_hash}
+    trips = (RouteFeedback.query
+             .with_entities(RouteFeedback.start_lat, RouteFeedback.start_lon, RouteFeedback.end_lat, RouteFeedback.end_lon)
+             .filter(RouteFeedback.user_id == user_id, RouteFeedback.rating >= LIKED_RATING).all())
+    liked_trips = np.array([trip for trip in trips if None not in trip], dtype=np.float64).reshape(-1, 4)
+    return UserProfile(preferences, liked_hashes, liked_trips)
+
+
+class UserProfileCache:
+    """Thread-safe LRU of UserProfiles by user id, with a TTL"""
+
+    def __init__(self, max_size=1024, ttl=300):
+        self.max_size = int(max_size)
+        self.ttl = float(ttl)
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, user_id):
+        """Cached profile of ``user_id`` or None"""
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is None or time.monotonic() - entry[0] > self.ttl:
+                self._entries.pop(user_id, None)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(user_id)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, user_id, profile):
+        if self.max_size <= 0 or self.ttl <= 0:
+            return
+        with self._lock:
+            self._entries[user_id] = (time.monotonic(), profile)
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, user_id):
+        with self._lock:
+            self._entries.pop(user_id, None)
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._entries),
+                'max_size': self.max_size,
+                'ttl_seconds': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0,
+            }
+
+
+user_profile_cache = UserProfileCache(PERSONALIZATION_CACHE_SIZE, PERSONALIZATION_CACHE_TTL)
+
+
+def get_user_profile(user_id):
+    """Personalization profile of ``user_id`` (cached); the empty profile for anonymous users or on errors"""
+    if not user_id:
+        return ANONYMOUS_PROFILE
+    profile = user_profile_cache.get(user_id)
+    if profile is None:
+        try:
+            profile = load_user_profile(user_id)
+        except Exception as e:
+            print(f"⚠️ Could not load personalization profile: {e}")
+            return ANONYMOUS_PROFILE
+        user_profile_cache.put(user_id, profile)
+    return profile
+
+
+def invalidate_user_profile(user_id):
+    """Call after writing a user's preferences or route feedback"""
+    if user_id:
+        user_profile_cache.invalidate(user_id)
@@ -0,0 +1,42 @@
+import numpy as np
+
+# Values of the optional "geometry_format" request field: None keeps the [lat, lon]
+# list, otherwise the number of decimals of the Google encoded-polyline string
+GEOMETRY_FORMATS = {'json': None, 'polyline': 5, 'polyline6': 6}
+
+
+def encode_polyline(points, precision=5):
+    """Google encoded-polyline string of ``[[lat, lon], ...]`` (about 1 m resolution at precision 5).
+
+    Coordinates are rounded to ``precision`` decimals and delta-encoded, so a
+    route costs a few bytes per vertex instead of two full JSON floats.
+    """
+    points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+    if len(points) == 0:
+        return ''
+    values = np.round(points * 10 ** precision).astype(np.int64)
+    deltas = np.diff(values, axis=0, prepend=np.zeros((1, 2), dtype=np.int64)).ravel()
+    shifted = deltas << 1
+    zigzag = np.where(deltas < 0, ~shifted, shifted)
+
+    chars = []
+    for value in zigzag.tolist():
+        while value >= 0x20:
+            chars.append(chr((0x20 | (value & 0x1f)) + 63))
+            value >>= 5
+        chars.append(chr(value + 63))
+    return ''.join(chars)
+
+
+def decode_polyline(encoded, precision=5):
+    """Inverse of encode_polyline: list of [lat, lon]"""
+    values, value, shift = [], 0, 0
+    for char in encoded:
+        byte = ord(char) - 63
+        value |= (byte & 0x1f) << shift
+        shift += 5
+        if byte < 0x20:
+            values.append(~(value >> 1) if value & 1 else value >> 1)
+            value, shift = 0, 0
+    coords = np.cumsum(np.array(values, dtype=np.int64).reshape(-1, 2), axis=0) / 10 ** precision
+    return coords.tolist()
@@ -0,0 +1,283 @@
+import heapq
+import json
+import os
+import threading
+import time
+from math import asin, cos, radians, sin, sqrt
+
+import numpy as np
+
+# Assumed driving speeds per OSM highway class (used for durations only)
+ROAD_SPEEDS_KMH = {
+    'motorway': 60, 'motorway_link': 40, 'trunk': 50, 'trunk_link': 35,
+    'primary': 40, 'primary_link': 30, 'secondary': 35, 'secondary_link': 25,
+    'tertiary': 30, 'tertiary_link': 25, 'unclassified': 25, 'residential': 20,
+    'living_street': 10, 'service': 15, 'road': 25,
+}
+DEFAULT_SPEED_KMH = 20
+
+# Edge cost is length * (1 + safety_weight * SAFETY_PENALTY * risk), risk in [0, 1]:
+# at safety_weight 1 the most dangerous road counts as 4x its length
+SAFETY_PENALTY = 3.0
+
+# Start/end must be this close to the road network (same tolerance as the OSRM check)
+MAX_SNAP_DISTANCE_M = 200
+# Cell size (degrees, ~220 m) of the grid used to snap points to the nearest node
+SNAP_GRID_DEGREES = 0.002
+# A* checks its deadline once every this many expanded nodes
+DEADLINE_CHECK_EVERY = 2000
+
+EARTH_RADIUS_M = 6371000.0
+
+
+def _haversine_m(lat1, lon1, lat2, lon2):
+    dlat = radians(lat2 - lat1)
+    dlon = radians(lon2 - lon1)
+    a = sin(dlat / 2) ** 2 + cos(radians(lat1)) * cos(radians(lat2)) * sin(dlon / 2) ** 2
+    return 2 * EARTH_RADIUS_M * asin(sqrt(min(a, 1.0)))
+
+
+def edge_lengths_m(lats1, lons1, lats2, lons2):
+    lats1, lons1, lats2, lons2 = map(np.radians, (lats1, lons1, lats2, lons2))
+    a = np.sin((lats2 - lats1) / 2) ** 2 + np.cos(lats1) * np.cos(lats2) * np.sin((lons2 - lons1) / 2) ** 2
+    return 2 * EARTH_RADIUS_M * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+
+class RoadGraph:
+    """Directed road network in CSR form for in-process routing.
+
+    Edges of node ``u`` are ``offsets[u]:offsets[u + 1]`` in ``targets``,
+    ``lengths_m``, ``speeds_kmh`` and ``name_codes`` (index into ``names``).
+    ``edge_risk`` (0 safe .. 1 dangerous) is attached per dataset with
+    ``with_edge_risk``; routing then trades length against risk via A*.
+    """
+
+    def __init__(self, node_lats, node_lons, offsets, targets, lengths_m, speeds_kmh, name_codes=None,
+                 names=(), edge_risk=None):
+        self.node_lats = node_lats
+        self.node_lons = node_lons
+        self.offsets = offsets
+        self.targets = targets
+        self.lengths_m = lengths_m
+        self.speeds_kmh = speeds_kmh
+        self.name_codes = name_codes if name_codes is not None else np.full(len(targets), -1, dtype=np.int32)
+        self.names = tuple(names)
+        self.edge_risk = edge_risk if edge_risk is not None else np.zeros(len(targets), dtype=np.float32)
+        self._lists = None
+        self._grid = None
+        self._lazy_lock = threading.Lock()
+
+    @classmethod
+    def from_edges(cls, node_lats, node_lons, sources, targets, speeds_kmh, name_codes=None, names=()):
+        """Build the CSR arrays from an unsorted directed edge list"""
+        node_lats = np.asarray(node_lats, dtype=np.float64)
+        node_lons = np.asarray(node_lons, dtype=np.float64)
+        sources = np.asarray(sources, dtype=np.int64)
+        targets = np.asarray(targets, dtype=np.int64)
+        if name_codes is None:
+            name_codes = np.full(len(sources), -1, dtype=np.int32)
+        order = np.argsort(sources, kind='stable')
+        sources, targets = sources[order], targets[order]
+        offsets = np.zeros(len(node_lats) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(sources, minlength=len(node_lats)), out=offsets[1:])
+        lengths = edge_lengths_m(node_lats[sources], node_lons[sources], node_lats[targets], node_lons[targets])
+        return cls(node_lats, node_lons, offsets, targets.astype(np.int32), lengths.astype(np.float32),
+                   np.asarray(speeds_kmh, dtype=np.float32)[order], np.asarray(name_codes, dtype=np.int32)[order],
+                   names)
+
+    @property
+    def n_nodes(self):
+        return len(self.node_lats)
+
+    @property
+    def n_edges(self):
+        return len(self.targets)
+
+    @property
+    def nbytes(self):
+        arrays = (self.node_lats, self.node_lons, self.offsets, self.targets, self.lengths_m, self.speeds_kmh,
+                  self.name_codes, self.edge_risk)
+        return sum(a.nbytes for a in arrays)
+
+    def save(self, path):
+        """Write the graph (without edge risk, which depends on the safety data) to ``.npz``"""
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'wb') as f:
+            np.savez(f, node_lats=self.node_lats, node_lons=self.node_lons, offsets=self.offsets,
+                     targets=self.targets, lengths_m=self.lengths_m, speeds_kmh=self.speeds_kmh,
+                     name_codes=self.name_codes, names=np.array(json.dumps(list(self.names))))
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        """Graph saved at ``path``, or None if there is none"""
+        if not os.path.exists(path):
+            return None
+        with np.load(path, allow_pickle=False) as npz:
+            arrays = {key: npz[key] for key in npz.files}
+        names = json.loads(arrays.pop('names').item())
+        return cls(names=names, **arrays)
+
+    def edge_midpoints(self):
+        """(E, 2) [lat, lon] of every edge midpoint, in edge order"""
+        sources = np.repeat(np.arange(self.n_nodes), np.diff(self.offsets))
+        return np.column_stack([(self.node_lats[sources] + self.node_lats[self.targets]) / 2,
+                                (self.node_lons[sources] + self.node_lons[self.targets]) / 2])
+
+    def with_edge_risk(self, edge_risk):
+        """Copy sharing every array except the per-edge risk"""
+        return RoadGraph(self.node_lats, self.node_lons, self.offsets, self.targets, self.lengths_m,
+                         self.speeds_kmh, self.name_codes, self.names,
+                         np.clip(np.asarray(edge_risk, dtype=np.float32), 0, 1))
+
+    def _node_grid(self):
+        # Nodes sorted by SNAP_GRID_DEGREES cell (row-major id) for range lookups; built once
+        with self._lazy_lock:
+            if self._grid is None:
+                min_lat, min_lon = float(self.node_lats.min()), float(self.node_lons.min())
+                rows = ((self.node_lats - min_lat) // SNAP_GRID_DEGREES).astype(np.int64)
+                cols = ((self.node_lons - min_lon) // SNAP_GRID_DEGREES).astype(np.int64)
+                n_rows, n_cols = int(rows.max()) + 1, int(cols.max()) + 1
+                cells = rows * n_cols + cols
+                order = np.argsort(cells, kind='stable')
+                self._grid = (min_lat, min_lon, n_rows, n_cols, cells[order], order)
+            return self._grid
+
+    def nearest_node(self, lat, lon):
+        """(node, distance_m) of the graph node closest to the point.
+
+        Only the 3x3 grid cells around the point are searched; that is exact
+        whenever the best node found is within one cell, and otherwise (a point
+        far from every road) all nodes are scanned.
+        """
+        if self.n_nodes == 0:
+            return None, float('inf')
+        scale = cos(radians(lat))
+        min_lat, min_lon, n_rows, n_cols, sorted_cells, order = self._node_grid()
+        row = int((lat - min_lat) // SNAP_GRID_DEGREES)
+        col = int((lon - min_lon) // SNAP_GRID_DEGREES)
+        first_col, last_col = max(col - 1, 0), min(col + 1, n_cols - 1)
+        candidates = []
+        if first_col <= last_col:
+            for r in range(max(row - 1, 0), min(row + 1, n_rows - 1) + 1):
+                lo, hi = np.searchsorted(sorted_cells, [r * n_cols + first_col, r * n_cols + last_col + 1])
+                candidates.append(order[lo:hi])
+        candidates = np.concatenate(candidates) if candidates else np.zeros(0, dtype=np.int64)
+        if len(candidates):
+            d2 = (self.node_lats[candidates] - lat) ** 2 + ((self.node_lons[candidates] - lon) * scale) ** 2
+            best = int(np.argmin(d2))
+            if d2[best] <= (SNAP_GRID_DEGREES * scale) ** 2:
+                node = int(candidates[best])
+                return node, _haversine_m(lat, lon, float(self.node_lats[node]), float(self.node_lons[node]))
+        d2 = (self.node_lats - lat) ** 2 + ((self.node_lons - lon) * scale) ** 2
+        node = int(np.argmin(d2))
+        return node, _haversine_m(lat, lon, float(self.node_lats[node]), float(self.node_lons[node]))
+
+    def snap_endpoints(self, start_lat, start_lon, end_lat, end_lon):
+        """(source, target) nodes for a trip, or None when an end is off the network or both snap together"""
+        source, source_dist = self.nearest_node(start_lat, start_lon)
+        target, target_dist = self.nearest_node(end_lat, end_lon)
+        if source is None or max(source_dist, target_dist) > MAX_SNAP_DISTANCE_M or source == target:
+            return None
+        return source, target
+
+    def _adjacency(self):
+        # Python lists are much faster than NumPy scalars in the search loop; built once
+        with self._lazy_lock:
+            if self._lists is None:
+                self._lists = (self.offsets.tolist(), self.targets.tolist(), self.lengths_m.tolist(),
+                               self.edge_risk.tolist(), self.node_lats.tolist(), self.node_lons.tolist())
+            return self._lists
+
+    def shortest_path(self, source, target, safety_weight=0.0, deadline_at=None):
+        """A* from ``source`` to ``target``; returns (nodes, edges) or None when unreachable.
+
+        The heuristic is the great-circle distance, admissible because no edge
+        costs less than its length. With ``deadline_at`` (a time.monotonic()
+        value) the search gives up, returning None, once it is passed.
+        """
+        offsets, targets, lengths, risk, lats, lons = self._adjacency()
+        penalty = max(float(safety_weight), 0.0) * SAFETY_PENALTY
+        t_lat, t_lon = lats[target], lons[target]
+
+        best = {source: 0.0}
+        came_from = {source: (None, None)}
+        heap = [(0.0, 0.0, source)]
+        done = set()
+        while heap:
+            _, cost, node = heapq.heappop(heap)
+            if node == target:
+                break
+            if node in done:
+                continue
+            done.add(node)
+            if deadline_at is not None and len(done) % DEADLINE_CHECK_EVERY == 0 and time.monotonic() > deadline_at:
+                return None
+            for edge in range(offsets[node], offsets[node + 1]):
+                nxt = targets[edge]
+                new_cost = cost + lengths[edge] * (1.0 + penalty * risk[edge])
+                if new_cost < best.get(nxt, float('inf')):
+                    best[nxt] = new_cost
+                    came_from[nxt] = (node, edge)
+                    # 0.999 absorbs float32 rounding of the stored edge lengths
+                    estimate = new_cost + 0.999 * _haversine_m(lats[nxt], lons[nxt], t_lat, t_lon)
+                    heapq.heappush(heap, (estimate, new_cost, nxt))
+        else:
+            return None
+
+        nodes, edges = [target], []
+        while came_from[nodes[-1]][0] is not None:
+            prev, edge = came_from[nodes[-1]]
+            nodes.append(prev)
+            edges.append(edge)
+        return nodes[::-1], edges[::-1]
+
+    def route(self, start_lat, start_lon, end_lat, end_lon, safety_weight=0.0):
+        """Candidate dict shaped like get_route_from_osrm's, or None if no path"""
+        endpoints = self.snap_endpoints(start_lat, start_lon, end_lat, end_lon)
+        if endpoints is None:
+            return None
+        return self.route_between(*endpoints, safety_weight=safety_weight)
+
+    def route_between(self, source, target, safety_weight=0.0, deadline_at=None):
+        """route() between already snapped nodes (see snap_endpoints)"""
+        path = self.shortest_path(source, target, safety_weight, deadline_at)
+        if path is None:
+            return None
+        nodes, edges = path
+        edges = np.asarray(edges, dtype=np.int64)
+        lengths = self.lengths_m[edges].astype(np.float64)
+        durations = lengths / 1000 / self.speeds_kmh[edges] * 60
+        return {
+            'route': np.column_stack([self.node_lats[nodes], self.node_lons[nodes]]).tolist(),
+            'distance_km': float(lengths.sum()) / 1000,
+            'duration_min': float(durations.sum()),
+            'waypoint': None,
+            'steps': self._steps(edges, lengths),
+        }
+
+    def _steps(self, edges, lengths):
+        # One instruction per run of edges on the same street
+        codes = self.name_codes[edges]
+        if len(codes) == 0:
+            return []
+        starts = np.concatenate([[0], np.flatnonzero(np.diff(codes)) + 1])
+        run_lengths = np.add.reduceat(lengths, starts)
+        steps = []
+        for number, (start, distance) in enumerate(zip(starts, run_lengths), start=1):
+            code = int(codes[start])
+            name = self.names[code] if code >= 0 else None
+            if number == 1:
+                instruction = f"Head along {name}" if name else "Head out"
+            else:
+                instruction = f"Continue onto {name}" if name else "Continue"
+            distance = float(distance)
+            steps.append({
+                'number': number,
+                'instruction': instruction,
+                'distance': round(distance, 1),
+                'distance_text': f"{distance:.0f}m" if distance < 1000 else f"{distance/1000:.1f}km"
+            })
+        steps.append({'number': len(steps) + 1, 'instruction': 'Arrive at destination', 'distance': 0.0,
+                      'distance_text': '0m'})
+        return steps
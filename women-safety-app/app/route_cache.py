@@ -0,0 +1,76 @@
+import hashlib
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+# Preference flags that change a route's safety multipliers; everything else
+# (weights, max distance, ...) only affects ranking and must not split the cache
+SCORING_PREFERENCE_FLAGS = ('prefer_well_lit', 'prefer_populated', 'prefer_main_roads')
+
+
+def route_fingerprint(route):
+    """Exact content hash of a route polyline"""
+    points = np.ascontiguousarray(np.asarray(route, dtype=np.float64))
+    return hashlib.md5(points.tobytes()).hexdigest()
+
+
+class RouteSafetyCache:
+    """Bounded, thread-safe LRU cache of route safety results.
+
+    Keys combine the route geometry, the scoring preferences and the dataset
+    version, so any data change (CSV reload, live incident) makes old entries
+    unreachable and they simply age out.
+    """
+
+    def __init__(self, max_size=2048):
+        self.max_size = int(max_size)
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(route, preferences, dataset_version):
+        preferences = preferences or {}
+        flags = tuple(bool(preferences.get(name)) for name in SCORING_PREFERENCE_FLAGS)
+        # The departure time bucket swaps the crime layer, so it is part of the key too
+        return route_fingerprint(route), flags, preferences.get('time_bucket'), dataset_version
+
+    def get(self, key):
+        """Cached result for ``key`` (a shallow copy) or None"""
+        with self._lock:
+            value = self._entries.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+        return dict(value)
+
+    def put(self, key, value):
+        if value is None or self.max_size <= 0:
+            return
+        with self._lock:
+            self._entries[key] = dict(value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._entries),
+                'max_size': self.max_size,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0,
+            }
@@ -0,0 +1,79 @@
+import os
+
+import numpy as np
+
+from app.route_optimizer import EARTH_RADIUS_KM, resample_route_with_spacing
+
+# Two candidates are the same route when no point of either is farther than this
+# from the other (symmetric Hausdorff distance); 0 only merges identical geometry
+ROUTE_DEDUP_DISTANCE_M = float(os.environ.get('ROUTE_DEDUP_DISTANCE_M', 50))
+
+# Routes are compared as points resampled this far apart (at most DEDUP_MAX_POINTS),
+# so differing vertex counts don't matter
+DEDUP_SPACING_M = 25
+DEDUP_MAX_POINTS = 300
+
+# Candidates whose lengths differ by more than this fraction are never duplicates
+MAX_LENGTH_DIFFERENCE = 0.1
+
+
+class _Geometry:
+    """A route's resampled points in local metres, with its bounding box and length"""
+
+    def __init__(self, route, origin_lat):
+        samples, spacing_m = resample_route_with_spacing(route, DEDUP_SPACING_M, DEDUP_MAX_POINTS)
+        scale = EARTH_RADIUS_KM * 1000 * np.pi / 180
+        self.points = np.column_stack([samples[:, 0] * scale,
+                                       samples[:, 1] * scale * np.cos(np.radians(origin_lat))])
+        self.bbox_min = self.points.min(axis=0)
+        self.bbox_max = self.points.max(axis=0)
+        self.length_m = spacing_m * (len(samples) - 1)
+
+
+def _hausdorff_within(a, b, max_distance):
+    # Every point of each route has a point of the other within max_distance
+    d2 = ((a.points[:, None, :] - b.points[None, :, :]) ** 2).sum(axis=2)
+    limit = max_distance ** 2
+    return d2.min(axis=1).max() <= limit and d2.min(axis=0).max() <= limit
+
+
+class RouteDeduplicator:
+    """Keeps the first of every group of geometrically near-identical routes.
+
+    ``add(route)`` returns False when ``route`` runs within ``max_distance_m`` of
+    a route already kept. Cheap tests come first: the bounding boxes must agree
+    to within ``max_distance_m`` (a necessary condition for the Hausdorff
+    distance) and the lengths to within MAX_LENGTH_DIFFERENCE; only candidates
+    passing both get the pairwise point comparison.
+    """
+
+    def __init__(self, max_distance_m=ROUTE_DEDUP_DISTANCE_M):
+        self.max_distance_m = float(max_distance_m)
+        self.kept = []
+        self.dropped = 0
+        self._origin_lat = None
+
+    def add(self, route):
+        """Remember ``route`` unless it duplicates a kept one; returns whether it was kept"""
+        if route is None or len(route) < 2:
+            return True
+        geometry = self._geometry(route)
+        if any(self._same(geometry, other) for other in self.kept):
+            self.dropped += 1
+            return False
+        self.kept.append(geometry)
+        return True
+
+    def _geometry(self, route):
+        if self._origin_lat is None:
+            self._origin_lat = float(route[0][0])
+        return _Geometry(route, self._origin_lat)
+
+    def _same(self, a, b):
+        if (np.abs(a.bbox_min - b.bbox_min) > self.max_distance_m).any():
+            return False
+        if (np.abs(a.bbox_max - b.bbox_max) > self.max_distance_m).any():
+            return False
+        if abs(a.length_m - b.length_m) > MAX_LENGTH_DIFFERENCE * max(a.length_m, b.length_m):
+            return False
+        return _hausdorff_within(a, b, self.max_distance_m)
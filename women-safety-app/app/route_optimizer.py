@@ -0,0 +1,365 @@
+import numpy as np
+
+from app.safety_index import SafetyIndex
+
+# Lookup windows (degrees) used by route safety scoring
+CRIME_RADIUS = 0.003
+LIGHTING_RADIUS = 0.005
+POPULATION_RADIUS = 0.005
+
+# Route sampling: one lookup point every SAMPLE_SPACING_M metres along the
+# polyline, widened on very long routes so no route costs more than
+# MAX_SAMPLE_POINTS lookups
+SAMPLE_SPACING_M = 100
+MAX_SAMPLE_POINTS = 200
+EARTH_RADIUS_KM = 6371
+
+# A sampled point with more crimes than this inside its window is a hotspot
+CRIME_HOTSPOT_THRESHOLD = 3
+
+# Per-segment safety profiles are quantized to integer levels 0..PROFILE_LEVELS
+PROFILE_LEVELS = 10
+
+# Time-of-day buckets (start hour, end hour) for night-aware crime scoring
+TIME_BUCKETS = (
+    ('late_night', 0, 4),
+    ('early_morning', 4, 8),
+    ('morning', 8, 12),
+    ('afternoon', 12, 16),
+    ('evening', 16, 20),
+    ('night', 20, 24),
+)
+TIME_BUCKET_NAMES = tuple(name for name, _, _ in TIME_BUCKETS)
+
+# Weight of a crime when travelling in a given bucket, by how many buckets away
+# (circularly) the crime happened: same bucket, neighbouring bucket, anything else
+TIME_BUCKET_WEIGHTS = (1.0, 0.6, 0.3)
+
+
+def time_bucket_for(value):
+    """Map 'HH:MM', an ISO datetime string, a datetime/time or an hour to a bucket name (None if unparseable)"""
+    if value is None or value == '':
+        return None
+    try:
+        if hasattr(value, 'hour'):
+            hour = value.hour
+        elif isinstance(value, (int, float)):
+            hour = int(value)
+        else:
+            text = str(value).strip()
+            if 'T' in text:
+                text = text.split('T', 1)[1]
+            elif ' ' in text:
+                text = text.split(' ', 1)[1]
+            hour = int(text.split(':', 1)[0])
+    except (TypeError, ValueError):
+        return None
+    if not 0 <= hour < 24:
+        return None
+    for name, start, end in TIME_BUCKETS:
+        if start <= hour < end:
+            return name
+    return None
+
+
+def crime_time_weight_columns(times):
+    """Per-departure-bucket weight columns (``w_<bucket>``) for crimes with the given times.
+
+    Crimes without a usable time get weight 1.0 in every bucket (time-blind).
+    """
+    positions = {name: i for i, name in enumerate(TIME_BUCKET_NAMES)}
+    n_buckets = len(TIME_BUCKET_NAMES)
+    crime_pos = np.array([positions.get(time_bucket_for(t), -1) for t in times], dtype=np.int64)
+    columns = {}
+    for dep_pos, dep_name in enumerate(TIME_BUCKET_NAMES):
+        gap = np.abs(crime_pos - dep_pos)
+        gap = np.minimum(gap, n_buckets - gap)
+        weights = np.array(TIME_BUCKET_WEIGHTS)[np.minimum(gap, len(TIME_BUCKET_WEIGHTS) - 1)]
+        columns[f'w_{dep_name}'] = np.where(crime_pos < 0, 1.0, weights)
+    return columns
+
+
+def build_safety_indexes(crime_data, lighting_data, population_data):
+    """Build the (crime, lighting, population) SafetyIndex triple from the loaded SafetyTables"""
+    # Cell sizes match the default query radii so a window touches at most 3x3 cells
+    if len(crime_data) and crime_data.has_column('time'):
+        crime_index = SafetyIndex(
+            crime_data.values('Latitude'),
+            crime_data.values('Longitude'),
+            crime_time_weight_columns(crime_data.strings('time')),
+            cell_size=CRIME_RADIUS
+        )
+    else:
+        crime_index = SafetyIndex.from_table(crime_data, cell_size=CRIME_RADIUS)
+    lighting_index = SafetyIndex.from_table(lighting_data, columns=('lighting_score',),
+                                            cell_size=LIGHTING_RADIUS)
+    population_index = SafetyIndex.from_table(
+        population_data,
+        columns=('population_density', 'traffic_level', 'is_main_road'),
+        cell_size=POPULATION_RADIUS
+    )
+    return crime_index, lighting_index, population_index
+
+
+def compute_point_metrics(coords, crime_index, lighting_index, population_index, raster=None,
+                          live_crime_index=None, time_bucket=None, crime_surface=None):
+    """Score every point of an (N, 2) [lat, lon] array in one vectorized pass.
+
+    Returns a dict of length-N arrays: ``crime`` (counts), ``lighting`` (mean score,
+    5.0 when no data), ``population`` and ``traffic`` (scaled means, 5.0 when no
+    data) and ``main_road`` (bool).
+
+    When a precomputed ``raster`` is given, points inside its bounds are answered by
+    an O(1) cell lookup and only points outside it fall back to the exact indexes.
+    Incidents ingested at runtime into ``live_crime_index`` are added on top of the
+    static crime counts on both paths.
+
+    With a ``time_bucket`` (see TIME_BUCKETS), ``crime`` becomes a time-weighted
+    count read from the precomputed ``w_<bucket>`` weight column, so it costs the
+    same single lookup as the time-blind count.
+
+    With a ``crime_surface`` (see app/crime_density.py), ``crime`` inside its bounds
+    is the severity-weighted kernel density instead of the raw window count.
+    """
+    points = np.asarray(coords, dtype=np.float64).reshape(-1, 2)
+    lats, lons = points[:, 0], points[:, 1]
+    weight_column = f'w_{time_bucket}' if time_bucket in TIME_BUCKET_NAMES else None
+
+    if raster is not None and weight_column and not raster.has_layer(f'crime_{time_bucket}'):
+        raster = None  # built before time buckets existed; stay exact
+
+    if raster is None:
+        metrics = _exact_point_metrics(lats, lons, crime_index, lighting_index, population_index, weight_column)
+    else:
+        inside = raster.contains(lats, lons)
+        if inside.all():
+            metrics = raster.point_metrics(lats, lons, time_bucket if weight_column else None)
+        elif not inside.any():
+            metrics = _exact_point_metrics(lats, lons, crime_index, lighting_index, population_index, weight_column)
+        else:
+            exact = _exact_point_metrics(lats[~inside], lons[~inside], crime_index, lighting_index, population_index,
+                                         weight_column)
+            cached = raster.point_metrics(lats[inside], lons[inside], time_bucket if weight_column else None)
+            metrics = {}
+            for name, values in exact.items():
+                metrics[name] = np.empty(len(points), dtype=values.dtype)
+                metrics[name][~inside] = values
+                metrics[name][inside] = cached[name]
+
+    surface_layer = f'crime_{time_bucket}' if weight_column else 'crime'
+    if crime_surface is not None and crime_surface.has_layer(surface_layer):
+        in_surface = crime_surface.contains(lats, lons)
+        if in_surface.all():
+            metrics['crime'] = crime_surface.sample(lats, lons, surface_layer)
+        else:
+            crime = metrics['crime'].astype(np.float64)
+            crime[in_surface] = crime_surface.sample(lats[in_surface], lons[in_surface], surface_layer)
+            metrics['crime'] = crime
+
+    if live_crime_index is not None and len(live_crime_index):
+        metrics['crime'] = metrics['crime'] + _crime_lookup(live_crime_index, lats, lons, weight_column)
+    return metrics
+
+
+def compute_raster_metrics(coords, crime_index, lighting_index, population_index):
+    """Exact metrics plus a time-weighted ``crime_<bucket>`` array per departure bucket (raster baking)"""
+    points = np.asarray(coords, dtype=np.float64).reshape(-1, 2)
+    lats, lons = points[:, 0], points[:, 1]
+    metrics = _exact_point_metrics(lats, lons, crime_index, lighting_index, population_index)
+    for bucket in TIME_BUCKET_NAMES:
+        metrics[f'crime_{bucket}'] = _crime_lookup(crime_index, lats, lons, f'w_{bucket}')
+    return metrics
+
+
+def road_edge_risk(coords, crime_index, lighting_index, population_index, raster=None, crime_surface=None,
+                   chunk_size=100000):
+    """Risk (0 safe .. 1 dangerous) at each road edge midpoint: 1 - point safety score / 100"""
+    risk = np.empty(len(coords), dtype=np.float32)
+    for start in range(0, len(coords), chunk_size):
+        chunk = coords[start:start + chunk_size]
+        metrics = compute_point_metrics(chunk, crime_index, lighting_index, population_index, raster,
+                                        crime_surface=crime_surface)
+        risk[start:start + len(chunk)] = 1.0 - point_safety_scores(metrics) / 100.0
+    return risk
+
+
+def _crime_lookup(index, lats, lons, weight_column=None):
+    if weight_column and weight_column in index.column_names:
+        _, sums = index.aggregate(lats, lons, CRIME_RADIUS, (weight_column,))
+        return sums[weight_column]
+    return index.count(lats, lons, CRIME_RADIUS)
+
+
+def _exact_point_metrics(lats, lons, crime_index, lighting_index, population_index, weight_column=None):
+    crime = _crime_lookup(crime_index, lats, lons, weight_column)
+    lighting = lighting_index.mean('lighting_score', lats, lons, LIGHTING_RADIUS, default=5.0)
+
+    pop_columns = ('population_density', 'traffic_level', 'is_main_road')
+    counts, sums = population_index.aggregate(lats, lons, POPULATION_RADIUS, pop_columns)
+    has_pop = counts > 0
+    means = {name: sums[name] / np.maximum(counts, 1) for name in pop_columns}
+
+    population = np.where(has_pop, means['population_density'] / 1000, 5.0)
+    traffic = np.where(has_pop, means['traffic_level'] / 10, 5.0)
+    main_road = has_pop & (means['is_main_road'] > 0.5)
+
+    return {
+        'crime': crime,
+        'lighting': lighting,
+        'population': population,
+        'traffic': traffic,
+        'main_road': main_road,
+    }
+
+
+def _safety_score(avg_crime, max_crime, hotspot_pct, lighting, population, traffic, main_road_pct, preferences):
+    # Shared by the route aggregate (scalars) and the per-segment profile (arrays)
+    base_crime_penalty = np.minimum(40, avg_crime ** 1.2 * 5)
+    max_crime_penalty = np.minimum(40, max_crime ** 1.4 * 7)
+    hotspot_penalty = np.minimum(30, hotspot_pct * 0.5)
+
+    total_crime_penalty = base_crime_penalty + max_crime_penalty + hotspot_penalty
+
+    base_safety_score = np.maximum(0, 100 - total_crime_penalty)
+
+    lighting_multiplier = 1.0 + (lighting / 10) * (2.5 if preferences.get('prefer_well_lit') else 0.8)
+    population_multiplier = 1.0 + (population / 10) * (2.0 if preferences.get('prefer_populated') else 0.6)
+    traffic_multiplier = 1.0 + (traffic / 10) * (1.5 if preferences.get('prefer_populated') else 0.4)
+    main_road_multiplier = 1.0 + (main_road_pct / 100) * (2.5 if preferences.get('prefer_main_roads') else 0.7)
+
+    total_multiplier = (lighting_multiplier + population_multiplier + traffic_multiplier + main_road_multiplier) / 4
+
+    return np.minimum(100, base_safety_score * total_multiplier)
+
+
+def point_safety_scores(metrics, preferences=None):
+    """Safety score (0-100) of every sample point, each scored as its own one-point route"""
+    crime = metrics['crime']
+    return _safety_score(crime, crime, (crime > CRIME_HOTSPOT_THRESHOLD) * 100.0, metrics['lighting'],
+                         metrics['population'], metrics['traffic'], metrics['main_road'] * 100.0,
+                         preferences or {})
+
+
+def encode_safety_profile(point_scores, spacing_m=None):
+    """Run-length encode the safety of the segments between consecutive sample points.
+
+    N evenly spaced samples give N - 1 segments of ``spacing_m`` metres; each
+    scores the mean of its two end points, quantized to PROFILE_LEVELS steps.
+    Returns ``{'spacing_m': .., 'runs': [[level, count], ...]}`` where level ``k``
+    covers scores ``[k * 100 / PROFILE_LEVELS, (k + 1) * 100 / PROFILE_LEVELS)``
+    and each run spans ``count`` consecutive segments, so the runs add up to the
+    route length (route_display.js splits the route line by them).
+    """
+    point_scores = np.asarray(point_scores, dtype=np.float64)
+    scores = (point_scores[:-1] + point_scores[1:]) / 2
+    levels = np.clip(np.floor(scores * PROFILE_LEVELS / 100), 0, PROFILE_LEVELS).astype(np.int64)
+    if len(levels) == 0:
+        return {'spacing_m': spacing_m, 'runs': []}
+    starts = np.concatenate([[0], np.flatnonzero(np.diff(levels)) + 1])
+    counts = np.diff(np.concatenate([starts, [len(levels)]]))
+    return {
+        'spacing_m': None if spacing_m is None else round(float(spacing_m), 1),
+        'runs': [[int(level), int(count)] for level, count in zip(levels[starts], counts)],
+    }
+
+
+def summarize_route_safety(metrics, preferences=None, spacing_m=None):
+    """Aggregate per-point metrics into the route safety dict returned by the API.
+
+    The same metrics also yield ``safety_profile``, the run-length encoded
+    per-segment scores (see encode_safety_profile), so no second pass is needed.
+    """
+    if preferences is None:
+        preferences = {}
+
+    crime = metrics['crime']
+    n_points = len(crime)
+    if n_points == 0:
+        return None
+
+    avg_crime = float(crime.sum()) / n_points
+    max_crime_at_point = crime.max().item()
+    avg_lighting = float(metrics['lighting'].sum()) / n_points
+    avg_population = float(metrics['population'].sum()) / n_points
+    avg_traffic = float(metrics['traffic'].sum()) / n_points
+    main_road_pct = (int(metrics['main_road'].sum()) / n_points) * 100
+    crime_hotspot_pct = (int((crime > CRIME_HOTSPOT_THRESHOLD).sum()) / n_points) * 100
+
+    final_safety_score = float(_safety_score(avg_crime, max_crime_at_point, crime_hotspot_pct, avg_lighting,
+                                             avg_population, avg_traffic, main_road_pct, preferences))
+
+    crime_density_score = 100 - min(100, avg_crime * 10)
+
+    return {
+        'safety_score': round(final_safety_score, 2),
+        'crime_density': round(avg_crime, 2),
+        'max_crime_exposure': round(max_crime_at_point, 2),
+        'crime_hotspot_percentage': round(crime_hotspot_pct, 2),
+        'lighting_score': round(avg_lighting, 2),
+        'population_score': round(avg_population, 2),
+        'traffic_score': round(avg_traffic, 2),
+        'main_road_percentage': round(main_road_pct, 2),
+        'crime_density_score': round(crime_density_score, 2),
+        'safety_profile': encode_safety_profile(point_safety_scores(metrics, preferences), spacing_m)
+    }
+
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    """Vectorized great-circle distance in km (scalars or equal-length arrays)"""
+    lat1, lon1, lat2, lon2 = (np.radians(np.asarray(v, dtype=np.float64)) for v in (lat1, lon1, lat2, lon2))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+
+def resample_route_with_spacing(route, spacing_m=SAMPLE_SPACING_M, max_points=MAX_SAMPLE_POINTS):
+    """Resample a polyline to points evenly spaced by distance (about ``spacing_m`` apart).
+
+    Dense vertex clusters around turns no longer dominate the samples and long
+    straight stretches are no longer skipped; the number of points depends on the
+    route length only, capped at ``max_points``. Returns ``(samples, spacing)``:
+    an (N, 2) array and the actual distance in metres between consecutive
+    samples, or ``(None, None)``.
+    """
+    if route is None or len(route) < 2:
+        return None, None
+    points = np.asarray(route, dtype=np.float64).reshape(-1, 2)
+    cumulative = np.concatenate([[0.0], np.cumsum(
+        haversine_km(points[:-1, 0], points[:-1, 1], points[1:, 0], points[1:, 1]) * 1000
+    )])
+    total_m = cumulative[-1]
+    if total_m <= 0:
+        return points[:1], 0.0
+
+    n_samples = int(min(max_points, max(2, np.floor(total_m / spacing_m) + 1)))
+    targets = np.linspace(0.0, total_m, n_samples)
+    return np.column_stack([
+        np.interp(targets, cumulative, points[:, 0]),
+        np.interp(targets, cumulative, points[:, 1]),
+    ]), total_m / (n_samples - 1)
+
+
+def score_routes_batch(routes, crime_index, lighting_index, population_index, preferences=None, raster=None,
+                       live_crime_index=None, crime_surface=None):
+    """Score many route polylines together.
+
+    All sampled points are concatenated into one ragged array, scored with a single
+    ``compute_point_metrics`` call and split back per route. Returns a list aligned
+    with ``routes`` holding the safety dict (or None for unusable routes).
+    """
+    resampled = [resample_route_with_spacing(route) for route in routes]
+    samples = [points for points, _ in resampled]
+    usable = [i for i, s in enumerate(samples) if s is not None]
+    results = [None] * len(routes)
+    if not usable:
+        return results
+
+    lengths = np.array([len(samples[i]) for i in usable])
+    flat = np.concatenate([samples[i] for i in usable])
+    metrics = compute_point_metrics(flat, crime_index, lighting_index, population_index, raster, live_crime_index,
+                                    (preferences or {}).get('time_bucket'), crime_surface)
+
+    ends = np.cumsum(lengths)
+    starts = ends - lengths
+    for i, a, b in zip(usable, starts, ends):
+        results[i] = summarize_route_safety({k: v[a:b] for k, v in metrics.items()}, preferences, resampled[i][1])
+    return results
@@ -1,12 +1,13 @@
-from flask import Blueprint, render_template, request, redirect, url_for, flash, session, jsonify, make_response, abort
+from flask import Blueprint, render_template, request, redirect, url_for, flash, session, jsonify, make_response, abort, Response, stream_with_context
 from werkzeug.utils import secure_filename
 import os
 import json
 import requests
+import threading
 import time
+from app.http_client import http_get, http_post
 from datetime import datetime
 from app.models import db, IncidentReport, CommunityPost, Comment, EmergencyContact, SOSAlert, UserPreference, RouteFeedback
-from sqlalchemy import text
 from app.auth_models import User
 from flask import send_from_directory
 
@@ -45,7 +46,7 @@ def ai_status():
             "contents": [{"parts": [{"text": "Say OK."}]}],
             "generationConfig": {"maxOutputTokens": 4}
         }
-        resp = requests.post(url, headers={'Content-Type': 'application/json'}, json=payload, timeout=15)
+        resp = http_post('gemini', url, headers={'Content-Type': 'application/json'}, json=payload, timeout=15)
         info = {'status': resp.status_code, 'text': None}
         try:
             info['json'] = resp.json()
@@ -324,7 +325,6 @@ def send_sms_alert(contacts, user_name, location_link, battery_level, user_phone
     fast2sms_key = os.environ.get('FAST2SMS_API_KEY')
     if fast2sms_key and user_phone:
         try:
-            import requests
             provider = "Fast2SMS"
             
             # Format user's phone for display (Fast2SMS free plan doesn't support custom sender_id)
@@ -351,7 +351,7 @@ def send_sms_alert(contacts, user_name, location_link, battery_level, user_phone
                         "authorization": fast2sms_key,
                         "Content-Type": "application/x-www-form-urlencoded"
                     }
-                    resp = requests.post(url, data=payload, headers=headers, timeout=10)
+                    resp = http_post('fast2sms', url, data=payload, headers=headers)
                     ok = False
                     try:
                         data = resp.json()
@@ -432,7 +432,6 @@ def send_all_clear_sms(contacts, user_name, user_phone=None):
     fast2sms_key = os.environ.get('FAST2SMS_API_KEY')
     if fast2sms_key and user_phone:
         try:
-            import requests
             provider = "Fast2SMS"
             
             # Reuse normalization helpers from send_sms_alert via local defs
@@ -473,7 +472,7 @@ def send_all_clear_sms(contacts, user_name, user_phone=None):
                         "authorization": fast2sms_key,
                         "Content-Type": "application/x-www-form-urlencoded"
                     }
-                    resp = requests.post(url, data=payload, headers=headers, timeout=10)
+                    resp = http_post('fast2sms', url, data=payload, headers=headers)
                     ok = False
                     try:
                         data = resp.json()
@@ -883,6 +882,29 @@ def report_incident():
     """Incident report form"""
     return render_template('incident_report_enhanced.html')
 
+# At most REPORT_INGEST_LIMIT report locations per user (or client IP) per hour feed route scoring
+REPORT_INGEST_LIMIT = int(os.environ.get('REPORT_INGEST_LIMIT', 5))
+REPORT_INGEST_WINDOW = 3600
+_report_ingests = {}
+_report_ingests_lock = threading.Lock()
+
+def _report_ingest_allowed(user_id):
+    key = f'user:{user_id}' if user_id else f'ip:{request.remote_addr}'
+    now = time.time()
+    with _report_ingests_lock:
+        recent = [t for t in _report_ingests.get(key, ()) if now - t < REPORT_INGEST_WINDOW]
+        allowed = len(recent) < REPORT_INGEST_LIMIT
+        if allowed:
+            recent.append(now)
+        _report_ingests[key] = recent
+        # Forget idle reporters so the table can't grow without bound
+        if len(_report_ingests) > 10000:
+            for stale in [k for k, times in _report_ingests.items() if not times or now - times[-1] >= REPORT_INGEST_WINDOW]:
+                del _report_ingests[stale]
+    if not allowed:
+        print(f"⚠️ Report location not ingested: limit of {REPORT_INGEST_LIMIT}/hour reached for {key}")
+    return allowed
+
 @bp.route('/submit_report', methods=['POST'])
 def submit_report():
     # Collect form data
@@ -973,6 +995,20 @@ def submit_report():
     db.session.add(incident_report)
     db.session.commit()
     
+    # Feed geolocated reports straight into route safety scoring (rate-limited per reporter,
+    # since anyone can submit the form; the report itself is always saved)
+    if request.form.get('incident_lat') and request.form.get('incident_lon') and _report_ingest_allowed(user_id):
+        try:
+            ingest_incidents([{
+                'lat': request.form.get('incident_lat'),
+                'lon': request.form.get('incident_lon'),
+                'crime_type': report_data.get('incident_type'),
+                'date': report_data.get('incident_date'),
+                'time': report_data.get('incident_time')
+            }], source='incident_report')
+        except Exception as e:
+            print(f"⚠️ Could not ingest report location: {e}")
+    
     # Store in session for next page
     session['report_data'] = report_data
     session['ai_summary'] = summary
@@ -1009,11 +1045,11 @@ def generate_ai_summary(data):
                 "contents": [{"parts": [{"text": prompt}]}],
                 "generationConfig": {"maxOutputTokens": 300}
             }
-            response = requests.post(
+            response = http_post(
+                'gemini',
                 url,
                 headers={'Content-Type': 'application/json'},
-                json=payload,
-                timeout=30
+                json=payload
             )
             if response.status_code == 200:
                 result = response.json()
@@ -1062,11 +1098,11 @@ def generate_first_person_story(data, ai_summary):
                 "contents": [{"parts": [{"text": prompt}]}],
                 "generationConfig": {"maxOutputTokens": 300}
             }
-            response = requests.post(
+            response = http_post(
+                'gemini',
                 url,
                 headers={'Content-Type': 'application/json'},
-                json=payload,
-                timeout=30
+                json=payload
             )
             if response.status_code == 200:
                 result = response.json()
@@ -1643,11 +1679,11 @@ def chat_api():
             try:
                 if delay:
                     time.sleep(delay)
-                response = requests.post(
+                response = http_post(
+                    'gemini',
                     url,
                     headers={'Content-Type': 'application/json'},
-                    json=payload,
-                    timeout=30
+                    json=payload
                 )
                 if response.status_code == 200:
                     result = response.json()
@@ -1686,221 +1722,56 @@ def chat_api():
     return jsonify({'success': True, 'message': fallback, 'provider': 'fallback'})
 
 # ============ SAFE ROUTES FEATURE ============
-import pandas as pd
-import numpy as np
-from math import radians, cos, sin, asin, sqrt, atan2
-import hashlib
-import os
-
-# Route optimization functions (copied from app.py since route_optimizer is empty)
-def validate_coordinates(lat, lon):
-    BANGALORE_BOUNDS = {
-        'min_lat': 12.704192, 'max_lat': 13.173706,
-        'min_lon': 77.269876, 'max_lon': 77.850066
-    }
-    try:
-        lat, lon = float(lat), float(lon)
-        return (BANGALORE_BOUNDS['min_lat'] <= lat <= BANGALORE_BOUNDS['max_lat'] and
-                BANGALORE_BOUNDS['min_lon'] <= lon <= BANGALORE_BOUNDS['max_lon'])
-    except:
-        return False
-
-def calculate_route_hash(route):
-    if not route or len(route) < 2:
-        return None
-    sample_indices = [0, len(route)//4, len(route)//2, 3*len(route)//4, len(route)-1]
-    sample_points = [route[i] for i in sample_indices if i < len(route)]
-    hash_string = ''.join([f"{lat:.4f},{lon:.4f}" for lat, lon in sample_points])
-    return hashlib.md5(hash_string.encode()).hexdigest()
-
-def calculate_crime_exposure(lat, lon, radius=0.003):
-    try:
-        nearby_crimes = crime_data[
-            (abs(crime_data['Latitude'] - lat) < radius) &
-            (abs(crime_data['Longitude'] - lon) < radius)
-        ]
-        return len(nearby_crimes)
-    except Exception as e:
-        print(f"❌ Error calculating crime: {e}")
-        return 0
-
-def calculate_lighting_score(lat, lon, radius=0.005):
-    try:
-        nearby_lighting = lighting_data[
-            (abs(lighting_data['Latitude'] - lat) < radius) &
-            (abs(lighting_data['Longitude'] - lon) < radius)
-        ]
-        return nearby_lighting['lighting_score'].mean() if len(nearby_lighting) > 0 else 5.0
-    except:
-        return 5.0
-
-def calculate_population_score(lat, lon, radius=0.005):
-    try:
-        nearby_pop = population_data[
-            (abs(population_data['Latitude'] - lat) < radius) &
-            (abs(population_data['Longitude'] - lon) < radius)
-        ]
-        if len(nearby_pop) > 0:
-            return (
-                nearby_pop['population_density'].mean() / 1000,
-                nearby_pop['traffic_level'].mean() / 10,
-                nearby_pop['is_main_road'].mean() > 0.5
-            )
-        return 5.0, 5.0, False
-    except:
-        return 5.0, 5.0, False
-
-def calculate_route_safety_comprehensive(route, preferences=None):
-    if not route or len(route) < 2:
-        return None
-    
-    if preferences is None:
-        preferences = {}
-    
-    try:
-        sample_rate = max(1, len(route) // 50)
-        sampled_route = route[::sample_rate]
-        
-        total_crime = 0
-        max_crime_at_point = 0
-        crime_hotspot_count = 0
-        total_lighting = 0
-        total_population = 0
-        total_traffic = 0
-        main_road_count = 0
-        
-        for lat, lon in sampled_route:
-            crime_count = calculate_crime_exposure(lat, lon, radius=0.003)
-            total_crime += crime_count
-            max_crime_at_point = max(max_crime_at_point, crime_count)
-            if crime_count > 3:
-                crime_hotspot_count += 1
-            
-            light_score = calculate_lighting_score(lat, lon, radius=0.005)
-            total_lighting += light_score
-            
-            pop_score, traffic_score, is_main_road = calculate_population_score(lat, lon, radius=0.005)
-            total_population += pop_score
-            total_traffic += traffic_score
-            if is_main_road:
-                main_road_count += 1
-        
-        n_points = len(sampled_route)
-        
-        avg_crime = total_crime / n_points
-        avg_lighting = total_lighting / n_points
-        avg_population = total_population / n_points
-        avg_traffic = total_traffic / n_points
-        main_road_pct = (main_road_count / n_points) * 100
-        crime_hotspot_pct = (crime_hotspot_count / n_points) * 100
-        
-        base_crime_penalty = min(40, avg_crime ** 1.2 * 5)
-        max_crime_penalty = min(40, max_crime_at_point ** 1.4 * 7)
-        hotspot_penalty = min(30, crime_hotspot_pct * 0.5)
-        
-        total_crime_penalty = base_crime_penalty + max_crime_penalty + hotspot_penalty
-        
-        base_safety_score = max(0, 100 - total_crime_penalty)
-        
-        lighting_multiplier = 1.0 + (avg_lighting / 10) * (2.5 if preferences.get('prefer_well_lit') else 0.8)
-        population_multiplier = 1.0 + (avg_population / 10) * (2.0 if preferences.get('prefer_populated') else 0.6)
-        traffic_multiplier = 1.0 + (avg_traffic / 10) * (1.5 if preferences.get('prefer_populated') else 0.4)
-        main_road_multiplier = 1.0 + (main_road_pct / 100) * (2.5 if preferences.get('prefer_main_roads') else 0.7)
-        
-        total_multiplier = (lighting_multiplier + population_multiplier + traffic_multiplier + main_road_multiplier) / 4
-        
-        final_safety_score = min(100, base_safety_score * total_multiplier)
-        
-        crime_density_score = 100 - min(100, avg_crime * 10)
-        
-        return {
-            'safety_score': round(final_safety_score, 2),
-            'crime_density': round(avg_crime, 2),
-            'max_crime_exposure': round(max_crime_at_point, 2),
-            'crime_hotspot_percentage': round(crime_hotspot_pct, 2),
-            'lighting_score': round(avg_lighting, 2),
-            'population_score': round(avg_population, 2),
-            'traffic_score': round(avg_traffic, 2),
-            'main_road_percentage': round(main_road_pct, 2),
-            'crime_density_score': round(crime_density_score, 2)
-        }
-        
-    except Exception as e:
-        print(f"❌ Error calculating safety: {e}")
-        return None
-
-def get_route_from_osrm(start_lat, start_lon, end_lat, end_lon, waypoint=None):
-    try:
-        if not all(validate_coordinates(x, y) for x, y in [(start_lat, start_lon), (end_lat, end_lon)]):
-            return None
-        
-        if waypoint:
-            url = f"http://router.project-osrm.org/route/v1/driving/{start_lon},{start_lat};{waypoint['lon']},{waypoint['lat']};{end_lon},{end_lat}"
-        else:
-            url = f"http://router.project-osrm.org/route/v1/driving/{start_lon},{start_lat};{end_lon},{end_lat}"
-        
-        params = {
-            'overview': 'full',
-            'geometries': 'geojson',
-            'alternatives': 'true',
-            'steps': 'true'
-        }
-        
-        response = requests.get(url, params=params, timeout=10)
-        data = response.json()
-        
-        if data['code'] != 'Ok':
-            return None
-        
-        routes = []
-        for route_data in data.get('routes', []):
-            if 'geometry' not in route_data:
-                continue
-            
-            coordinates = route_data['geometry']['coordinates']
-            if not coordinates or len(coordinates) < 2:
-                continue
-            
-            route = [[coord[1], coord[0]] for coord in coordinates]
-            
-            start_dist = haversine_distance(start_lat, start_lon, route[0][0], route[0][1])
-            end_dist = haversine_distance(end_lat, end_lon, route[-1][0], route[-1][1])
-            
-            if start_dist > 0.2 or end_dist > 0.2:
-                continue
-            
-            # Extract turn-by-turn instructions from OSRM
-            steps = []
-            if 'legs' in route_data:
-                step_number = 1
-                for leg in route_data['legs']:
-                    if 'steps' in leg:
-                        for step in leg['steps']:
-                            if 'maneuver' in step:
-                                instruction = step['maneuver'].get('instruction', step.get('name', 'Continue'))
-                                distance = step.get('distance', 0)
-                                steps.append({
-                                    'number': step_number,
-                                    'instruction': instruction,
-                                    'distance': round(distance, 1),
-                                    'distance_text': f"{distance:.0f}m" if distance < 1000 else f"{distance/1000:.1f}km"
-                                })
-                                step_number += 1
-            
-            routes.append({
-                'route': route,
-                'distance_km': route_data['distance'] / 1000,
-                'duration_min': route_data['duration'] / 60,
-                'waypoint': waypoint,
-                'steps': steps
-            })
-        
-        return routes
-        
-    except Exception as e:
-        print(f"❌ OSRM error: {e}")
-        return None
-
+from app.cities import CITIES, city_for_point, get_city
+from app.osrm import (
+    OSRM_FANOUT_DEADLINE, OSRM_URL, RouteFanout, fetch_routes_concurrently, osrm_response_cache, submit_to_pool
+)
+from app.polyline import GEOMETRY_FORMATS, encode_polyline
+from app.personalization import get_user_profile, invalidate_user_profile, user_profile_cache
+from app.route_dedup import RouteDeduplicator
+from app.waypoints import WAYPOINT_STRATEGY, crime_aware_waypoints, fixed_waypoints
+from app.route_optimizer import time_bucket_for
+from app.safety_engine import (
+    get_dataset, loaded_datasets, live_crime_index, route_safety_cache,
+    calculate_route_hash, calculate_route_safety_comprehensive,
+    calculate_routes_safety_batch, ingest_incidents, poll_dataset_changes, poll_live_incidents, reload_datasets_async,
+    local_route_searches, ROUTING_ENGINE
+)
+
+# Parse the default city's data at import so gunicorn --preload shares it across
+# workers; other cities load on their first request
+get_dataset()
+
+@bp.before_app_request
+def _poll_safety_data():
+    # Rate-limited mtime check; a changed city dataset is rebuilt in the background
+    poll_dataset_changes()
+    # Incidents reported through other workers
+    poll_live_incidents()
+
+def _request_city():
+    """City for a request: ?city=<slug>, else the one containing ?lat/?lon or the ?bbox centre, else the default"""
+    city = get_city(request.args['city']) if request.args.get('city') else None
+    if city is None and request.args.get('lat') and request.args.get('lon'):
+        city = city_for_point(request.args['lat'], request.args['lon'])
+    if city is None and request.args.get('bbox'):
+        try:
+            min_lat, min_lon, max_lat, max_lon = map(float, request.args['bbox'].split(','))
+            city = city_for_point((min_lat + max_lat) / 2, (min_lon + max_lon) / 2)
+        except ValueError:
+            pass
+    return city or get_city()
+
+# Optional time_budget_ms of /api/optimize-route is clamped to
+# [MIN_TIME_BUDGET_MS, OSRM_FANOUT_DEADLINE]; the OSRM fan-out stops early enough
+# to leave SCORING_RESERVE_SECONDS for scoring and ranking what arrived
+MIN_TIME_BUDGET_MS = 500
+SCORING_RESERVE_SECONDS = 0.25
+# Most waypoint detour routes scored per request (direct and local routes always are)
+MAX_WAYPOINT_ROUTES = 25
+
+# Route optimization helpers (OSRM access lives in app/osrm.py, scoring in app/safety_engine.py,
+# kernels in app/route_optimizer.py)
 def calculate_composite_score(route, preferences):
     safety_weight = preferences.get('safety_weight', 0.7)
     distance_weight = preferences.get('distance_weight', 0.3)
@@ -1937,48 +1808,6 @@ def calculate_composite_score(route, preferences):
     
     return composite_score
 
-# Load safety data (robust to current working directory)
-try:
-    APP_DIR = os.path.dirname(os.path.abspath(__file__))
-    DATA_DIR = os.path.join(APP_DIR, 'data')
-    crime_data = pd.read_csv(os.path.join(DATA_DIR, 'bangalore_crimes.csv'))
-    lighting_data = pd.read_csv(os.path.join(DATA_DIR, 'bangalore_lighting.csv'))
-    population_data = pd.read_csv(os.path.join(DATA_DIR, 'bangalore_population.csv'))
-    print(f"✅ Loaded {len(crime_data)} crime records")
-    print(f"✅ Loaded {len(lighting_data)} lighting points")
-    print(f"✅ Loaded {len(population_data)} population points")
-except Exception as e:
-    print(f"⚠️ Warning: Could not load safety data: {e}")
-    crime_data = pd.DataFrame()
-    lighting_data = pd.DataFrame()
-    population_data = pd.DataFrame()
-
-def haversine_distance(lat1, lon1, lat2, lon2):
-    """Calculate distance between two points in km"""
-    try:
-        lat1, lon1, lat2, lon2 = map(radians, [float(lat1), float(lon1), float(lat2), float(lon2)])
-        dlat = lat2 - lat1
-        dlon = lon2 - lon1
-        a = sin(dlat/2)**2 + cos(lat1) * cos(lat2) * sin(dlon/2)**2
-        c = 2 * asin(sqrt(a))
-        return c * 6371
-    except:
-        return 0
-
-def calculate_crime_exposure(lat, lon, radius=0.003):
-    """Calculate crime exposure at a location"""
-    try:
-        if crime_data.empty:
-            return 0
-        nearby_crimes = crime_data[
-            (abs(crime_data['Latitude'] - lat) < radius) &
-            (abs(crime_data['Longitude'] - lon) < radius)
-        ]
-        return len(nearby_crimes)
-    except:
-        return 0
-
-
 @bp.route('/safe-routes')
 def safe_routes():
     """Render full-featured Safe Routes page with navbar."""
@@ -2006,13 +1835,12 @@ def api_geocode():
         # Use OpenStreetMap Nominatim for geocoding
         url = 'https://nominatim.openstreetmap.org/search'
         params = {
-            'q': f"{address}, Bangalore, Karnataka, India",
+            'q': f"{address}, {_request_city().geocode_suffix}",
             'format': 'json',
             'limit': 1
         }
-        headers = {'User-Agent': 'SafeSpace-WomenSafety/1.0'}
         
-        response = requests.get(url, params=params, headers=headers, timeout=10)
+        response = http_get('nominatim', url, params=params)
         
         if response.status_code == 200:
             data = response.json()
@@ -2045,14 +1873,14 @@ def api_calculate_route():
         preferences = data.get('preferences', {})
         
         # Get route from OSRM (OpenStreetMap Routing Machine)
-        url = f'http://router.project-osrm.org/route/v1/driving/{start_lon},{start_lat};{end_lon},{end_lat}'
+        url = f'{OSRM_URL}/route/v1/driving/{start_lon},{start_lat};{end_lon},{end_lat}'
         params = {
             'overview': 'full',
             'geometries': 'geojson',
             'steps': 'true'
         }
         
-        response = requests.get(url, params=params, timeout=15)
+        response = http_get('osrm', url, params=params, timeout=15)
         
         if response.status_code != 200:
             return jsonify({'error': 'Route calculation failed'}), 500
@@ -2074,13 +1902,7 @@ def api_calculate_route():
         duration_min = int(route['duration'] / 60)
         
         # Calculate safety using comprehensive scoring
-        safety_details = calculate_route_safety_comprehensive(
-            route_coords,
-            crime_data,
-            lighting_data,
-            population_data,
-            preferences={},
-        )
+        safety_details = calculate_route_safety_comprehensive(route_coords, preferences)
         # Scale to 0-10 for backward compatibility with simple UI
         safety_score = None
         if safety_details and 'safety_score' in safety_details:
@@ -2109,13 +1931,12 @@ def api_search_place():
     try:
         url = 'https://nominatim.openstreetmap.org/search'
         params = {
-            'q': f"{q}, Bangalore, Karnataka, India",
+            'q': f"{q}, {_request_city().geocode_suffix}",
             'format': 'json',
             'limit': 5,
             'addressdetails': 1
         }
-        headers = {'User-Agent': 'SafeSpace-WomenSafety/1.0'}
-        resp = requests.get(url, params=params, headers=headers, timeout=10)
+        resp = http_get('nominatim', url, params=params)
         items = []
         if resp.status_code == 200:
             data = resp.json()
@@ -2147,8 +1968,7 @@ def api_reverse_geocode():
             'lon': lonf,
             'format': 'json'
         }
-        headers = {'User-Agent': 'SafeSpace-WomenSafety/1.0'}
-        resp = requests.get(url, params=params, headers=headers, timeout=10)
+        resp = http_get('nominatim', url, params=params)
         if resp.status_code == 200:
             data = resp.json()
             return jsonify({'success': True, 'address': data.get('display_name')})
@@ -2157,365 +1977,413 @@ def api_reverse_geocode():
         print(f"reverse-geocode error: {e}")
         return jsonify({'success': False, 'error': 'Reverse geocoding failed'}), 500
 
-def _filter_bbox(df, bbox):
-    if df is None or df.empty:
-        return df
+def _bbox_mask(table, bbox):
+    """Row mask for a 'min_lat,min_lon,max_lat,max_lon' query arg (None = no filter)"""
+    if not bbox:
+        return None
+    parts = bbox.split(',')
+    if len(parts) != 4:
+        return None
     try:
-        min_lat, min_lon, max_lat, max_lon = map(float, bbox)
-        return df[(df['Latitude'] >= min_lat) & (df['Latitude'] <= max_lat) & (df['Longitude'] >= min_lon) & (df['Longitude'] <= max_lon)]
+        return table.bbox_mask(*map(float, parts))
     except Exception:
-        return df
+        return None
 
 @bp.route('/api/crime-heatmap')
 def api_crime_heatmap():
-    bbox = request.args.get('bbox')
-    df = crime_data
-    if bbox:
-        parts = bbox.split(',')
-        if len(parts) == 4:
-            df = _filter_bbox(df, parts)
-    if df is None or df.empty:
+    crime_data = get_dataset(_request_city()).crime_data
+    if len(crime_data) == 0:
         return jsonify({'success': True, 'total_crimes': 0, 'data': []})
-    # Convert to list of [lat, lon]
-    subset = df[['Latitude','Longitude']].head(2000)
-    data = [[float(row['Latitude']), float(row['Longitude'])] for _, row in subset.iterrows()]
+    # List of [lat, lon]
+    data = crime_data.rows(('Latitude', 'Longitude'), _bbox_mask(crime_data, request.args.get('bbox')), limit=2000)
     return jsonify({'success': True, 'total_crimes': len(data), 'data': data})
 
 @bp.route('/api/lighting-heatmap')
 def api_lighting_heatmap():
-    bbox = request.args.get('bbox')
-    df = lighting_data
-    if bbox:
-        parts = bbox.split(',')
-        if len(parts) == 4:
-            df = _filter_bbox(df, parts)
-    if df is None or df.empty:
+    lighting_data = get_dataset(_request_city()).lighting_data
+    if len(lighting_data) == 0:
         return jsonify({'success': True, 'total_locations': 0, 'data': []})
-    subset = df[['Latitude','Longitude','lighting_score']].head(5000)
-    data = [[float(r['Latitude']), float(r['Longitude']), float(r['lighting_score'])] for _, r in subset.iterrows()]
+    data = lighting_data.rows(('Latitude', 'Longitude', 'lighting_score'),
+                              _bbox_mask(lighting_data, request.args.get('bbox')), limit=5000)
     return jsonify({'success': True, 'total_locations': len(data), 'data': data})
 
 @bp.route('/api/population-heatmap')
 def api_population_heatmap():
-    bbox = request.args.get('bbox')
-    df = population_data
-    if bbox:
-        parts = bbox.split(',')
-        if len(parts) == 4:
-            df = _filter_bbox(df, parts)
-    if df is None or df.empty:
+    population_data = get_dataset(_request_city()).population_data
+    if len(population_data) == 0:
         return jsonify({'success': True, 'total_locations': 0, 'data': []})
-    cols = ['Latitude','Longitude','population_density','traffic_level','is_main_road']
-    subset = df[cols].head(5000)
-    data = [
-        [float(r['Latitude']), float(r['Longitude']), float(r['population_density']), float(r['traffic_level']), int(r['is_main_road'])]
-        for _, r in subset.iterrows()
-    ]
+    cols = ('Latitude', 'Longitude', 'population_density', 'traffic_level', 'is_main_road')
+    rows = population_data.rows(cols, _bbox_mask(population_data, request.args.get('bbox')), limit=5000)
+    data = [[lat, lon, density, traffic, int(main_road)] for lat, lon, density, traffic, main_road in rows]
     return jsonify({'success': True, 'total_locations': len(data), 'data': data})
 
-@bp.route('/api/optimize-route', methods=['POST'])
-def api_optimize_route():
-    """Enhanced route optimization with crime-aware waypoint generation and comprehensive safety scoring"""
+def _parse_optimize_request(data):
+    """Coordinates, preferences, city and time budget of an optimize-route request (ValueError if invalid)"""
     print("\n" + "="*60)
     print("=== OPTIMIZED ROUTE CALCULATION ===")
     print("="*60)
-    
+    if not all(k in data for k in ('start_lat', 'start_lon', 'end_lat', 'end_lon')):
+        raise ValueError('Missing coordinates')
+
+    try:
+        req = {k: float(data.get(k)) for k in ('start_lat', 'start_lon', 'end_lat', 'end_lon')}
+    except (TypeError, ValueError):
+        raise ValueError('Invalid coordinates')
+
     try:
-        data = request.json or {}
-        if not all(k in data for k in ('start_lat', 'start_lon', 'end_lat', 'end_lon')):
-            return jsonify({'success': False, 'error': 'Missing coordinates'}), 400
+        safety_weight = float(data.get('safety_weight', 0.7))
+        distance_weight = float(data.get('distance_weight', 0.3))
+    except (TypeError, ValueError):
+        raise ValueError('Invalid safety_weight or distance_weight')
+
+    req['preferences'] = preferences = {
+        'prefer_main_roads': bool(data.get('prefer_main_roads', False)),
+        'prefer_well_lit': bool(data.get('prefer_well_lit', False)),
+        'prefer_populated': bool(data.get('prefer_populated', False)),
+        'safety_weight': safety_weight,
+        'distance_weight': distance_weight,
+        # Optional departure time ("HH:MM" or ISO datetime) selects a time-of-day crime bucket
+        'time_bucket': time_bucket_for(data.get('departure_time'))
+    }
 
+    # Optional latency budget: return the best routes scored by then instead of waiting for every request
+    req['time_budget_ms'] = time_budget_ms = None
+    if data.get('time_budget_ms') is not None:
         try:
-            start_lat = float(data.get('start_lat'))
-            start_lon = float(data.get('start_lon'))
-            end_lat = float(data.get('end_lat'))
-            end_lon = float(data.get('end_lon'))
+            req['time_budget_ms'] = time_budget_ms = min(max(int(data['time_budget_ms']), MIN_TIME_BUDGET_MS),
+                                                         int(OSRM_FANOUT_DEADLINE * 1000))
         except (TypeError, ValueError):
-            return jsonify({'success': False, 'error': 'Invalid coordinates'}), 400
-
-        preferences = {
-            'prefer_main_roads': bool(data.get('prefer_main_roads', False)),
-            'prefer_well_lit': bool(data.get('prefer_well_lit', False)),
-            'prefer_populated': bool(data.get('prefer_populated', False)),
-            'safety_weight': float(data.get('safety_weight', 0.7)),
-            'distance_weight': float(data.get('distance_weight', 0.3))
-        }
-        
-        print(f"\nRequest:")
-        print(f"  Start: ({start_lat:.5f}, {start_lon:.5f})")
-        print(f"  End: ({end_lat:.5f}, {end_lon:.5f})")
-        print(f"  Safety weight: {preferences['safety_weight']:.2f}")
-        print(f"  Distance weight: {preferences['distance_weight']:.2f}")
-        print(f"  Main roads: {preferences['prefer_main_roads']}")
-        print(f"  Well lit: {preferences['prefer_well_lit']}")
-        print(f"  Populated: {preferences['prefer_populated']}")
-        
-        # Validate coordinates within Bangalore
-        BANGALORE_BOUNDS = {
-            'min_lat': 12.704192, 'max_lat': 13.173706,
-            'min_lon': 77.269876, 'max_lon': 77.850066
-        }
-        
-        if not all(BANGALORE_BOUNDS['min_lat'] <= lat <= BANGALORE_BOUNDS['max_lat'] and
-                   BANGALORE_BOUNDS['min_lon'] <= lon <= BANGALORE_BOUNDS['max_lon']
-                   for lat, lon in [(start_lat, start_lon), (end_lat, end_lon)]):
-            return jsonify({'success': False, 'error': 'Coordinates outside Bangalore'}), 400
-        
-        all_routes = []
-        route_hashes = set()
-        
-        print("\n--- Phase 1: Direct Routes ---")
-        direct_routes = get_route_from_osrm(start_lat, start_lon, end_lat, end_lon, waypoint=None)
-        
-        if direct_routes:
-            print(f"OSRM returned {len(direct_routes)} direct alternatives")
-            for idx, route_data in enumerate(direct_routes):
-                route_hash = calculate_route_hash(route_data['route'])
-                if route_hash and route_hash not in route_hashes:
-                    safety = calculate_route_safety_comprehensive(
-                        route_data['route'],
-                        preferences
-                    )
-                    if safety:
-                        route_data.update(safety)
-                        route_data['route_hash'] = route_hash
-                        route_data['source'] = f'direct_{idx+1}'
-                        route_data['type'] = 'direct'
-                        all_routes.append(route_data)
-                        route_hashes.add(route_hash)
-                        print(f"✅ Direct route {idx+1}: {route_data['distance_km']:.2f}km, safety={safety['safety_score']:.1f}, crime={safety['crime_density']:.1f}")
-        
-        print("\n--- Phase 2: Strategic Waypoint Exploration ---")
-        
-        base_distance = haversine_distance(start_lat, start_lon, end_lat, end_lon)
-        
-        lat_diff = end_lat - start_lat
-        lon_diff = end_lon - start_lon
-        
-        perp_lat = -lon_diff
-        perp_lon = lat_diff
-        perp_magnitude = sqrt(perp_lat**2 + perp_lon**2)
-        
-        if perp_magnitude > 0:
-            perp_lat /= perp_magnitude
-            perp_lon /= perp_magnitude
-        
-        positions = [0.25, 0.5, 0.75]
-        offset_distances_km = [0.5, 1.2, 2.5]
-        offsets = [d / 111.0 for d in offset_distances_km]
-        directions = [1, -1]
-        
-        waypoint_count = 0
-        max_waypoints = 25
-        
-        for position in positions:
-            if waypoint_count >= max_waypoints:
-                break
-                
-            for offset in offsets:
-                if waypoint_count >= max_waypoints:
-                    break
-                    
-                for direction in directions:
-                    if waypoint_count >= max_waypoints:
-                        break
-                    
-                    mid_lat = start_lat + lat_diff * position
-                    mid_lon = start_lon + lon_diff * position
-                    
-                    wp_lat = mid_lat + perp_lat * offset * direction
-                    wp_lon = mid_lon + perp_lon * offset * direction
-                    
-                    # Validate waypoint coordinates
-                    if not (BANGALORE_BOUNDS['min_lat'] <= wp_lat <= BANGALORE_BOUNDS['max_lat'] and
-                            BANGALORE_BOUNDS['min_lon'] <= wp_lon <= BANGALORE_BOUNDS['max_lon']):
-                        continue
-                    
-                    wp_dist = (haversine_distance(start_lat, start_lon, wp_lat, wp_lon) + 
-                             haversine_distance(wp_lat, wp_lon, end_lat, end_lon))
-                    detour_ratio = wp_dist / base_distance if base_distance > 0 else 999
-                    
-                    if detour_ratio > 1.8:
-                        continue
-                    
-                    waypoint_routes = get_route_from_osrm(start_lat, start_lon, end_lat, end_lon, 
-                                                         waypoint={'lat': wp_lat, 'lon': wp_lon})
-                    
-                    if waypoint_routes:
-                        for route_data in waypoint_routes:
-                            route_hash = calculate_route_hash(route_data['route'])
-                            
-                            if route_hash and route_hash not in route_hashes:
-                                safety = calculate_route_safety_comprehensive(
-                                    route_data['route'],
-                                    preferences
-                                )
-                                if safety:
-                                    route_data.update(safety)
-                                    route_data['route_hash'] = route_hash
-                                    route_data['source'] = f'waypoint_{waypoint_count}'
-                                    route_data['type'] = 'waypoint'
-                                    all_routes.append(route_data)
-                                    route_hashes.add(route_hash)
-                                    waypoint_count += 1
-                                    
-                                    if waypoint_count >= max_waypoints:
-                                        break
-        
-        print(f"Waypoint routes added: {waypoint_count}")
-        print(f"\nTotal routes collected: {len(all_routes)}")
-        
-        if len(all_routes) == 0:
-            return jsonify({'success': False, 'error': 'No valid routes found'}), 404
-        
-        print("\n--- Phase 3: Preference-Based Scoring (with personalization) ---")
-        
-        # Load user preferences if available and override incoming weights
-        liked_hashes = set()
+            raise ValueError('Invalid time_budget_ms')
+
+    # Optional compact geometry: "polyline"/"polyline6" send each route as an encoded polyline string
+    req['geometry_format'] = str(data.get('geometry_format') or 'json').lower()
+    if req['geometry_format'] not in GEOMETRY_FORMATS:
+        raise ValueError('Invalid geometry_format')
+    
+    print(f"\nRequest:")
+    print(f"  Start: ({req['start_lat']:.5f}, {req['start_lon']:.5f})")
+    print(f"  End: ({req['end_lat']:.5f}, {req['end_lon']:.5f})")
+    print(f"  Safety weight: {preferences['safety_weight']:.2f}")
+    print(f"  Distance weight: {preferences['distance_weight']:.2f}")
+    print(f"  Main roads: {preferences['prefer_main_roads']}")
+    print(f"  Well lit: {preferences['prefer_well_lit']}")
+    print(f"  Populated: {preferences['prefer_populated']}")
+    print(f"  Time bucket: {preferences['time_bucket'] or 'any'}")
+    print(f"  Time budget: {f'{time_budget_ms}ms' if time_budget_ms else 'none'}")
+    
+    # Both ends must lie in the same served city
+    city = city_for_point(req['start_lat'], req['start_lon'])
+    if city is None or not city.contains(req['end_lat'], req['end_lon']):
+        raise ValueError('Coordinates outside supported cities')
+    print(f"  City: {city.name}")
+    req['city'] = city
+    return req
+
+def _plan_candidates(req, started):
+    """Phases 1-2: start the local road graph searches and pick the waypoints worth an OSRM call.
+
+    Returns ``(deadline_at, local_futures, local_routes, waypoints)``. With
+    ROUTING_ENGINE=local the searches are awaited here (``local_routes``, None
+    otherwise), and when they found a route OSRM is skipped, so no waypoints
+    are planned.
+    """
+    deadline_at = time.monotonic() + _fanout_deadline(req, started)
+    local_futures = _start_local_searches(req, deadline_at)
+    local_routes = None
+    if ROUTING_ENGINE == 'local':
+        local_routes = _local_results(local_futures, deadline_at)
+        if _skip_osrm(local_routes):
+            print("\n--- Phase 2: Strategic Waypoint Selection ---")
+            print("Skipped (ROUTING_ENGINE=local)")
+            return deadline_at, local_futures, local_routes, []
+    waypoints = _plan_waypoints(req)
+    if local_routes is not None:
+        # OSRM is only the fallback, so its fan-out gets what is left of the budget
+        deadline_at = time.monotonic() + _fanout_deadline(req, started)
+    return deadline_at, local_futures, local_routes, waypoints
+
+def _plan_waypoints(req):
+    start_lat, start_lon, end_lat, end_lon = req['start_lat'], req['start_lon'], req['end_lat'], req['end_lon']
+    print("\n--- Phase 2: Strategic Waypoint Selection ---")
+    if WAYPOINT_STRATEGY == 'fixed':
+        waypoints = fixed_waypoints(start_lat, start_lon, end_lat, end_lon, req['city'])
+    else:
+        # Only the safest cells around the corridor are worth an OSRM call
+        waypoints = crime_aware_waypoints(start_lat, start_lon, end_lat, end_lon, req['city'],
+                                          get_dataset(req['city']), req['preferences'], live_crime_index)
+    print(f"Waypoints to explore: {len(waypoints)}")
+    return waypoints
+
+def _start_local_searches(req, deadline_at):
+    """Submit the road graph searches to the fan-out pool; returns their futures in weight order"""
+    print("\n--- Phase 1: Local Road Graph ---")
+    # Safety-weighted paths computed in-process (only when the city has a road graph),
+    # concurrently with the OSRM requests
+    searches = local_route_searches(req['start_lat'], req['start_lon'], req['end_lat'], req['end_lon'],
+                                    req['preferences'])
+    print(f"Local road graph searches: {len(searches)}")
+    return [submit_to_pool(search, deadline_at) for search in searches]
+
+def _local_results(futures, deadline_at):
+    """Routes of the local searches in weight order, waiting for unfinished ones until ``deadline_at``"""
+    routes = []
+    for future in futures:
         try:
-            if session.get('user_id'):
-                prefs = UserPreference.query.filter_by(user_id=session['user_id']).first()
-                if prefs:
-                    preferences['safety_weight'] = float(prefs.safety_weight or preferences['safety_weight'])
-                    preferences['distance_weight'] = float(prefs.distance_weight or preferences['distance_weight'])
-                    preferences['prefer_main_roads'] = bool(prefs.prefer_main_roads)
-                    preferences['prefer_well_lit'] = bool(prefs.prefer_well_lit)
-                    preferences['prefer_populated'] = bool(prefs.prefer_populated)
-                # Collect positively-rated route hashes for a small history bonus
-                rows = RouteFeedback.query.filter_by(user_id=session['user_id']).order_by(RouteFeedback.created_at.desc()).limit(100).all()
-                liked_hashes = {r.route_hash for r in rows if (r.rating or 0) >= 4 and r.route_hash}
-        except Exception as _:
-            pass
+            route = future.result(timeout=max(deadline_at - time.monotonic(), 0))
+        except Exception as e:
+            future.cancel()
+            print(f"⚠️ Local routing skipped: {e or 'deadline reached'}")
+            continue
+        if route:
+            routes.append(route)
+    print(f"Local road graph routes: {len(routes)}")
+    return routes
+
+def _skip_osrm(local_routes):
+    return ROUTING_ENGINE == 'local' and bool(local_routes)
+
+def _fanout_deadline(req, started):
+    if not req['time_budget_ms']:
+        return OSRM_FANOUT_DEADLINE
+    # What is left of the budget after the earlier phases, minus time to score the results
+    return max(req['time_budget_ms'] / 1000 - (time.monotonic() - started) - SCORING_RESERVE_SECONDS, 0)
+
+def _encode_geometry(route, geometry_format):
+    # The [lat, lon] list becomes 'polyline' in the compact formats
+    precision = GEOMETRY_FORMATS[geometry_format]
+    if precision is not None and route.get('route') is not None:
+        route['polyline'] = encode_polyline(route.pop('route'), precision)
+    return route
+
+def _merge_candidates(direct_routes, local_routes, waypoint_results):
+    """Unique candidates in direct -> local -> waypoint order, labelled with their source"""
+    candidates = []
+    # Near-identical geometry counts as the same route, whatever the vertex count or hash
+    dedup = RouteDeduplicator()
+    
+    if direct_routes:
+        print(f"OSRM returned {len(direct_routes)} direct alternatives")
+        for idx, route_data in enumerate(direct_routes):
+            route_hash = calculate_route_hash(route_data['route'])
+            if route_hash and dedup.add(route_data['route']):
+                route_data['route_hash'] = route_hash
+                route_data['source'] = f'direct_{idx+1}'
+                route_data['type'] = 'direct'
+                candidates.append(route_data)
+
+    for idx, route_data in enumerate(local_routes):
+        route_hash = calculate_route_hash(route_data['route'])
+        if route_hash and dedup.add(route_data['route']):
+            route_data['route_hash'] = route_hash
+            route_data['source'] = f'local_{idx+1}'
+            route_data['type'] = 'local'
+            candidates.append(route_data)
+
+    waypoint_count = 0
+
+    # Merged in waypoint order, so numbering and dedup don't depend on arrival order
+    for waypoint_routes in waypoint_results:
+        if waypoint_count >= MAX_WAYPOINT_ROUTES:
+            break
+        for route_data in waypoint_routes or []:
+            route_hash = calculate_route_hash(route_data['route'])
+
+            if route_hash and dedup.add(route_data['route']):
+                route_data['route_hash'] = route_hash
+                route_data['source'] = f'waypoint_{waypoint_count}'
+                route_data['type'] = 'waypoint'
+                candidates.append(route_data)
+                waypoint_count += 1
+
+                if waypoint_count >= MAX_WAYPOINT_ROUTES:
+                    break
 
-        for route in all_routes:
-            base = calculate_composite_score(route, preferences)
-            bonus = 0.0
-            try:
-                if route.get('route_hash') and route['route_hash'] in liked_hashes:
-                    bonus += 0.15
-                # Proximity bonus for similar endpoints to previously liked routes
-                if session.get('user_id'):
-                    prox = db.session.execute(text(
-                        """
-                        SELECT 1 FROM route_feedback
-                         WHERE user_id = :uid AND rating >= 4
-                           AND ABS(start_lat - :slat) < 0.01 AND ABS(start_lon - :slon) < 0.01
-                           AND ABS(end_lat - :elat) < 0.01 AND ABS(end_lon - :elon) < 0.01
-                         LIMIT 1
-                        """),
-                        {
-                            'uid': session['user_id'],
-                            'slat': float(start_lat), 'slon': float(start_lon),
-                            'elat': float(end_lat), 'elon': float(end_lon)
-                        }
-                    ).first()
-                    if prox:
-                        bonus += 0.1
-            except Exception:
-                pass
-            route['composite_score'] = base + bonus
-        
-        all_routes.sort(key=lambda x: x['composite_score'], reverse=True)
-        
-        final_routes = all_routes[:7]
-        print(f"Final routes to display: {len(final_routes)}")
-        
-        # Track which categories have been assigned to avoid duplicates
-        assigned_categories = set()
-        min_distance = min(r['distance_km'] for r in final_routes)
-        min_crime = min(r['crime_density'] for r in final_routes)
-        
-        for idx, route in enumerate(final_routes):
-            route['rank'] = idx + 1
-            route['is_recommended'] = (idx == 0)
-            
-            # Assign unique category to each route
-            if idx == 0:
-                category = 'best'
-                description = 'Best match for your preferences'
-            elif 'safest' not in assigned_categories and route['crime_density'] <= 1.5 and route['max_crime_exposure'] <= 3:
-                category = 'safest'
-                description = 'Safest route (avoids crime hotspots)'
-            elif 'fastest' not in assigned_categories and route['distance_km'] <= min_distance * 1.02:
-                category = 'fastest'
-                description = 'Shortest distance'
-            elif 'main_roads' not in assigned_categories and route['main_road_percentage'] >= 70:
-                category = 'main_roads'
-                description = 'Uses main roads'
-            elif 'well_lit' not in assigned_categories and route.get('lighting_score', 0) >= 7.5:
-                category = 'well_lit'
-                description = 'Well-lit route'
-            elif 'populated' not in assigned_categories and route.get('population_score', 0) >= 6:
-                category = 'populated'
-                description = 'Populated areas'
-            else:
-                # Give each route a unique descriptor based on its characteristics
-                if route['crime_density'] <= min_crime * 1.2:
-                    category = 'low_crime'
-                    description = f"Low crime route ({route['crime_density']:.1f} incidents)"
-                elif route['distance_km'] <= min_distance * 1.15:
-                    category = 'short'
-                    description = f"Short route ({route['distance_km']:.1f}km)"
-                elif route['main_road_percentage'] >= 50:
-                    category = 'major_roads'
-                    description = f"Major roads ({route['main_road_percentage']:.0f}%)"
-                else:
-                    category = 'alternative'
-                    description = f"Alternative route"
-            
-            assigned_categories.add(category)
-            route['category'] = category
-            route['description'] = description
-            route['distance_display'] = f"{route['distance_km']:.2f} km"
-            route['duration_display'] = f"{int(route['duration_min'])} min"
-            route['safety_display'] = f"{route['safety_score']:.0f}/100"
-            
-            reasons = []
-            
-            if route.get('crime_density', 5) <= 1:
-                reasons.append("Very low crime area")
-            elif route.get('crime_density', 5) <= 2:
-                reasons.append("Low crime density")
-            elif route.get('crime_density', 5) > 4:
-                reasons.append(f"Crime density: {route['crime_density']:.1f}")
-            
-            if route.get('max_crime_exposure', 0) <= 2:
-                reasons.append("No crime hotspots")
-            elif route.get('max_crime_exposure', 0) <= 5:
-                reasons.append("Minimal crime exposure")
-            else:
-                reasons.append(f"Max crime exposure: {route['max_crime_exposure']:.0f}")
-            
-            if route.get('main_road_percentage', 0) > 70:
-                reasons.append(f"{route['main_road_percentage']:.0f}% main roads")
-            if route.get('lighting_score', 0) > 7.5:
-                reasons.append("Well-lit area")
-            if route.get('population_score', 0) > 6:
-                reasons.append("Populated area")
-            
-            route['reasons'] = reasons
-            
-            if route.get('max_crime_exposure', 0) > 8 or route.get('crime_density', 0) > 5:
-                route['warning'] = "High crime exposure"
-            elif route.get('max_crime_exposure', 0) > 5 or route.get('crime_density', 0) > 3:
-                route['warning'] = "Moderate crime exposure"
+    print(f"Waypoint routes added: {waypoint_count}")
+    print(f"Near-duplicate routes dropped: {dedup.dropped}")
+    return candidates
+
+def _rank_routes(all_routes, req):
+    """Phase 4: personalised composite ranking of the scored routes, top 7 with categories and reasons"""
+    preferences = req['preferences']
+    print("\n--- Phase 4: Preference-Based Scoring (with personalization) ---")
+
+    # Saved preferences override the request's weights; liked routes and trips earn a bonus
+    profile = get_user_profile(session.get('user_id'))
+    profile.apply_preferences(preferences)
+    bonuses = profile.route_bonuses(all_routes, req['start_lat'], req['start_lon'], req['end_lat'], req['end_lon'])
+    for route, bonus in zip(all_routes, bonuses):
+        route['composite_score'] = calculate_composite_score(route, preferences) + bonus
+
+    all_routes.sort(key=lambda x: x['composite_score'], reverse=True)
+
+    final_routes = all_routes[:7]
+    print(f"Final routes to display: {len(final_routes)}")
+
+    # Track which categories have been assigned to avoid duplicates
+    assigned_categories = set()
+    min_distance = min(r['distance_km'] for r in final_routes)
+    min_crime = min(r['crime_density'] for r in final_routes)
+
+    for idx, route in enumerate(final_routes):
+        route['rank'] = idx + 1
+        route['is_recommended'] = (idx == 0)
+
+        # Assign unique category to each route
+        if idx == 0:
+            category = 'best'
+            description = 'Best match for your preferences'
+        elif 'safest' not in assigned_categories and route['crime_density'] <= 1.5 and route['max_crime_exposure'] <= 3:
+            category = 'safest'
+            description = 'Safest route (avoids crime hotspots)'
+        elif 'fastest' not in assigned_categories and route['distance_km'] <= min_distance * 1.02:
+            category = 'fastest'
+            description = 'Shortest distance'
+        elif 'main_roads' not in assigned_categories and route['main_road_percentage'] >= 70:
+            category = 'main_roads'
+            description = 'Uses main roads'
+        elif 'well_lit' not in assigned_categories and route.get('lighting_score', 0) >= 7.5:
+            category = 'well_lit'
+            description = 'Well-lit route'
+        elif 'populated' not in assigned_categories and route.get('population_score', 0) >= 6:
+            category = 'populated'
+            description = 'Populated areas'
+        else:
+            # Give each route a unique descriptor based on its characteristics
+            if route['crime_density'] <= min_crime * 1.2:
+                category = 'low_crime'
+                description = f"Low crime route ({route['crime_density']:.1f} incidents)"
+            elif route['distance_km'] <= min_distance * 1.15:
+                category = 'short'
+                description = f"Short route ({route['distance_km']:.1f}km)"
+            elif route['main_road_percentage'] >= 50:
+                category = 'major_roads'
+                description = f"Major roads ({route['main_road_percentage']:.0f}%)"
             else:
-                route['warning'] = None
-            
-            route.pop('waypoint', None)
-            route.pop('composite_score', None)
-        
-        print("\n" + "="*60)
-        print(f"✅ Optimization complete: {len(final_routes)} routes")
-        print(f"Top route: Safety={final_routes[0]['safety_score']:.1f}, Distance={final_routes[0]['distance_km']:.2f}km, Crime={final_routes[0]['crime_density']:.1f}")
-        print("="*60 + "\n")
+                category = 'alternative'
+                description = f"Alternative route"
+
+        assigned_categories.add(category)
+        route['category'] = category
+        route['description'] = description
+        route['distance_display'] = f"{route['distance_km']:.2f} km"
+        route['duration_display'] = f"{int(route['duration_min'])} min"
+        route['safety_display'] = f"{route['safety_score']:.0f}/100"
+
+        reasons = []
+
+        if route.get('crime_density', 5) <= 1:
+            reasons.append("Very low crime area")
+        elif route.get('crime_density', 5) <= 2:
+            reasons.append("Low crime density")
+        elif route.get('crime_density', 5) > 4:
+            reasons.append(f"Crime density: {route['crime_density']:.1f}")
+
+        if route.get('max_crime_exposure', 0) <= 2:
+            reasons.append("No crime hotspots")
+        elif route.get('max_crime_exposure', 0) <= 5:
+            reasons.append("Minimal crime exposure")
+        else:
+            reasons.append(f"Max crime exposure: {route['max_crime_exposure']:.0f}")
+
+        if route.get('main_road_percentage', 0) > 70:
+            reasons.append(f"{route['main_road_percentage']:.0f}% main roads")
+        if route.get('lighting_score', 0) > 7.5:
+            reasons.append("Well-lit area")
+        if route.get('population_score', 0) > 6:
+            reasons.append("Populated area")
+
+        route['reasons'] = reasons
+
+        if route.get('max_crime_exposure', 0) > 8 or route.get('crime_density', 0) > 5:
+            route['warning'] = "High crime exposure"
+        elif route.get('max_crime_exposure', 0) > 5 or route.get('crime_density', 0) > 3:
+            route['warning'] = "Moderate crime exposure"
+        else:
+            route['warning'] = None
+
+        route.pop('waypoint', None)
+        route.pop('composite_score', None)
+
+    return final_routes
+
+def _optimize_result(req, osrm_results, local_routes, waypoints, osrm_skipped, started):
+    """Merge, score and rank the candidates; returns (response body, HTTP status)"""
+    candidates = _merge_candidates(osrm_results[0], local_routes, osrm_results[1:])
+    
+    print("\n--- Batch Safety Scoring ---")
+    all_routes = []
+    safety_results = calculate_routes_safety_batch([c['route'] for c in candidates], req['preferences'])
+    for route_data, safety in zip(candidates, safety_results):
+        if safety:
+            route_data.update(safety)
+            all_routes.append(route_data)
+            print(f"✅ {route_data['source']}: {route_data['distance_km']:.2f}km, safety={safety['safety_score']:.1f}, crime={safety['crime_density']:.1f}")
+    
+    print(f"\nTotal routes collected: {len(all_routes)}")
+    
+    if len(all_routes) == 0:
+        if req['time_budget_ms'] and osrm_skipped:
+            return {'success': False, 'error': 'No route found within the time budget'}, 504
+        return {'success': False, 'error': 'No valid routes found'}, 404
+    
+    final_routes = _rank_routes(all_routes, req)
+    
+    print("\n" + "="*60)
+    print(f"✅ Optimization complete: {len(final_routes)} routes")
+    print(f"Top route: Safety={final_routes[0]['safety_score']:.1f}, Distance={final_routes[0]['distance_km']:.2f}km, Crime={final_routes[0]['crime_density']:.1f}")
+    print("="*60 + "\n")
+    
+    response = {
+        'success': True,
+        'routes': final_routes,
+        'total_analyzed': len(all_routes),
+        'time_bucket': req['preferences']['time_bucket'],
+        'city': req['city'].slug,
+        'osrm_requests_skipped': len(osrm_skipped),
+        'message': f'Found {len(final_routes)} optimized routes'
+    }
+    if req['geometry_format'] != 'json':
+        for route in final_routes:
+            _encode_geometry(route, req['geometry_format'])
+        response['geometry_format'] = req['geometry_format']
+    if req['time_budget_ms']:
+        response['budget'] = {
+            'time_budget_ms': req['time_budget_ms'],
+            'elapsed_ms': int((time.monotonic() - started) * 1000),
+            'direct_skipped': 0 in osrm_skipped,
+            'waypoints_skipped': sum(1 for i in osrm_skipped if i > 0),
+            'waypoints_total': len(waypoints),
+            'partial': bool(osrm_skipped)
+        }
+    return response, 200
+
+@bp.route('/api/optimize-route', methods=['POST'])
+def api_optimize_route():
+    """Enhanced route optimization with crime-aware waypoint generation and comprehensive safety scoring"""
+    started = time.monotonic()
+    try:
+        try:
+            req = _parse_optimize_request(request.json or {})
+        except ValueError as e:
+            return jsonify({'success': False, 'error': str(e)}), 400
+        deadline_at, local_futures, local_routes, waypoints = _plan_candidates(req, started)
+        
+        print("\n--- Phase 3: Concurrent OSRM Fan-out ---")
+        if _skip_osrm(local_routes):
+            print("Skipped (ROUTING_ENGINE=local)")
+            osrm_results, osrm_skipped = [None], []
+        else:
+            # Direct route and every waypoint detour in one parallel batch; the direct
+            # route is submitted first, so a tight budget still gets it
+            osrm_results, osrm_skipped = fetch_routes_concurrently(
+                req['start_lat'], req['start_lon'], req['end_lat'], req['end_lon'], [None] + waypoints,
+                deadline=deadline_at - time.monotonic()
+            )
+        if local_routes is None:
+            local_routes = _local_results(local_futures, deadline_at)
         
-        return jsonify({
-            'success': True,
-            'routes': final_routes,
-            'total_analyzed': len(all_routes),
-            'message': f'Found {len(final_routes)} optimized routes'
-        })
+        body, status = _optimize_result(req, osrm_results, local_routes, waypoints, osrm_skipped, started)
+        return jsonify(body), status
         
     except Exception as e:
         print(f"\nError in route optimization: {e}")
@@ -2523,8 +2391,91 @@ def api_optimize_route():
         traceback.print_exc()
         return jsonify({'success': False, 'error': str(e)}), 500
 
+def _sse(event, payload):
+    return f"event: {event}\ndata: {json.dumps(payload)}\n\n"
+
+def _route_events(routes, route_type, req, streamed, limit=None):
+    # Score the routes of one response unlike any streamed yet and format them as 'route' events
+    fresh = []
+    for route_data in routes or []:
+        if limit is not None and len(fresh) >= limit:
+            break
+        route_hash = calculate_route_hash(route_data['route'])
+        if route_hash and streamed.add(route_data['route']):
+            fresh.append((route_hash, route_data))
+    safety_results = calculate_routes_safety_batch([route_data['route'] for _, route_data in fresh],
+                                                   req['preferences'])
+    return [
+        _sse('route', _encode_geometry({**route_data, **safety, 'route_hash': route_hash, 'type': route_type},
+                                       req['geometry_format']))
+        for (route_hash, route_data), safety in zip(fresh, safety_results) if safety
+    ]
+
+@bp.route('/api/optimize-route/stream', methods=['POST'])
+def api_optimize_route_stream():
+    """optimize-route as Server-Sent Events.
+
+    Streams a 'start' event, then a 'route' event for every candidate as soon as
+    its OSRM response or local road graph search finishes and is scored (the
+    direct route first, then waypoint detours), and finally a 'result' event with
+    the same body /api/optimize-route returns, ranked and categorised (or an
+    'error' event).
+    """
+    started = time.monotonic()
+    try:
+        req = _parse_optimize_request(request.json or {})
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+
+    def events():
+        try:
+            deadline_at, local_futures, local_routes, waypoints = _plan_candidates(req, started)
+            yield _sse('start', {'city': req['city'].slug, 'waypoints': len(waypoints),
+                                 'time_budget_ms': req['time_budget_ms']})
+            streamed = RouteDeduplicator()
+            if local_routes is not None:
+                yield from _route_events(local_routes, 'local', req, streamed)
+            
+            print("\n--- Phase 3: Streaming OSRM Fan-out ---")
+            osrm_results, osrm_skipped = [None], []
+            if not _skip_osrm(local_routes):
+                fanout = RouteFanout(req['start_lat'], req['start_lon'], req['end_lat'], req['end_lon'],
+                                     [None] + waypoints, deadline=deadline_at - time.monotonic())
+                pending_local = [] if local_routes is not None else list(local_futures)
+                waypoint_routes = 0
+                for index, routes in fanout:
+                    # Local searches that finished meanwhile go out between the OSRM responses
+                    for future in [future for future in pending_local if future.done()]:
+                        pending_local.remove(future)
+                        yield from _route_events([future.result()] if future.result() else [], 'local', req, streamed)
+                    if index == 0:
+                        yield from _route_events(routes, 'direct', req, streamed)
+                    elif waypoint_routes < MAX_WAYPOINT_ROUTES:
+                        route_events = _route_events(routes, 'waypoint', req, streamed,
+                                                     MAX_WAYPOINT_ROUTES - waypoint_routes)
+                        waypoint_routes += len(route_events)
+                        yield from route_events
+                osrm_results, osrm_skipped = fanout.results, fanout.skipped
+            if local_routes is None:
+                local_routes = _local_results(local_futures, deadline_at)
+                yield from _route_events(local_routes, 'local', req, streamed)
+            
+            # Streamed routes are already in the scoring cache, so this mostly merges and ranks
+            body, status = _optimize_result(req, osrm_results, local_routes, waypoints, osrm_skipped, started)
+            yield _sse('result' if status == 200 else 'error', body)
+        except Exception as e:
+            print(f"\nError in streaming route optimization: {e}")
+            import traceback
+            traceback.print_exc()
+            yield _sse('error', {'success': False, 'error': str(e)})
+
+    return Response(stream_with_context(events()), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
 @bp.route('/api/health')
 def api_health():
+    dataset = get_dataset()
+    loaded = {ds.city.slug: ds for ds in loaded_datasets()}
     return jsonify({
         'success': True,
         'services': {
@@ -2532,10 +2483,70 @@ def api_health():
             'nominatim': 'online'
         },
         'data': {
-            'crimes': 0 if crime_data is None else len(crime_data),
-            'lighting': 0 if lighting_data is None else len(lighting_data),
-            'population': 0 if population_data is None else len(population_data)
-        }
+            **dataset.stats(),
+            'live_incidents': len(live_crime_index)
+        },
+        'dataset': dataset.version_info(),
+        'cities': {
+            slug: {
+                'name': city.name,
+                'loaded': slug in loaded,
+                **({'dataset': loaded[slug].version_info(), 'memory_mb': round(loaded[slug].nbytes / 2**20, 1)}
+                   if slug in loaded else {})
+            }
+            for slug, city in CITIES.items()
+        },
+        'route_cache': route_safety_cache.stats(),
+        'osrm_cache': osrm_response_cache.stats(),
+        'personalization_cache': user_profile_cache.stats()
+    })
+
+def _check_admin_key():
+    """Error response unless the request carries the configured X-Admin-Key (None when allowed)"""
+    admin_key = os.environ.get('ADMIN_API_KEY')
+    if not admin_key:
+        return jsonify({'success': False, 'error': 'Admin API not configured'}), 403
+    if request.headers.get('X-Admin-Key') != admin_key:
+        return jsonify({'success': False, 'error': 'Unauthorized'}), 401
+    return None
+
+@bp.route('/api/admin/reload-data', methods=['POST'])
+def api_admin_reload_data():
+    """Rebuild the loaded city datasets from app/data in the background and swap them in (requires ADMIN_API_KEY).
+
+    ``?city=<slug>`` limits the reload to one city. Only the worker process that
+    receives this request reloads; the others pick up changed files through
+    mtime polling (SAFETY_DATA_RELOAD_INTERVAL).
+    """
+    denied = _check_admin_key()
+    if denied:
+        return denied
+    slug = request.args.get('city')
+    if slug and get_city(slug) is None:
+        return jsonify({'success': False, 'error': f'Unknown city: {slug}'}), 400
+    cities = [get_city(slug)] if slug else None
+    reload_datasets_async(cities)
+    datasets = {ds.city.slug: ds.version_info() for ds in loaded_datasets()}
+    return jsonify({'success': True, 'message': 'Reload started', 'datasets': datasets}), 202
+
+@bp.route('/api/admin/incidents', methods=['POST'])
+def api_admin_import_incidents():
+    """Bulk-import geolocated incidents into live safety scoring (requires ADMIN_API_KEY)."""
+    denied = _check_admin_key()
+    if denied:
+        return denied
+
+    payload = request.get_json(silent=True) or {}
+    incidents = payload.get('incidents')
+    if not isinstance(incidents, list) or not incidents:
+        return jsonify({'success': False, 'error': 'incidents must be a non-empty list'}), 400
+
+    accepted = ingest_incidents(incidents, source='admin_import')
+    return jsonify({
+        'success': True,
+        'accepted': accepted,
+        'rejected': len(incidents) - accepted,
+        'live_incidents': len(live_crime_index)
     })
 
 @bp.route('/api/rate-route', methods=['POST'])
@@ -2634,6 +2645,7 @@ def api_user_feedback():
                 prefs.safety_weight, prefs.distance_weight = sw, dw
 
         db.session.commit()
+        invalidate_user_profile(user_id)
         return jsonify({'success': True})
     except Exception as e:
         db.session.rollback()
@@ -0,0 +1,106 @@
+import json
+import os
+
+import numpy as np
+
+from app.crime_density import CrimeDensitySurface
+from app.safety_data import SafetyTable
+from app.safety_index import SafetyIndex
+
+# Bump when the layout below changes; artifacts of another version are ignored
+ARTIFACT_VERSION = 2
+
+TABLE_NAMES = ('crime', 'lighting', 'population')
+
+# Table column holding each index point array (index columns use the same name)
+INDEX_SOURCE_COLUMNS = {'lats': 'Latitude', 'lons': 'Longitude'}
+
+
+def _table_sources(table, keys):
+    # The table columns an index's point data was built from, as float64
+    sources = {}
+    for key in keys:
+        column = INDEX_SOURCE_COLUMNS.get(key, key)
+        if column in table.numeric:
+            sources[key] = table.values(column)
+    return sources
+
+
+def save_safety_artifact(path, tables, indexes, fingerprint=None, crime_surface=None):
+    """Write a city's tables, spatial indexes and optional crime surface to one ``.npz``.
+
+    ``tables`` and ``indexes`` are (crime, lighting, population) triples. Everything
+    is stored as plain arrays (no pickle) plus a JSON metadata entry; the archive
+    is uncompressed so loading is a straight copy of each array. Index points that
+    come from table columns are stored once, in the table, plus the grid order.
+    """
+    meta = {'version': ARTIFACT_VERSION, 'fingerprint': fingerprint, 'tables': {}, 'indexes': {}}
+    arrays = {}
+    for name, table, index in zip(TABLE_NAMES, tables, indexes):
+        meta['tables'][name] = {'n_rows': len(table)}
+        arrays.update({f'{name}.table.{key}': values for key, values in table.to_arrays().items()})
+        index_meta, index_arrays = index.to_arrays(
+            _table_sources(table, ('lats', 'lons') + tuple(index.column_names)))
+        meta['indexes'][name] = index_meta
+        arrays.update({f'{name}.index.{key}': values for key, values in index_arrays.items()})
+    if crime_surface is not None:
+        meta['crime_surface'] = {
+            'bounds': crime_surface.bounds,
+            'resolution': crime_surface.resolution,
+            'layers': list(crime_surface.layers),
+        }
+        arrays['crime_surface.grid'] = crime_surface.grid
+    arrays['meta'] = np.array(json.dumps(meta))
+
+    # Write then rename, so a worker polling the file never reads half an archive
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        np.savez(f, **arrays)
+    os.replace(tmp_path, path)
+
+
+class SafetyArtifact:
+    """Loaded contents of a safety ``.npz``: tables, indexes and the optional crime surface"""
+
+    def __init__(self, tables, indexes, fingerprint=None, crime_surface=None):
+        self.tables = tables
+        self.indexes = indexes
+        self.fingerprint = fingerprint
+        self.crime_surface = crime_surface
+
+
+def load_safety_artifact(path, fingerprint=None):
+    """SafetyArtifact saved at ``path``; None if missing, of another version or built from other data"""
+    if not os.path.exists(path):
+        return None
+    with np.load(path, allow_pickle=False) as npz:
+        meta = json.loads(npz['meta'].item())
+        if meta.get('version') != ARTIFACT_VERSION:
+            print(f"⚠️ Safety data artifact {path} has format version {meta.get('version')}; rebuild it")
+            return None
+        if fingerprint and meta.get('fingerprint') != fingerprint:
+            print(f"⚠️ Safety data artifact {path} is stale (dataset changed); rebuild it with build_safety_artifact.py")
+            return None
+
+        grouped = {}
+        for key in npz.files:
+            group, _, rest = key.partition('.')
+            if group in TABLE_NAMES:
+                kind, _, name = rest.partition('.')
+                grouped.setdefault((group, kind), {})[name] = npz[key]
+        surface_grid = npz['crime_surface.grid'] if 'crime_surface' in meta else None
+
+    tables = tuple(
+        SafetyTable.from_arrays(grouped.get((name, 'table'), {}), meta['tables'][name]['n_rows'])
+        for name in TABLE_NAMES
+    )
+    indexes = tuple(
+        SafetyIndex.from_arrays(meta['indexes'][name], grouped[(name, 'index')],
+                                _table_sources(table, meta['indexes'][name].get('shared', ())))
+        for name, table in zip(TABLE_NAMES, tables)
+    )
+    crime_surface = None
+    if surface_grid is not None:
+        surface = meta['crime_surface']
+        crime_surface = CrimeDensitySurface(surface_grid, surface['bounds'], surface['resolution'], surface['layers'])
+    return SafetyArtifact(tables, indexes, meta.get('fingerprint'), crime_surface)
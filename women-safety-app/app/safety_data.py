@@ -0,0 +1,132 @@
+import csv
+
+import numpy as np
+
+# Coordinates stay float64: float32 only resolves ~1e-6 degrees around 13/77,
+# which would move points across the strict ``abs(..) < radius`` window edges.
+COORDINATE_COLUMNS = ('Latitude', 'Longitude')
+
+
+class SafetyTable:
+    """Read-only columnar table for the safety CSVs.
+
+    Numeric columns are NumPy arrays (float64 coordinates, float32 everything
+    else); text columns are dictionary-encoded as ``(codes, categories)`` with
+    int16/int32 codes into a tuple of distinct strings. Lookups work on whole
+    columns at once instead of building filtered frames per call.
+    """
+
+    def __init__(self, numeric=None, categorical=None, n_rows=0):
+        self.numeric = dict(numeric or {})
+        self.categorical = dict(categorical or {})
+        self.n_rows = int(n_rows)
+
+    @classmethod
+    def from_csv(cls, path):
+        """Parse a CSV; a column is numeric when every non-empty value parses as a float"""
+        with open(path, 'r', encoding='utf-8', newline='') as f:
+            reader = csv.reader(f)
+            header = next(reader, None) or []
+            raw = [[] for _ in header]
+            for row in reader:
+                if not row:
+                    continue
+                for i in range(len(header)):
+                    raw[i].append(row[i].strip() if i < len(row) else '')
+
+        numeric, categorical = {}, {}
+        for name, values in zip(header, raw):
+            name = name.strip()
+            try:
+                floats = np.array([float(v) if v else np.nan for v in values], dtype=np.float64)
+            except ValueError:
+                categories, codes = np.unique(np.array(values, dtype=object), return_inverse=True)
+                code_dtype = np.int16 if len(categories) < np.iinfo(np.int16).max else np.int32
+                categorical[name] = (codes.astype(code_dtype), tuple(categories))
+                continue
+            numeric[name] = floats if name in COORDINATE_COLUMNS else floats.astype(np.float32)
+        return cls(numeric, categorical, len(raw[0]) if raw else 0)
+
+    def __len__(self):
+        return self.n_rows
+
+    @property
+    def columns(self):
+        return tuple(self.numeric) + tuple(self.categorical)
+
+    def has_column(self, name):
+        return name in self.numeric or name in self.categorical
+
+    @property
+    def nbytes(self):
+        total = sum(values.nbytes for values in self.numeric.values())
+        return total + sum(codes.nbytes for codes, _ in self.categorical.values())
+
+    def to_arrays(self):
+        """Flat ``{key: array}`` form of the table, for saving to a binary artifact"""
+        arrays = {f'num.{name}': values for name, values in self.numeric.items()}
+        for name, (codes, categories) in self.categorical.items():
+            arrays[f'codes.{name}'] = codes
+            arrays[f'categories.{name}'] = np.array(categories, dtype=str)
+        return arrays
+
+    @classmethod
+    def from_arrays(cls, arrays, n_rows):
+        """Inverse of ``to_arrays``"""
+        numeric, categorical = {}, {}
+        for key, values in arrays.items():
+            kind, _, name = key.partition('.')
+            if kind == 'num':
+                numeric[name] = values
+            elif kind == 'codes':
+                categorical[name] = (values, tuple(arrays[f'categories.{name}'].tolist()))
+        return cls(numeric, categorical, n_rows)
+
+    def values(self, name, mask=None):
+        """A numeric column (optionally only the ``mask`` rows) as float64.
+
+        float32 columns are widened through their shortest decimal repr, which
+        reproduces the CSV text exactly (the data has at most 7 significant digits).
+        The widened copy is not kept: SafetyIndex widens a column once when it is
+        built, and rows() only widens the rows it returns.
+        """
+        values = self.numeric[name]
+        if mask is not None:
+            values = values[mask]
+        if values.dtype == np.float32:
+            return values.astype(str).astype(np.float64)
+        return values
+
+    def strings(self, name):
+        """Decode a dictionary-encoded column to a list of str"""
+        codes, categories = self.categorical[name]
+        return [categories[c] for c in codes]
+
+    def map_categories(self, name, func, dtype=np.float64):
+        """Apply ``func`` once per distinct value of a text column and expand to all rows"""
+        codes, categories = self.categorical[name]
+        return np.array([func(c) for c in categories], dtype=dtype)[codes]
+
+    def bbox_mask(self, min_lat, min_lon, max_lat, max_lon):
+        lats, lons = self.numeric['Latitude'], self.numeric['Longitude']
+        return (lats >= min_lat) & (lats <= max_lat) & (lons >= min_lon) & (lons <= max_lon)
+
+    def rows(self, names, mask=None, limit=None):
+        """JSON-ready ``[[v1, v2, ...], ...]`` for the given numeric columns"""
+        if mask is None:
+            mask = np.ones(self.n_rows, dtype=bool)
+        if limit is not None:
+            mask = mask & (np.cumsum(mask) <= limit)
+        columns = [self.values(name, mask) for name in names]
+        if not columns:
+            return []
+        return np.column_stack(columns).tolist()
+
+
+def load_safety_table(path):
+    """SafetyTable for ``path``, or an empty table when it cannot be read"""
+    try:
+        return SafetyTable.from_csv(path)
+    except Exception as e:
+        print(f"⚠️ Warning: Could not load {path}: {e}")
+        return SafetyTable()
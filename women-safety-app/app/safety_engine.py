@@ -0,0 +1,650 @@
+"""Safety data and route scoring shared by every entry point (app.py and the blueprint).
+
+Each city (see app/cities.py) has its own SafetyDataset, parsed from its CSVs the
+first time get_dataset() is asked for it and evicted again least-recently-used
+when more than MAX_LOADED_CITIES datasets, or more than SAFETY_DATA_MEMORY_MB of
+them, are resident. Load the default city at import time (as app/routes.py
+does) so that gunicorn --preload shares it copy-on-write across workers.
+
+Datasets are immutable and replaced wholesale: reload_dataset() builds a new one
+and swaps it in, so a request that already holds the old dataset finishes
+against it. poll_dataset_changes() triggers that from file mtimes.
+"""
+
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from functools import partial
+from datetime import datetime
+from math import radians, cos, sin, asin, sqrt
+
+from flask import g, has_app_context
+
+from app.cities import DATA_DIR, city_for_point, get_city
+from app.crime_density import build_crime_surface
+from app.live_incidents import LiveIncidentStore
+from app.route_cache import RouteSafetyCache
+from app.route_optimizer import (
+    CRIME_RADIUS, build_safety_indexes,
+    compute_point_metrics, summarize_route_safety, resample_route_with_spacing, score_routes_batch,
+    crime_time_weight_columns, road_edge_risk
+)
+from app.road_graph import RoadGraph
+from app.safety_artifact import load_safety_artifact
+from app.safety_data import SafetyTable, load_safety_table
+from app.safety_index import SafetyIndex
+from app.safety_raster import SafetyRaster, dataset_fingerprint
+
+# Runtime-reported incidents, appended by every worker (the .json file is the old format)
+LIVE_INCIDENTS_FILE = os.path.join(DATA_DIR, 'live_incidents.jsonl')
+LEGACY_LIVE_INCIDENTS_FILE = os.path.join(DATA_DIR, 'live_incidents.json')
+MAX_LIVE_INCIDENTS = int(os.environ.get('MAX_LIVE_INCIDENTS', 10000))
+# Seconds between checks for incidents ingested by other workers
+LIVE_INCIDENT_POLL_INTERVAL = float(os.environ.get('LIVE_INCIDENT_POLL_INTERVAL', 5))
+
+# Seconds between data file mtime checks (0 disables automatic reload); changed
+# files are only picked up once they have been left alone for RELOAD_SETTLE_SECONDS
+SAFETY_RELOAD_INTERVAL = float(os.environ.get('SAFETY_DATA_RELOAD_INTERVAL', 30))
+RELOAD_SETTLE_SECONDS = 2
+
+# Resident city datasets; the least recently used ones are dropped beyond either limit
+MAX_LOADED_CITIES = int(os.environ.get('MAX_LOADED_CITIES', 4))
+SAFETY_DATA_MEMORY_MB = float(os.environ.get('SAFETY_DATA_MEMORY_MB', 512))
+
+# hybrid: road-graph routes (when the city has a graph) join the OSRM candidates;
+# local: skip OSRM whenever the graph finds a route; osrm: never route locally
+ROUTING_ENGINE = os.environ.get('ROUTING_ENGINE', 'hybrid').lower()
+# Safety weights (0 = shortest .. 1 = safest) tried on the road graph, plus the request's own
+LOCAL_ROUTE_SAFETY_WEIGHTS = (0.0, 1.0)
+
+
+def _source_mtimes(city, data_dir):
+    """mtime (or None) of every file a city's SafetyDataset is built from"""
+    raster_base = os.path.splitext(os.path.join(data_dir, city.raster_file))[0]
+    paths = [os.path.join(data_dir, name) for name in city.data_files]
+    paths += [raster_base + '.npy', raster_base + '.json', os.path.join(data_dir, city.artifact_file),
+              os.path.join(data_dir, city.road_graph_file)]
+    mtimes = {}
+    for path in paths:
+        try:
+            mtimes[path] = os.path.getmtime(path)
+        except OSError:
+            mtimes[path] = None
+    return mtimes
+
+
+class SafetyDataset:
+    """One city's static safety data and everything derived from it.
+
+    Holds the columnar tables, their spatial indexes, the optional precomputed
+    raster, the crime density surface and the optional road graph with per-edge
+    safety risk. Nothing is mutated after construction.
+    """
+
+    def __init__(self, city, crime_data, lighting_data, population_data, fingerprint=None, raster=None,
+                 crime_surface=None, source_mtimes=None, generation=0, indexes=None, road_graph=None):
+        self.city = city
+        self.crime_data = crime_data
+        self.lighting_data = lighting_data
+        self.population_data = population_data
+        self.fingerprint = fingerprint
+        self.raster = raster
+        self.crime_surface = crime_surface
+        self.source_mtimes = source_mtimes or {}
+        self.generation = generation
+        self.loaded_at = datetime.utcnow().isoformat()
+        # Spatial indexes: the only lookup path for crime/lighting/population scoring
+        # (prebuilt ones come from the binary artifact)
+        self.crime_index, self.lighting_index, self.population_index = indexes or build_safety_indexes(
+            crime_data, lighting_data, population_data
+        )
+        # Edge risk comes from this dataset, so a reload re-weights the same road network
+        self.road_graph = None
+        if road_graph is not None:
+            self.road_graph = road_graph.with_edge_risk(road_edge_risk(
+                road_graph.edge_midpoints(), self.crime_index, self.lighting_index, self.population_index,
+                raster, crime_surface
+            ))
+
+    @classmethod
+    def load(cls, city, data_dir=DATA_DIR, strict=False, generation=0, prefer_artifact=True):
+        """Load a city's safety data under ``data_dir`` plus its optional raster and density surface.
+
+        The binary artifact (build_safety_artifact.py) is used when it matches the
+        CSVs; otherwise the CSVs are parsed and indexed. With ``strict`` a CSV that
+        cannot be parsed raises instead of loading as empty.
+        """
+        # Taken before reading, so edits made while loading trigger another reload
+        source_mtimes = _source_mtimes(city, data_dir)
+        paths = [os.path.join(data_dir, name) for name in city.data_files]
+        try:
+            fingerprint = dataset_fingerprint(paths)
+        except Exception:
+            fingerprint = None
+
+        artifact = None
+        if prefer_artifact:
+            try:
+                artifact = load_safety_artifact(os.path.join(data_dir, city.artifact_file), fingerprint=fingerprint)
+            except Exception as e:
+                print(f"⚠️ Warning: Could not load safety data artifact: {e}")
+
+        if artifact is not None:
+            crime_data, lighting_data, population_data = artifact.tables
+            indexes = artifact.indexes
+            fingerprint = fingerprint or artifact.fingerprint
+            print(f"✅ {city.name}: using safety data artifact {city.artifact_file}")
+        else:
+            load_table = SafetyTable.from_csv if strict else load_safety_table
+            crime_data, lighting_data, population_data = (load_table(path) for path in paths)
+            indexes = None
+        print(f"✅ {city.name}: loaded {len(crime_data)} crime records")
+        print(f"✅ {city.name}: loaded {len(lighting_data)} lighting points")
+        print(f"✅ {city.name}: loaded {len(population_data)} population points")
+
+        # Optional precomputed raster (build with build_safety_raster.py) for O(1) lookups
+        raster = None
+        try:
+            raster = SafetyRaster.load(os.path.join(data_dir, city.raster_file), fingerprint=fingerprint)
+            if raster is not None:
+                print(f"✅ Loaded safety raster ({raster.n_rows}x{raster.n_cols} cells)")
+        except Exception as e:
+            print(f"⚠️ Warning: Could not load safety raster: {e}")
+            raster = None
+
+        # Severity-weighted crime density surface used for route crime exposure
+        # (CRIME_EXPOSURE_MODEL=count keeps the raw window counts)
+        crime_surface = None
+        if os.environ.get('CRIME_EXPOSURE_MODEL', 'density').lower() != 'count':
+            try:
+                if artifact is not None and artifact.crime_surface is not None \
+                        and artifact.crime_surface.bounds == city.bounds:
+                    crime_surface = artifact.crime_surface
+                else:
+                    crime_surface = build_crime_surface(crime_data, city.bounds)
+                if crime_surface is not None:
+                    print(f"✅ Crime density surface ready ({crime_surface.n_rows}x{crime_surface.n_cols} cells)")
+            except Exception as e:
+                print(f"⚠️ Warning: Could not build crime density surface: {e}")
+                crime_surface = None
+
+        # Optional road network (build with build_road_graph.py) for in-process routing
+        road_graph = None
+        if ROUTING_ENGINE != 'osrm':
+            try:
+                road_graph = RoadGraph.load(os.path.join(data_dir, city.road_graph_file))
+                if road_graph is not None:
+                    print(f"✅ Loaded road graph ({road_graph.n_nodes} nodes, {road_graph.n_edges} edges)")
+            except Exception as e:
+                print(f"⚠️ Warning: Could not load road graph: {e}")
+                road_graph = None
+
+        return cls(city, crime_data, lighting_data, population_data, fingerprint, raster, crime_surface,
+                   source_mtimes, generation, indexes, road_graph)
+
+    def stats(self):
+        return {
+            'crimes': len(self.crime_data),
+            'lighting': len(self.lighting_data),
+            'population': len(self.population_data),
+        }
+
+    @property
+    def nbytes(self):
+        """Resident bytes (the memory-mapped raster is page cache, so it is not counted)"""
+        total = sum(table.nbytes for table in (self.crime_data, self.lighting_data, self.population_data))
+        total += sum(index.nbytes for index in (self.crime_index, self.lighting_index, self.population_index))
+        if self.crime_surface is not None:
+            total += self.crime_surface.grid.nbytes
+        if self.road_graph is not None:
+            total += self.road_graph.nbytes
+        return total
+
+    def version_info(self):
+        return {
+            'city': self.city.slug,
+            'generation': self.generation,
+            'fingerprint': self.fingerprint,
+            'loaded_at': self.loaded_at,
+            'raster': self.raster is not None,
+            'road_graph': self.road_graph is not None,
+            'crime_surface': self.crime_surface is not None,
+        }
+
+
+_datasets = OrderedDict()  # city slug -> SafetyDataset, least recently used first
+_datasets_lock = threading.Lock()
+_reload_lock = threading.Lock()
+_last_poll = 0.0
+
+
+def _resolve_city(city):
+    if city is None or isinstance(city, str):
+        resolved = get_city(city)
+        if resolved is None:
+            raise KeyError(f"Unknown city: {city}")
+        return resolved
+    return city
+
+
+def _evict_datasets(keep):
+    # Caller holds _datasets_lock
+    budget = SAFETY_DATA_MEMORY_MB * 1024 * 1024
+    while len(_datasets) > 1:
+        over_count = len(_datasets) > MAX_LOADED_CITIES
+        over_memory = sum(ds.nbytes for ds in _datasets.values()) > budget
+        if not (over_count or over_memory):
+            break
+        slug = next(s for s in _datasets if s != keep)
+        del _datasets[slug]
+        print(f"♻️ Evicted safety data for {slug}")
+
+
+def get_dataset(city=None):
+    """The active SafetyDataset of ``city`` (a City, a slug or None for the default city).
+
+    Loaded on first use. Inside a request the first dataset returned per city is
+    pinned in flask.g, so every lookup of one request sees the same version even
+    if a reload lands halfway through.
+    """
+    city = _resolve_city(city)
+    pinned = g.setdefault('safety_datasets', {}) if has_app_context() else None
+    if pinned is not None and city.slug in pinned:
+        return pinned[city.slug]
+
+    with _datasets_lock:
+        ds = _datasets.get(city.slug)
+        if ds is not None:
+            _datasets.move_to_end(city.slug)
+    if ds is None:
+        # Load outside the map lock so other cities stay available meanwhile
+        with _reload_lock:
+            with _datasets_lock:
+                ds = _datasets.get(city.slug)
+            if ds is None:
+                ds = SafetyDataset.load(city)
+                with _datasets_lock:
+                    _datasets[city.slug] = ds
+                    _evict_datasets(keep=city.slug)
+
+    if pinned is not None:
+        pinned[city.slug] = ds
+    return ds
+
+
+def dataset_at(lat, lon):
+    """Dataset of the city containing the point (the default city's when none does)"""
+    return get_dataset(city_for_point(lat, lon))
+
+
+def loaded_datasets():
+    """Currently resident datasets (does not load or touch LRU order)"""
+    with _datasets_lock:
+        return list(_datasets.values())
+
+
+def reload_dataset(city=None):
+    """Rebuild a loaded city's SafetyDataset from disk and swap it in; returns True on success.
+
+    The old dataset stays active if loading fails, and concurrent calls are
+    dropped while another load or reload is running.
+    """
+    city = _resolve_city(city)
+    if not _reload_lock.acquire(blocking=False):
+        return False
+    try:
+        with _datasets_lock:
+            old = _datasets.get(city.slug)
+        if old is None:
+            return False  # not resident; the next request loads fresh data anyway
+        try:
+            new = SafetyDataset.load(city, strict=True, generation=old.generation + 1)
+        except Exception as e:
+            print(f"⚠️ {city.name} safety data reload failed, keeping generation {old.generation}: {e}")
+            return False
+        with _datasets_lock:
+            if city.slug in _datasets:
+                _datasets[city.slug] = new
+        # Old entries are unreachable (the generation is in the key); free them now
+        route_safety_cache.clear()
+        print(f"✅ {city.name} safety data reloaded (generation {new.generation}, fingerprint {new.fingerprint})")
+        return True
+    finally:
+        _reload_lock.release()
+
+
+def reload_datasets(cities=None):
+    """Reload the given cities (default: every resident one); returns the slugs reloaded"""
+    if cities is None:
+        cities = [ds.city for ds in loaded_datasets()]
+    return [city.slug for city in map(_resolve_city, cities) if reload_dataset(city)]
+
+
+def reload_datasets_async(cities=None):
+    """Run reload_datasets in a background thread and return the thread"""
+    thread = threading.Thread(target=reload_datasets, args=(cities,), name='safety-data-reload', daemon=True)
+    thread.start()
+    return thread
+
+
+def poll_dataset_changes():
+    """Start a background reload if a resident city's data files changed; True when one was started.
+
+    Meant to be called on every request: it only stats the files once per
+    SAFETY_RELOAD_INTERVAL, and needs no watcher thread (which would not survive
+    the fork of a preloaded gunicorn master).
+    """
+    global _last_poll
+    now = time.time()
+    if SAFETY_RELOAD_INTERVAL <= 0 or now - _last_poll < SAFETY_RELOAD_INTERVAL:
+        return False
+    _last_poll = now
+    if _reload_lock.locked():
+        return False
+    changed = []
+    for ds in loaded_datasets():
+        mtimes = _source_mtimes(ds.city, DATA_DIR)
+        if mtimes == ds.source_mtimes:
+            continue
+        newest = max((m for m in mtimes.values() if m is not None), default=0)
+        if now - newest >= RELOAD_SETTLE_SECONDS:  # else still being written; look again next interval
+            changed.append(ds.city)
+    if not changed:
+        return False
+    reload_datasets_async(changed)
+    return True
+
+
+# Incidents reported at runtime (report form, admin import). They live in their own
+# index so both the exact and the raster scoring paths can add them on top of the
+# static CSV counts. The index mirrors the shared store, which every worker appends
+# to and polls, so they survive restarts and reach all workers.
+live_crime_index = SafetyIndex([], [], crime_time_weight_columns([]), cell_size=CRIME_RADIUS)
+live_incident_store = LiveIncidentStore(LIVE_INCIDENTS_FILE, MAX_LIVE_INCIDENTS,
+                                        legacy_path=LEGACY_LIVE_INCIDENTS_FILE)
+_live_position = (None, 0)  # (inode, offset) of the store read so far
+_live_resync = False  # set when incidents were indexed without the store; the next read rebuilds
+_live_poll_lock = threading.Lock()
+_last_live_poll = 0.0
+
+# Scored routes, keyed by geometry + scoring preferences + safety_dataset_version()
+route_safety_cache = RouteSafetyCache(int(os.environ.get('ROUTE_SAFETY_CACHE_SIZE', 2048)))
+
+
+def validate_coordinates(lat, lon):
+    """True when the point lies inside any served city"""
+    return city_for_point(lat, lon) is not None
+
+
+def haversine_distance(lat1, lon1, lat2, lon2):
+    """Calculate distance between two points in km"""
+    try:
+        lat1, lon1, lat2, lon2 = map(radians, [float(lat1), float(lon1), float(lat2), float(lon2)])
+        dlat = lat2 - lat1
+        dlon = lon2 - lon1
+        a = sin(dlat/2)**2 + cos(lat1) * cos(lat2) * sin(dlon/2)**2
+        c = 2 * asin(sqrt(a))
+        return c * 6371
+    except:
+        return 0
+
+
+def calculate_route_hash(route):
+    if not route or len(route) < 2:
+        return None
+    sample_indices = [0, len(route)//4, len(route)//2, 3*len(route)//4, len(route)-1]
+    sample_points = [route[i] for i in sample_indices if i < len(route)]
+    hash_string = ''.join([f"{lat:.4f},{lon:.4f}" for lat, lon in sample_points])
+    return hashlib.md5(hash_string.encode()).hexdigest()
+
+
+def calculate_crime_exposure(lat, lon, radius=0.003):
+    """Calculate crime exposure at a location"""
+    try:
+        return int(dataset_at(lat, lon).crime_index.count(lat, lon, radius)[0] + live_crime_index.count(lat, lon, radius)[0])
+    except Exception as e:
+        print(f"❌ Error calculating crime: {e}")
+        return 0
+
+
+def calculate_lighting_score(lat, lon, radius=0.005):
+    try:
+        return float(dataset_at(lat, lon).lighting_index.mean('lighting_score', lat, lon, radius, default=5.0)[0])
+    except:
+        return 5.0
+
+
+def calculate_population_score(lat, lon, radius=0.005):
+    try:
+        counts, sums = dataset_at(lat, lon).population_index.aggregate(
+            lat, lon, radius, ('population_density', 'traffic_level', 'is_main_road')
+        )
+        n = counts[0]
+        if n > 0:
+            return (
+                sums['population_density'][0] / n / 1000,
+                sums['traffic_level'][0] / n / 10,
+                sums['is_main_road'][0] / n > 0.5
+            )
+        return 5.0, 5.0, False
+    except:
+        return 5.0, 5.0, False
+
+
+def safety_dataset_version(dataset=None):
+    """Changes whenever the data behind safety scores changes (used in cache keys)"""
+    ds = dataset or get_dataset()
+    return (ds.city.slug, ds.fingerprint, ds.generation, live_crime_index.version, ds.raster is not None,
+            ds.crime_surface is not None)
+
+
+def route_dataset(route):
+    """Dataset of the city a route starts in"""
+    return dataset_at(route[0][0], route[0][1])
+
+
+def calculate_route_safety_comprehensive(route, preferences=None):
+    if not route or len(route) < 2:
+        return None
+
+    if preferences is None:
+        preferences = {}
+
+    ds = route_dataset(route)
+    cache_key = None
+    try:
+        cache_key = route_safety_cache.make_key(route, preferences, safety_dataset_version(ds))
+        cached = route_safety_cache.get(cache_key)
+        if cached is not None:
+            return cached
+    except Exception as e:
+        print(f"⚠️ Route cache lookup failed: {e}")
+
+    try:
+        sampled_route, spacing_m = resample_route_with_spacing(route)
+
+        metrics = compute_point_metrics(
+            sampled_route, ds.crime_index, ds.lighting_index, ds.population_index, ds.raster, live_crime_index,
+            preferences.get('time_bucket'), ds.crime_surface
+        )
+        result = summarize_route_safety(metrics, preferences, spacing_m)
+        if cache_key is not None:
+            route_safety_cache.put(cache_key, result)
+        return result
+
+    except Exception as e:
+        print(f"❌ Error calculating safety: {e}")
+        return None
+
+
+def calculate_routes_safety_batch(routes, preferences=None):
+    """Score a list of route polylines in one vectorized pass (aligned list of dicts/None).
+
+    Routes already in the result cache are answered from it; only the misses are scored.
+    """
+    try:
+        datasets = [route_dataset(route) if route else None for route in routes]
+        keys = [route_safety_cache.make_key(route, preferences, safety_dataset_version(ds)) if ds else None
+                for route, ds in zip(routes, datasets)]
+        results = [route_safety_cache.get(key) if key else None for key in keys]
+
+        # One vectorized pass per city (in practice all candidates share one)
+        by_city = OrderedDict()
+        for i, (result, ds) in enumerate(zip(results, datasets)):
+            if result is None and ds is not None:
+                by_city.setdefault(ds.city.slug, (ds, []))[1].append(i)
+        for ds, missing in by_city.values():
+            scored = score_routes_batch(
+                [routes[i] for i in missing], ds.crime_index, ds.lighting_index, ds.population_index, preferences,
+                ds.raster, live_crime_index, ds.crime_surface
+            )
+            for i, result in zip(missing, scored):
+                route_safety_cache.put(keys[i], result)
+                results[i] = result
+        return results
+    except Exception as e:
+        print(f"❌ Error calculating batch safety: {e}")
+        return [None] * len(routes)
+
+
+def local_route_searches(start_lat, start_lon, end_lat, end_lon, preferences=None):
+    """Road-graph searches for a trip, one per safety weight ([] without a graph).
+
+    Besides the shortest (0) and safest (1) paths, the request's own
+    ``safety_weight`` is tried. The endpoints are snapped once here; each
+    returned callable runs one A* search and takes an optional ``deadline_at``
+    (time.monotonic()), so callers can run them concurrently with the OSRM
+    requests. A search returns a candidate in the get_route_from_osrm shape plus
+    the ``graph_safety_weight`` that produced it, or None.
+    """
+    if ROUTING_ENGINE == 'osrm':
+        return []
+    try:
+        graph = dataset_at(start_lat, start_lon).road_graph
+        if graph is None:
+            return []
+        endpoints = graph.snap_endpoints(start_lat, start_lon, end_lat, end_lon)
+        if endpoints is None:
+            return []
+        weights = set(LOCAL_ROUTE_SAFETY_WEIGHTS)
+        if preferences and preferences.get('safety_weight') is not None:
+            weights.add(round(min(max(float(preferences['safety_weight']), 0.0), 1.0), 2))
+        return [partial(_local_route, graph, endpoints, weight) for weight in sorted(weights)]
+    except Exception as e:
+        print(f"⚠️ Local routing failed: {e}")
+        return []
+
+
+def _local_route(graph, endpoints, weight, deadline_at=None):
+    try:
+        route = graph.route_between(*endpoints, safety_weight=weight, deadline_at=deadline_at)
+    except Exception as e:
+        print(f"⚠️ Local routing failed: {e}")
+        return None
+    if route:
+        route['graph_safety_weight'] = weight
+    return route
+
+
+def _index_incidents(records, replace=False):
+    lats = [r['lat'] for r in records]
+    lons = [r['lon'] for r in records]
+    columns = crime_time_weight_columns([r.get('time') for r in records])
+    if replace:
+        live_crime_index.reset(lats, lons, columns)
+    elif records:
+        live_crime_index.insert(lats, lons, columns)
+
+
+def poll_live_incidents(force=False):
+    """Load incidents other workers appended to the store; returns how many were added.
+
+    Rate-limited to LIVE_INCIDENT_POLL_INTERVAL unless ``force``. After the store
+    was compacted the live index is rebuilt from it. Returns None when the store
+    could not be read.
+    """
+    global _live_position, _last_live_poll, _live_resync
+    now = time.time()
+    if not force and (LIVE_INCIDENT_POLL_INTERVAL <= 0 or now - _last_live_poll < LIVE_INCIDENT_POLL_INTERVAL):
+        return 0
+    with _live_poll_lock:
+        _last_live_poll = now
+        try:
+            records, inode, offset, restarted = live_incident_store.read_from(*_live_position)
+        except Exception as e:
+            print(f"⚠️ Warning: Could not read live incidents: {e}")
+            return None
+        valid = []
+        for record in records:
+            try:
+                valid.append(dict(record, lat=float(record['lat']), lon=float(record['lon'])))
+            except (KeyError, TypeError, ValueError):
+                continue
+        _index_incidents(valid, replace=restarted or _live_resync)
+        _live_position = (inode, offset)
+        _live_resync = False
+        return len(valid)
+
+
+def _index_unread_incidents(records):
+    # Index records the store could not deliver; the next successful read rebuilds
+    # the live index from the whole store, so they are not counted twice
+    global _live_position, _live_resync
+    with _live_poll_lock:
+        _index_incidents(records)
+        _live_position = (None, 0)
+        _live_resync = True
+
+
+def ingest_incidents(incidents, source='api', persist=True):
+    """Insert geolocated incidents into the live crime index; returns how many were accepted.
+
+    Each incident is a dict with ``lat``/``lon`` and optional ``crime_type``, ``date``
+    and ``time``. Points outside every served city are skipped.
+    """
+    accepted = []
+    for item in incidents or []:
+        try:
+            lat, lon = float(item.get('lat')), float(item.get('lon'))
+        except (TypeError, ValueError):
+            continue
+        if not validate_coordinates(lat, lon):
+            continue
+        accepted.append({
+            'lat': lat,
+            'lon': lon,
+            'crime_type': item.get('crime_type'),
+            'date': item.get('date'),
+            'time': item.get('time'),
+            'source': item.get('source', source),
+            'timestamp': item.get('timestamp') or datetime.utcnow().isoformat()
+        })
+    if not accepted:
+        return 0
+
+    if persist:
+        try:
+            live_incident_store.append(accepted)
+        except Exception as e:
+            print(f"⚠️ Warning: Could not persist live incidents: {e}")
+            _index_incidents(accepted)
+            return len(accepted)
+        # Reading the store back indexes these along with anything other workers added
+        if poll_live_incidents(force=True) is None:
+            _index_unread_incidents(accepted)
+        return len(accepted)
+    _index_incidents(accepted)
+    return len(accepted)
+
+
+try:
+    migrated = live_incident_store.migrate_legacy()
+    if migrated:
+        print(f"✅ Moved {migrated} live incidents to {os.path.basename(LIVE_INCIDENTS_FILE)}")
+    restored = poll_live_incidents(force=True)
+    if restored is not None:
+        print(f"✅ Restored {restored} live incidents")
+except Exception as e:
+    print(f"⚠️ Warning: Could not restore live incidents: {e}")
@@ -0,0 +1,326 @@
+import threading
+
+import numpy as np
+
+
+class _IndexState:
+    """Immutable snapshot of a SafetyIndex: the bucketed grid plus an unsorted insert buffer"""
+
+    __slots__ = ('min_lat', 'min_lon', 'n_rows', 'n_cols', 'offsets',
+                 'lats', 'lons', 'columns', 'delta_lats', 'delta_lons', 'delta_columns')
+
+    def __len__(self):
+        return len(self.lats) + len(self.delta_lats)
+
+
+def _build_state(lats, lons, columns, cell_size):
+    state = _IndexState()
+    state.delta_lats = np.zeros(0, dtype=np.float64)
+    state.delta_lons = np.zeros(0, dtype=np.float64)
+    state.delta_columns = {name: np.zeros(0, dtype=np.float64) for name in columns}
+
+    if len(lats) == 0:
+        state.min_lat = state.min_lon = 0.0
+        state.n_rows = state.n_cols = 1
+        state.offsets = np.zeros(2, dtype=np.int64)
+        state.lats, state.lons, state.columns = lats, lons, columns
+        return state
+
+    state.min_lat = float(lats.min())
+    state.min_lon = float(lons.min())
+    rows = np.floor((lats - state.min_lat) / cell_size).astype(np.int64)
+    cols = np.floor((lons - state.min_lon) / cell_size).astype(np.int64)
+    state.n_rows = int(rows.max()) + 1
+    state.n_cols = int(cols.max()) + 1
+
+    cell_ids = rows * state.n_cols + cols
+    order = np.argsort(cell_ids, kind='stable')
+    counts = np.bincount(cell_ids, minlength=state.n_rows * state.n_cols)
+    state.offsets = np.zeros(len(counts) + 1, dtype=np.int64)
+    np.cumsum(counts, out=state.offsets[1:])
+
+    state.lats = lats[order]
+    state.lons = lons[order]
+    state.columns = {name: values[order] for name, values in columns.items()}
+    return state
+
+
+def _clean_points(lats, lons, columns):
+    lats = np.atleast_1d(np.asarray(lats, dtype=np.float64)).ravel()
+    lons = np.atleast_1d(np.asarray(lons, dtype=np.float64)).ravel()
+    columns = {name: np.broadcast_to(np.asarray(values, dtype=np.float64), lats.shape).ravel()
+               for name, values in (columns or {}).items()}
+    valid = np.isfinite(lats) & np.isfinite(lons)
+    return lats[valid], lons[valid], {name: values[valid] for name, values in columns.items()}
+
+
+class SafetyIndex:
+    """Grid-bucket spatial index over lat/lon points for square-window radius queries.
+
+    Points are bucketed into cells of ``cell_size`` degrees and stored sorted by
+    cell (row-major), with a CSR-style ``offsets`` array so that every row of
+    cells touched by a query window is one contiguous slice. Queries only visit
+    the handful of cells around each query point instead of scanning the whole
+    dataset, and any number of query points is answered in a single vectorized
+    pass.
+
+    New points can be added with ``insert`` without rebuilding: they land in a
+    small insert buffer that queries scan alongside the grid, and the buffer is
+    folded into a fresh grid once it grows past ``compact_threshold``. All index
+    data lives in an immutable snapshot that writers replace atomically, so a
+    query always sees either the state before or after a write, never a mix.
+
+    Window semantics match the original pandas masks exactly:
+    ``abs(lat - q_lat) < radius and abs(lon - q_lon) < radius``.
+    """
+
+    def __init__(self, lats, lons, columns=None, cell_size=0.005, compact_threshold=256):
+        self.cell_size = float(cell_size)
+        self.compact_threshold = int(compact_threshold)
+        self.column_names = tuple(columns or ())
+        self.version = 0
+        self._write_lock = threading.Lock()
+        self._state = _build_state(*_clean_points(lats, lons, columns), self.cell_size)
+
+    @classmethod
+    def from_table(cls, table, columns=(), cell_size=0.005):
+        """Build an index from a SafetyTable with Latitude/Longitude columns"""
+        if table is None or len(table) == 0:
+            return cls([], [], {name: [] for name in columns}, cell_size=cell_size)
+        return cls(
+            table.values('Latitude'),
+            table.values('Longitude'),
+            {name: table.values(name) for name in columns},
+            cell_size=cell_size,
+        )
+
+    def __len__(self):
+        return len(self._state)
+
+    def _source_rows(self, state, lats, lons):
+        # Position in the constructor's input of every grid point, recomputed the way
+        # _clean_points/_build_state ordered them (None if the grid has other points)
+        lats = np.asarray(lats, dtype=np.float64)
+        lons = np.asarray(lons, dtype=np.float64)
+        valid = np.flatnonzero(np.isfinite(lats) & np.isfinite(lons))
+        if len(valid) != len(state.lats) or len(valid) == 0:
+            return None
+        rows = np.floor((lats[valid] - state.min_lat) / self.cell_size).astype(np.int64)
+        cols = np.floor((lons[valid] - state.min_lon) / self.cell_size).astype(np.int64)
+        return valid[np.argsort(rows * state.n_cols + cols, kind='stable')]
+
+    def to_arrays(self, sources=None):
+        """``(meta, arrays)`` describing the bucketed grid, for saving to a binary artifact.
+
+        Pending inserts are folded into the grid first, so ``from_arrays`` gets a
+        plain snapshot back without rebuilding anything. ``sources`` optionally
+        maps ``'lats'``, ``'lons'`` and column names to the arrays the index was
+        built from (e.g. table columns saved alongside); point data reproduced by
+        them is left out and only the grid order (``rows``) is stored, so the
+        same data is not saved twice. Pass the same ``sources`` to ``from_arrays``.
+        """
+        state = self._state
+        if len(state.delta_lats):
+            state = _build_state(
+                np.concatenate([state.lats, state.delta_lats]),
+                np.concatenate([state.lons, state.delta_lons]),
+                {n: np.concatenate([state.columns[n], state.delta_columns[n]]) for n in self.column_names},
+                self.cell_size,
+            )
+        meta = {
+            'cell_size': self.cell_size,
+            'compact_threshold': self.compact_threshold,
+            'columns': list(self.column_names),
+            'min_lat': state.min_lat, 'min_lon': state.min_lon,
+            'n_rows': state.n_rows, 'n_cols': state.n_cols,
+        }
+        arrays = {'offsets': state.offsets, 'lats': state.lats, 'lons': state.lons}
+        arrays.update({f'column.{name}': state.columns[name] for name in self.column_names})
+
+        sources = sources or {}
+        rows = None
+        if 'lats' in sources and 'lons' in sources:
+            rows = self._source_rows(state, sources['lats'], sources['lons'])
+        if rows is not None:
+            keys = {'lats': 'lats', 'lons': 'lons', **{name: f'column.{name}' for name in self.column_names}}
+            meta['shared'] = [
+                key for key, array_key in keys.items()
+                if key in sources and np.array_equal(
+                    arrays[array_key], np.asarray(sources[key], dtype=np.float64)[rows], equal_nan=True)
+            ]
+            for key in meta['shared']:
+                del arrays[keys[key]]
+            arrays['rows'] = rows.astype(np.int32 if len(rows) < np.iinfo(np.int32).max else np.int64)
+        return meta, arrays
+
+    @classmethod
+    def from_arrays(cls, meta, arrays, sources=None):
+        """Rebuild an index saved with ``to_arrays`` (no sorting or bucketing needed)"""
+        columns = tuple(meta['columns'])
+        if meta.get('shared'):
+            arrays = dict(arrays)
+            rows = arrays.pop('rows')
+            keys = {'lats': 'lats', 'lons': 'lons', **{name: f'column.{name}' for name in columns}}
+            for key in meta['shared']:
+                arrays[keys[key]] = np.asarray(sources[key], dtype=np.float64)[rows]
+        index = cls([], [], {name: [] for name in columns}, cell_size=meta['cell_size'],
+                    compact_threshold=meta['compact_threshold'])
+        state = _IndexState()
+        state.min_lat, state.min_lon = float(meta['min_lat']), float(meta['min_lon'])
+        state.n_rows, state.n_cols = int(meta['n_rows']), int(meta['n_cols'])
+        state.offsets = arrays['offsets']
+        state.lats, state.lons = arrays['lats'], arrays['lons']
+        state.columns = {name: arrays[f'column.{name}'] for name in columns}
+        state.delta_lats = np.zeros(0, dtype=np.float64)
+        state.delta_lons = np.zeros(0, dtype=np.float64)
+        state.delta_columns = {name: np.zeros(0, dtype=np.float64) for name in columns}
+        index._state = state
+        return index
+
+    @property
+    def nbytes(self):
+        state = self._state
+        arrays = [state.offsets, state.lats, state.lons, state.delta_lats, state.delta_lons]
+        arrays += list(state.columns.values()) + list(state.delta_columns.values())
+        return sum(a.nbytes for a in arrays)
+
+    def insert(self, lats, lons, columns=None):
+        """Add points to the index without a rebuild; returns the number of points added.
+
+        ``columns`` must provide a value (or a scalar broadcast to all points) for
+        every column the index was built with.
+        """
+        columns = columns or {}
+        missing = set(self.column_names) - set(columns)
+        if missing:
+            raise ValueError(f"Missing values for index columns: {', '.join(sorted(missing))}")
+        lats, lons, columns = _clean_points(lats, lons, {n: columns[n] for n in self.column_names})
+        if len(lats) == 0:
+            return 0
+
+        with self._write_lock:
+            old = self._state
+            delta_lats = np.concatenate([old.delta_lats, lats])
+            delta_lons = np.concatenate([old.delta_lons, lons])
+            delta_columns = {n: np.concatenate([old.delta_columns[n], columns[n]]) for n in self.column_names}
+
+            if len(delta_lats) >= self.compact_threshold:
+                new = _build_state(
+                    np.concatenate([old.lats, delta_lats]),
+                    np.concatenate([old.lons, delta_lons]),
+                    {n: np.concatenate([old.columns[n], delta_columns[n]]) for n in self.column_names},
+                    self.cell_size,
+                )
+            else:
+                new = _IndexState()
+                for slot in ('min_lat', 'min_lon', 'n_rows', 'n_cols', 'offsets', 'lats', 'lons', 'columns'):
+                    setattr(new, slot, getattr(old, slot))
+                new.delta_lats, new.delta_lons, new.delta_columns = delta_lats, delta_lons, delta_columns
+
+            self._state = new
+            self.version += 1
+        return len(lats)
+
+    def reset(self, lats, lons, columns=None):
+        """Replace every point with the given ones in one atomic swap (rebuilt grid)"""
+        columns = columns or {}
+        missing = set(self.column_names) - set(columns)
+        if missing:
+            raise ValueError(f"Missing values for index columns: {', '.join(sorted(missing))}")
+        new = _build_state(*_clean_points(lats, lons, {n: columns[n] for n in self.column_names}), self.cell_size)
+        with self._write_lock:
+            self._state = new
+            self.version += 1
+
+    def _cell_span(self, values, origin, radius, n_cells):
+        # Pad the window by a hair so float rounding at cell edges can never
+        # drop a candidate; the exact comparison happens afterwards.
+        pad = radius * (1 + 1e-9) + 1e-12
+        lo = np.floor((values - pad - origin) / self.cell_size).astype(np.int64)
+        hi = np.floor((values + pad - origin) / self.cell_size).astype(np.int64)
+        empty = (hi < 0) | (lo > n_cells - 1)
+        return np.clip(lo, 0, n_cells - 1), np.clip(hi, 0, n_cells - 1), empty
+
+    def _grid_hits(self, state, q_lat, q_lon, radius):
+        empty_result = (np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64))
+        if len(state.lats) == 0:
+            return empty_result
+
+        r0, r1, r_empty = self._cell_span(q_lat, state.min_lat, radius, state.n_rows)
+        c0, c1, c_empty = self._cell_span(q_lon, state.min_lon, radius, state.n_cols)
+        rows_per_query = np.where(r_empty | c_empty, 0, r1 - r0 + 1)
+
+        # One (query, cell-row) pair per contiguous slice of the sorted points
+        qid = np.repeat(np.arange(len(q_lat)), rows_per_query)
+        if len(qid) == 0:
+            return empty_result
+        first = np.repeat(np.cumsum(rows_per_query) - rows_per_query, rows_per_query)
+        row = r0[qid] + (np.arange(len(qid)) - first)
+        starts = state.offsets[row * state.n_cols + c0[qid]]
+        ends = state.offsets[row * state.n_cols + c1[qid] + 1]
+        lengths = ends - starts
+
+        # Expand the ragged slices into flat candidate arrays
+        total = int(lengths.sum())
+        if total == 0:
+            return empty_result
+        cand_q = np.repeat(qid, lengths)
+        cand = np.repeat(starts - (np.cumsum(lengths) - lengths), lengths) + np.arange(total)
+
+        hit = ((np.abs(state.lats[cand] - q_lat[cand_q]) < radius) &
+               (np.abs(state.lons[cand] - q_lon[cand_q]) < radius))
+        return cand_q[hit], cand[hit]
+
+    def _delta_hits(self, state, q_lat, q_lon, radius, chunk_cells=1 << 22):
+        # The insert buffer is small, so a brute-force (query x point) mask is cheapest
+        n_delta = len(state.delta_lats)
+        if n_delta == 0:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+        step = max(1, chunk_cells // n_delta)
+        q_parts, p_parts = [], []
+        for start in range(0, len(q_lat), step):
+            block = slice(start, start + step)
+            mask = ((np.abs(q_lat[block, None] - state.delta_lats[None, :]) < radius) &
+                    (np.abs(q_lon[block, None] - state.delta_lons[None, :]) < radius))
+            q, p = np.nonzero(mask)
+            q_parts.append(q + start)
+            p_parts.append(p + len(state.lats))
+        return np.concatenate(q_parts), np.concatenate(p_parts)
+
+    def _query(self, state, lats, lons, radius):
+        q_lat = np.atleast_1d(np.asarray(lats, dtype=np.float64))
+        q_lon = np.atleast_1d(np.asarray(lons, dtype=np.float64))
+        grid_q, grid_p = self._grid_hits(state, q_lat, q_lon, radius)
+        if len(state.delta_lats) == 0:
+            return grid_q, grid_p
+        delta_q, delta_p = self._delta_hits(state, q_lat, q_lon, radius)
+        return np.concatenate([grid_q, delta_q]), np.concatenate([grid_p, delta_p])
+
+    def aggregate(self, lats, lons, radius, columns=()):
+        """Per-query point counts and per-column sums inside each window.
+
+        Returns ``(counts, {column: sums})``, all computed from one consistent snapshot.
+        """
+        state = self._state
+        n_q = len(np.atleast_1d(lats))
+        qid, pid = self._query(state, lats, lons, radius)
+        counts = np.bincount(qid, minlength=n_q)
+        sums = {}
+        for name in columns:
+            values = state.columns[name]
+            if len(state.delta_lats):
+                values = np.concatenate([values, state.delta_columns[name]])
+            sums[name] = np.bincount(qid, weights=values[pid], minlength=n_q)
+        return counts, sums
+
+    def count(self, lats, lons, radius):
+        """Number of indexed points inside the window around each query point"""
+        counts, _ = self.aggregate(lats, lons, radius)
+        return counts
+
+    def mean(self, column, lats, lons, radius, default=np.nan):
+        """Per-query mean of ``column`` inside each window (``default`` where the window is empty)"""
+        counts, sums = self.aggregate(lats, lons, radius, (column,))
+        means = np.full(len(counts), default, dtype=np.float64)
+        np.divide(sums[column], counts, out=means, where=counts > 0)
+        return means
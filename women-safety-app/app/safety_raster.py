@@ -0,0 +1,142 @@
+import hashlib
+import json
+import os
+
+import numpy as np
+
+from app.route_optimizer import TIME_BUCKET_NAMES
+
+# Layer order inside the raster stack. Values mirror compute_point_metrics output;
+# crime_<bucket> layers hold the time-weighted crime counts for each departure bucket.
+RASTER_LAYERS = ('crime', 'lighting', 'population', 'traffic', 'main_road') + tuple(
+    f'crime_{bucket}' for bucket in TIME_BUCKET_NAMES
+)
+
+# ~55 m cells; the 0.003/0.005 degree lookup windows span 11-19 cells
+DEFAULT_RESOLUTION = 0.0005
+
+
+def dataset_fingerprint(paths):
+    """Short content hash of the source CSVs, used to detect stale artifacts"""
+    digest = hashlib.md5()
+    for path in paths:
+        with open(path, 'rb') as f:
+            digest.update(f.read())
+    return digest.hexdigest()[:16]
+
+
+class SafetyRaster:
+    """Fixed-resolution safety grids over a bounding box, loaded memory-mapped.
+
+    The stack is a float32 array of shape ``(len(layers), n_rows, n_cols)`` where
+    each cell holds the metrics of a lookup centred on that cell. Lookups are a
+    single floor/index per point. Because the array is mapped read-only, every
+    worker that loads the same file shares its pages.
+    """
+
+    def __init__(self, grid, bounds, resolution, layers=RASTER_LAYERS, fingerprint=None):
+        self.grid = grid
+        self.bounds = dict(bounds)
+        self.resolution = float(resolution)
+        self.layers = tuple(layers)
+        self.fingerprint = fingerprint
+        self.n_rows, self.n_cols = grid.shape[1], grid.shape[2]
+        self._layer_pos = {name: i for i, name in enumerate(self.layers)}
+
+    @staticmethod
+    def grid_shape(bounds, resolution):
+        n_rows = int(np.ceil((bounds['max_lat'] - bounds['min_lat']) / resolution))
+        n_cols = int(np.ceil((bounds['max_lon'] - bounds['min_lon']) / resolution))
+        return n_rows, n_cols
+
+    @classmethod
+    def build(cls, point_metrics, bounds, resolution=DEFAULT_RESOLUTION, fingerprint=None, chunk_size=100000):
+        """Bake a raster by evaluating ``point_metrics(coords)`` at every cell centre.
+
+        ``point_metrics`` must return one array per name in RASTER_LAYERS; it is
+        typically a closure over compute_raster_metrics and the exact spatial
+        indexes, so each cell holds the exact value at its centre.
+        """
+        n_rows, n_cols = cls.grid_shape(bounds, resolution)
+        lat_centers = bounds['min_lat'] + (np.arange(n_rows) + 0.5) * resolution
+        lon_centers = bounds['min_lon'] + (np.arange(n_cols) + 0.5) * resolution
+        grid = np.empty((len(RASTER_LAYERS), n_rows * n_cols), dtype=np.float32)
+
+        for start in range(0, n_rows * n_cols, chunk_size):
+            cells = np.arange(start, min(start + chunk_size, n_rows * n_cols))
+            coords = np.column_stack([lat_centers[cells // n_cols], lon_centers[cells % n_cols]])
+            metrics = point_metrics(coords)
+            for i, name in enumerate(RASTER_LAYERS):
+                grid[i, cells] = metrics[name]
+
+        return cls(grid.reshape(len(RASTER_LAYERS), n_rows, n_cols), bounds, resolution,
+                   fingerprint=fingerprint)
+
+    def save(self, path):
+        """Write ``<path>.npy`` (the grid stack) and ``<path>.json`` (metadata)"""
+        base = os.path.splitext(path)[0]
+        # Write then rename, so a worker loading the raster never maps a half-written
+        # grid; the metadata goes last and load() checks the grid shape against it
+        with open(base + '.npy.tmp', 'wb') as f:
+            np.save(f, np.ascontiguousarray(self.grid, dtype=np.float32))
+        os.replace(base + '.npy.tmp', base + '.npy')
+        with open(base + '.json.tmp', 'w', encoding='utf-8') as f:
+            json.dump({
+                'bounds': self.bounds,
+                'resolution': self.resolution,
+                'layers': list(self.layers),
+                'fingerprint': self.fingerprint,
+            }, f, indent=2)
+        os.replace(base + '.json.tmp', base + '.json')
+
+    @classmethod
+    def load(cls, path, fingerprint=None):
+        """Memory-map a saved raster; returns None if missing or built from other data"""
+        base = os.path.splitext(path)[0]
+        if not (os.path.exists(base + '.npy') and os.path.exists(base + '.json')):
+            return None
+        with open(base + '.json', 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+        if fingerprint and meta.get('fingerprint') != fingerprint:
+            print(f"⚠️ Safety raster {base}.npy is stale (dataset changed); rebuild it with build_safety_raster.py")
+            return None
+        grid = np.load(base + '.npy', mmap_mode='r')
+        if grid.shape != (len(meta['layers']),) + cls.grid_shape(meta['bounds'], meta['resolution']):
+            print(f"⚠️ Safety raster {base}.npy does not match its metadata; rebuild it with build_safety_raster.py")
+            return None
+        return cls(grid, meta['bounds'], meta['resolution'], meta['layers'], meta.get('fingerprint'))
+
+    def contains(self, lats, lons):
+        b = self.bounds
+        return ((lats >= b['min_lat']) & (lats < b['max_lat']) &
+                (lons >= b['min_lon']) & (lons < b['max_lon']))
+
+    def cell_ids(self, lats, lons):
+        rows = np.floor((lats - self.bounds['min_lat']) / self.resolution).astype(np.int64)
+        cols = np.floor((lons - self.bounds['min_lon']) / self.resolution).astype(np.int64)
+        return np.clip(rows, 0, self.n_rows - 1), np.clip(cols, 0, self.n_cols - 1)
+
+    def has_layer(self, name):
+        return name in self._layer_pos
+
+    def layer(self, name):
+        return self.grid[self._layer_pos[name]]
+
+    def point_metrics(self, lats, lons, time_bucket=None):
+        """O(1) per point: same keys/dtypes as compute_point_metrics"""
+        rows, cols = self.cell_ids(lats, lons)
+
+        def _values(name):
+            return self.grid[self._layer_pos[name], rows, cols]
+
+        if time_bucket:
+            crime = _values(f'crime_{time_bucket}').astype(np.float64)
+        else:
+            crime = _values('crime').astype(np.int64)
+        return {
+            'crime': crime,
+            'lighting': _values('lighting').astype(np.float64),
+            'population': _values('population').astype(np.float64),
+            'traffic': _values('traffic').astype(np.float64),
+            'main_road': _values('main_road') > 0.5,
+        }
@@ -50,4 +50,94 @@ function haversineDistance(lat1, lon1, lat2, lon2) {
         Math.cos(lat1 * Math.PI / 180) * Math.cos(lat2 * Math.PI / 180) * 
         Math.sin(dLon/2) * Math.sin(dLon/2);
     return 2 * R * Math.asin(Math.sqrt(a));
-}
\ No newline at end of file
+}
+
+// Decodes a Google encoded-polyline string (as sent with geometry_format: 'polyline')
+// into [[lat, lon], ...]; precision is 5 for 'polyline' and 6 for 'polyline6'
+function decodePolyline(encoded, precision = 5) {
+    const factor = Math.pow(10, precision);
+    const points = [];
+    let index = 0, lat = 0, lon = 0;
+
+    while (index < encoded.length) {
+        const deltas = [0, 0];
+        for (let i = 0; i < 2; i++) {
+            let result = 0, shift = 0, byte;
+            do {
+                byte = encoded.charCodeAt(index++) - 63;
+                result |= (byte & 0x1f) << shift;
+                shift += 5;
+            } while (byte >= 0x20);
+            deltas[i] = (result & 1) ? ~(result >> 1) : (result >> 1);
+        }
+        lat += deltas[0];
+        lon += deltas[1];
+        points.push([lat / factor, lon / factor]);
+    }
+    return points;
+}
+
+// Restores routeData.route from the compact 'polyline' field when present
+function decodeRouteGeometry(routeData, geometryFormat) {
+    if (routeData && routeData.polyline !== undefined && !routeData.route) {
+        routeData.route = decodePolyline(routeData.polyline, geometryFormat === 'polyline6' ? 6 : 5);
+    }
+    return routeData;
+}
+
+// Colour of a safety_profile level (0 = least safe .. 10 = safest), red through green
+function safetyLevelColor(level) {
+    return `hsl(${Math.max(0, Math.min(10, level)) * 12}, 80%, 45%)`;
+}
+
+// Splits routeData.route into [{level, points}] pieces following routeData.safety_profile,
+// whose runs each cover count * spacing_m metres along the line
+function safetyProfileSegments(routeData) {
+    const profile = routeData && routeData.safety_profile;
+    const route = routeData && routeData.route;
+    if (!profile || !profile.spacing_m || !profile.runs.length || !route || route.length < 2) return [];
+
+    const segments = [];
+    let pointIndex = 0;
+    let distance = 0; // metres from the start to route[pointIndex]
+    let end = 0;
+    let points = [route[0]];
+    profile.runs.forEach(([level, count], runIndex) => {
+        const last = runIndex === profile.runs.length - 1;
+        end += count * profile.spacing_m;
+        while (pointIndex < route.length - 1) {
+            const a = route[pointIndex];
+            const b = route[pointIndex + 1];
+            const edge = haversineDistance(a[0], a[1], b[0], b[1]) * 1000;
+            if (!last && distance + edge > end) {
+                // The run ends mid-edge: cut the edge there and start the next run from the cut
+                const t = edge > 0 ? (end - distance) / edge : 0;
+                const cut = [a[0] + (b[0] - a[0]) * t, a[1] + (b[1] - a[1]) * t];
+                points.push(cut);
+                segments.push({ level, points });
+                points = [cut];
+                return;
+            }
+            distance += edge;
+            pointIndex++;
+            points.push(b);
+        }
+        if (points.length > 1) segments.push({ level, points });
+        points = [route[route.length - 1]];
+    });
+    return segments;
+}
+
+// Inline SVG bar of a safety_profile, each run as wide as the share of the route it covers
+function safetyProfileStrip(profile, width = 200, height = 8) {
+    if (!profile || !profile.runs || !profile.runs.length) return '';
+    const total = profile.runs.reduce((sum, [, count]) => sum + count, 0);
+    let x = 0;
+    const rects = profile.runs.map(([level, count]) => {
+        const w = count / total * width;
+        const rect = `<rect x="${x.toFixed(2)}" y="0" width="${w.toFixed(2)}" height="${height}" fill="${safetyLevelColor(level)}"/>`;
+        x += w;
+        return rect;
+    }).join('');
+    return `<svg width="${width}" height="${height}" style="vertical-align: middle; border-radius: 4px;">${rects}</svg>`;
+}
@@ -0,0 +1,99 @@
+import os
+from math import sqrt
+
+import numpy as np
+
+from app.route_optimizer import haversine_km, score_routes_batch
+
+# crime_aware (default): a few waypoints whose detours score safest;
+# fixed: the original perpendicular offsets at 25/50/75% of the straight line
+WAYPOINT_STRATEGY = os.environ.get('WAYPOINT_STRATEGY', 'crime_aware').lower()
+
+MAX_DETOUR_RATIO = 1.8
+
+# Candidate lattice for crime_aware: fractions along the straight line x sideways offsets
+CORRIDOR_POSITIONS = (0.2, 0.35, 0.5, 0.65, 0.8)
+CORRIDOR_OFFSETS_KM = (-2.5, -1.8, -1.2, -0.8, -0.4, 0.4, 0.8, 1.2, 1.8, 2.5)
+MAX_CRIME_AWARE_WAYPOINTS = int(os.environ.get('MAX_CRIME_AWARE_WAYPOINTS', 6))
+# Picked waypoints are at least this far apart, so they lead to different routes
+MIN_WAYPOINT_SEPARATION_KM = 0.8
+# Ranking score lost per 100% of extra straight-line distance through a waypoint
+DETOUR_PENALTY = 10.0
+
+
+def _corridor_frame(start_lat, start_lon, end_lat, end_lon):
+    lat_diff = end_lat - start_lat
+    lon_diff = end_lon - start_lon
+    perp_lat, perp_lon = -lon_diff, lat_diff
+    perp_magnitude = sqrt(perp_lat ** 2 + perp_lon ** 2)
+    if perp_magnitude > 0:
+        perp_lat /= perp_magnitude
+        perp_lon /= perp_magnitude
+    return lat_diff, lon_diff, perp_lat, perp_lon
+
+
+def _detour_ratios(start_lat, start_lon, end_lat, end_lon, lats, lons):
+    base_distance = haversine_km(start_lat, start_lon, end_lat, end_lon)
+    via = haversine_km(start_lat, start_lon, lats, lons) + haversine_km(lats, lons, end_lat, end_lon)
+    return via / base_distance if base_distance > 0 else np.full(len(lats), 999.0)
+
+
+def fixed_waypoints(start_lat, start_lon, end_lat, end_lon, city):
+    """Perpendicular offsets of 0.5/1.2/2.5 km at 25/50/75% of the way (up to 18 waypoints)"""
+    lat_diff, lon_diff, perp_lat, perp_lon = _corridor_frame(start_lat, start_lon, end_lat, end_lon)
+    waypoints = []
+    for position in (0.25, 0.5, 0.75):
+        for offset in (d / 111.0 for d in (0.5, 1.2, 2.5)):
+            for direction in (1, -1):
+                wp_lat = start_lat + lat_diff * position + perp_lat * offset * direction
+                wp_lon = start_lon + lon_diff * position + perp_lon * offset * direction
+                if not city.contains(wp_lat, wp_lon):
+                    continue
+                ratio = _detour_ratios(start_lat, start_lon, end_lat, end_lon,
+                                       np.array([wp_lat]), np.array([wp_lon]))[0]
+                if ratio > MAX_DETOUR_RATIO:
+                    continue
+                waypoints.append({'lat': wp_lat, 'lon': wp_lon})
+    return waypoints
+
+
+def crime_aware_waypoints(start_lat, start_lon, end_lat, end_lon, city, dataset, preferences=None,
+                          live_crime_index=None, max_waypoints=MAX_CRIME_AWARE_WAYPOINTS):
+    """A few waypoints whose detours run through the safest parts of the corridor.
+
+    Every point of a lattice along and beside the straight line is rated by the
+    route safety score of the straight ``start -> waypoint -> end`` polyline (the
+    same batch scoring the OSRM routes get, with the request's preferences and
+    departure-time bucket), as a proxy for the roads OSRM will follow. The best
+    ones at least MIN_WAYPOINT_SEPARATION_KM apart are kept, so detours through
+    hotspots never cost an OSRM call.
+    """
+    preferences = preferences or {}
+    lat_diff, lon_diff, perp_lat, perp_lon = _corridor_frame(start_lat, start_lon, end_lat, end_lon)
+    positions, offsets = np.meshgrid(CORRIDOR_POSITIONS, np.array(CORRIDOR_OFFSETS_KM) / 111.0, indexing='ij')
+    lats = (start_lat + lat_diff * positions + perp_lat * offsets).ravel()
+    lons = (start_lon + lon_diff * positions + perp_lon * offsets).ravel()
+
+    inside = np.array([city.contains(lat, lon) for lat, lon in zip(lats, lons)], dtype=bool)
+    detours = _detour_ratios(start_lat, start_lon, end_lat, end_lon, lats, lons)
+    keep = inside & (detours <= MAX_DETOUR_RATIO)
+    if not keep.any():
+        return []
+    lats, lons, detours = lats[keep], lons[keep], detours[keep]
+
+    polylines = [[[start_lat, start_lon], [lat, lon], [end_lat, end_lon]] for lat, lon in zip(lats, lons)]
+    scored = score_routes_batch(polylines, dataset.crime_index, dataset.lighting_index, dataset.population_index,
+                                preferences, dataset.raster, live_crime_index, dataset.crime_surface)
+    safety = np.array([result['safety_score'] if result else 0.0 for result in scored])
+    ranking = safety - DETOUR_PENALTY * (detours - 1)
+
+    waypoints = []
+    for i in np.argsort(-ranking, kind='stable'):
+        if len(waypoints) >= max_waypoints:
+            break
+        too_close = any(haversine_km(lats[i], lons[i], wp['lat'], wp['lon']) < MIN_WAYPOINT_SEPARATION_KM
+                        for wp in waypoints)
+        if too_close:
+            continue
+        waypoints.append({'lat': float(lats[i]), 'lon': float(lons[i])})
+    return waypoints
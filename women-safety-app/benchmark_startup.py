@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""Compare safety data cold-start time from the CSVs and from the binary artifact.
+
+Usage: python benchmark_startup.py [--city bangalore] [--runs 5]
+
+Each run loads the city's SafetyDataset in a fresh interpreter (as a new worker
+would) and reports the median wall time per source. Build the artifact first
+with build_safety_artifact.py.
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+from app.cities import CITIES, DATA_DIR, DEFAULT_CITY
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+# Run in a child interpreter; prints the load time in seconds
+LOAD_SNIPPET = '''
+import contextlib, io, sys, time
+from app.cities import CITIES
+from app.safety_engine import SafetyDataset
+city = CITIES[sys.argv[1]]
+started = time.perf_counter()
+with contextlib.redirect_stdout(io.StringIO()):
+    SafetyDataset.load(city, prefer_artifact=sys.argv[2] == 'artifact')
+print(time.perf_counter() - started)
+'''
+
+
+def time_load(city, source):
+    result = subprocess.run([sys.executable, '-c', LOAD_SNIPPET, city.slug, source],
+                            cwd=ROOT, capture_output=True, text=True, check=True)
+    return float(result.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--city', default=DEFAULT_CITY, choices=sorted(CITIES))
+    parser.add_argument('--runs', type=int, default=5)
+    args = parser.parse_args()
+    city = CITIES[args.city]
+
+    if not os.path.exists(os.path.join(DATA_DIR, city.artifact_file)):
+        sys.exit(f"❌ {city.artifact_file} not found; run: python build_safety_artifact.py --city {city.slug}")
+
+    results = {}
+    for source in ('csv', 'artifact'):
+        times = [time_load(city, source) for _ in range(args.runs)]
+        results[source] = statistics.median(times)
+        print(f"{source:>8}: median {results[source] * 1000:7.1f} ms "
+              f"(min {min(times) * 1000:.1f}, max {max(times) * 1000:.1f}, {args.runs} runs)")
+    print(f"⚡ Artifact load is {results['csv'] / results['artifact']:.1f}x faster")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""Convert an OpenStreetMap XML extract into a compact road graph for in-process routing.
+
+Usage: python build_road_graph.py extract.osm [--city bangalore]
+
+Keeps the drivable highways inside the city's bounds (respecting one-way
+streets), drops everything outside the largest connected network and writes
+the CSR adjacency arrays to the city's road graph file, e.g.
+app/data/bangalore_road_graph.npz. Safety costs are attached per edge when the
+app loads the graph, so the file stays valid when the safety CSVs change.
+
+Export an extract from https://www.openstreetmap.org/export or convert a
+.pbf with `osmium cat city.osm.pbf -o city.osm`.
+"""
+
+import argparse
+import os
+import time
+import xml.etree.ElementTree as ET
+
+import numpy as np
+
+from app.cities import CITIES, DATA_DIR, DEFAULT_CITY
+from app.road_graph import DEFAULT_SPEED_KMH, ROAD_SPEEDS_KMH, RoadGraph
+
+ONEWAY_FORWARD = ('yes', 'true', '1')
+
+
+def parse_osm(path):
+    """(node coordinates by OSM id, drivable ways as (node ids, tags)) from an OSM XML file"""
+    nodes, ways = {}, []
+    for _, elem in ET.iterparse(path, events=('end',)):
+        if elem.tag == 'node':
+            nodes[elem.get('id')] = (float(elem.get('lat')), float(elem.get('lon')))
+            elem.clear()
+        elif elem.tag == 'way':
+            tags = {tag.get('k'): tag.get('v') for tag in elem.iter('tag')}
+            if tags.get('highway') in ROAD_SPEEDS_KMH and tags.get('access') not in ('no', 'private'):
+                ways.append(([nd.get('ref') for nd in elem.iter('nd')], tags))
+            elem.clear()
+    return nodes, ways
+
+
+def _largest_component(n_nodes, sources, targets):
+    # Union-find over the undirected edges
+    parent = list(range(n_nodes))
+
+    def find(x):
+        while parent[x] != x:
+            parent[x] = parent[parent[x]]
+            x = parent[x]
+        return x
+
+    for u, v in zip(sources.tolist(), targets.tolist()):
+        ru, rv = find(u), find(v)
+        if ru != rv:
+            parent[ru] = rv
+    roots = np.array([find(x) for x in range(n_nodes)])
+    return roots == np.bincount(roots).argmax()
+
+
+def build_graph(nodes, ways, bounds):
+    min_lat, max_lat, min_lon, max_lon = bounds['min_lat'], bounds['max_lat'], bounds['min_lon'], bounds['max_lon']
+    node_ids, names = {}, {}
+    sources, targets, speeds, name_codes = [], [], [], []
+
+    def node_index(osm_id):
+        if osm_id not in node_ids:
+            node_ids[osm_id] = len(node_ids)
+        return node_ids[osm_id]
+
+    for refs, tags in ways:
+        highway = tags['highway']
+        maxspeed = tags.get('maxspeed', '')
+        speed = float(maxspeed) if maxspeed.isdigit() else ROAD_SPEEDS_KMH.get(highway, DEFAULT_SPEED_KMH)
+        oneway = tags.get('oneway')
+        forward = oneway != '-1'
+        backward = oneway == '-1' or not (
+            oneway in ONEWAY_FORWARD or tags.get('junction') == 'roundabout' or highway == 'motorway'
+        )
+        name = tags.get('name')
+        code = names.setdefault(name, len(names)) if name else -1
+
+        for a, b in zip(refs, refs[1:]):
+            if a not in nodes or b not in nodes:
+                continue
+            (lat_a, lon_a), (lat_b, lon_b) = nodes[a], nodes[b]
+            if not (min_lat <= lat_a <= max_lat and min_lon <= lon_a <= max_lon and
+                    min_lat <= lat_b <= max_lat and min_lon <= lon_b <= max_lon):
+                continue
+            u, v = node_index(a), node_index(b)
+            for src, dst, keep in ((u, v, forward), (v, u, backward)):
+                if keep:
+                    sources.append(src)
+                    targets.append(dst)
+                    speeds.append(speed)
+                    name_codes.append(code)
+
+    if not sources:
+        raise ValueError("No drivable roads inside the city bounds")
+    coords = np.array([nodes[osm_id] for osm_id in node_ids], dtype=np.float64)
+    sources, targets = np.array(sources, dtype=np.int64), np.array(targets, dtype=np.int64)
+    speeds, name_codes = np.array(speeds, dtype=np.float32), np.array(name_codes, dtype=np.int32)
+
+    # Keep only the largest connected network, so every snapped endpoint can reach the others
+    keep = _largest_component(len(coords), sources, targets)
+    remap = np.cumsum(keep) - 1
+    edge_keep = keep[sources]
+    return RoadGraph.from_edges(
+        coords[keep, 0], coords[keep, 1], remap[sources[edge_keep]], remap[targets[edge_keep]],
+        speeds[edge_keep], name_codes[edge_keep], names=sorted(names, key=names.get)
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('osm_file', help='OpenStreetMap XML extract (.osm)')
+    parser.add_argument('--city', default=DEFAULT_CITY, choices=sorted(CITIES),
+                        help='city whose bounds and output file to use (default: %(default)s)')
+    parser.add_argument('--data-dir', default=DATA_DIR)
+    args = parser.parse_args()
+    city = CITIES[args.city]
+
+    started = time.perf_counter()
+    nodes, ways = parse_osm(args.osm_file)
+    print(f"Parsed {len(nodes)} nodes and {len(ways)} drivable ways in {time.perf_counter() - started:.1f}s")
+    graph = build_graph(nodes, ways, city.bounds)
+
+    out_path = os.path.join(args.data_dir, city.road_graph_file)
+    graph.save(out_path)
+    size_mb = os.path.getsize(out_path) / (1024 * 1024)
+    print(f"✅ {city.name}: {graph.n_nodes} nodes, {graph.n_edges} edges "
+          f"in {time.perf_counter() - started:.1f}s")
+    print(f"📄 {out_path} ({size_mb:.1f} MB)")
+
+
+if __name__ == '__main__':
+    main()
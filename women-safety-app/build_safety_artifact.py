@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+"""Convert a city's safety CSVs into a binary artifact for fast worker start-up.
+
+Usage: python build_safety_artifact.py [--city bangalore]
+
+Writes the city's artifact file, e.g. app/data/bangalore_safety_data.npz, holding
+the columnar tables, the prebuilt spatial indexes and the crime density surface
+plus a fingerprint of the source CSVs. The app loads it instead of parsing the
+CSVs and ignores it automatically if the CSVs change after it was built.
+"""
+
+import argparse
+import os
+import time
+
+from app.cities import CITIES, DATA_DIR, DEFAULT_CITY
+from app.crime_density import build_crime_surface
+from app.route_optimizer import build_safety_indexes
+from app.safety_artifact import save_safety_artifact
+from app.safety_data import SafetyTable
+from app.safety_raster import dataset_fingerprint
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--city', default=DEFAULT_CITY, choices=sorted(CITIES),
+                        help='city to convert (default: %(default)s)')
+    parser.add_argument('--data-dir', default=DATA_DIR)
+    parser.add_argument('--no-crime-surface', action='store_true',
+                        help='leave the crime density surface out (it is then built at start-up)')
+    args = parser.parse_args()
+    city = CITIES[args.city]
+
+    started = time.perf_counter()
+    paths = [os.path.join(args.data_dir, f) for f in city.data_files]
+    tables = tuple(SafetyTable.from_csv(p) for p in paths)
+    indexes = build_safety_indexes(*tables)
+    crime_surface = None if args.no_crime_surface else build_crime_surface(tables[0], city.bounds)
+
+    out_path = os.path.join(args.data_dir, city.artifact_file)
+    save_safety_artifact(out_path, tables, indexes, fingerprint=dataset_fingerprint(paths),
+                         crime_surface=crime_surface)
+
+    size_mb = os.path.getsize(out_path) / (1024 * 1024)
+    print(f"✅ {city.name}: {', '.join(str(len(t)) for t in tables)} crime/lighting/population rows "
+          f"in {time.perf_counter() - started:.1f}s")
+    print(f"📄 {out_path} ({size_mb:.1f} MB)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+"""Bake a city's safety datasets into a memory-mapped raster for O(1) route scoring.
+
+Usage: python build_safety_raster.py [--city bangalore] [--resolution 0.0005]
+
+Writes the city's raster file, e.g. app/data/bangalore_safety_raster.npy (float32 layer stack) and a .json
+sidecar with bounds/resolution/layers and a fingerprint of the source CSVs. The
+app ignores the raster automatically if the CSVs change after it was built.
+"""
+
+import argparse
+import os
+import time
+
+from app.cities import CITIES, DATA_DIR, DEFAULT_CITY
+from app.route_optimizer import build_safety_indexes, compute_raster_metrics
+from app.safety_data import SafetyTable
+from app.safety_raster import DEFAULT_RESOLUTION, SafetyRaster, dataset_fingerprint
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--city', default=DEFAULT_CITY, choices=sorted(CITIES),
+                        help='city to build (default: %(default)s)')
+    parser.add_argument('--resolution', type=float, default=DEFAULT_RESOLUTION,
+                        help='cell size in degrees (default: %(default)s)')
+    parser.add_argument('--data-dir', default=DATA_DIR)
+    args = parser.parse_args()
+    city = CITIES[args.city]
+
+    paths = [os.path.join(args.data_dir, f) for f in city.data_files]
+    crime_data, lighting_data, population_data = (SafetyTable.from_csv(p) for p in paths)
+    indexes = build_safety_indexes(crime_data, lighting_data, population_data)
+
+    print(f"Building {city.name} safety raster at {args.resolution}° resolution...")
+    started = time.perf_counter()
+    raster = SafetyRaster.build(
+        lambda coords: compute_raster_metrics(coords, *indexes),
+        city.bounds,
+        resolution=args.resolution,
+        fingerprint=dataset_fingerprint(paths)
+    )
+    out_path = os.path.join(args.data_dir, city.raster_file)
+    raster.save(out_path)
+
+    size_mb = os.path.getsize(out_path) / (1024 * 1024)
+    print(f"✅ {raster.n_rows}x{raster.n_cols} cells x {len(raster.layers)} layers "
+          f"in {time.perf_counter() - started:.1f}s")
+    print(f"📄 {out_path} ({size_mb:.1f} MB)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,56 @@
+import pytest
+
+import app.safety_engine as engine
+from app.live_incidents import LiveIncidentStore
+
+INCIDENTS = [{'lat': 12.9716, 'lon': 77.5946, 'time': '22:30'}, {'lat': 12.9352, 'lon': 77.6245}]
+
+
+@pytest.fixture
+def live_store(tmp_path, monkeypatch):
+    """An empty store and live index, so the tests never touch app/data"""
+    store = LiveIncidentStore(str(tmp_path / 'live_incidents.jsonl'))
+    monkeypatch.setattr(engine, 'live_incident_store', store)
+    monkeypatch.setattr(engine, '_live_position', (None, 0))
+    monkeypatch.setattr(engine, '_live_resync', False)
+    engine.live_crime_index.reset([], [], engine.crime_time_weight_columns([]))
+    yield store
+    engine.live_crime_index.reset([], [], engine.crime_time_weight_columns([]))
+
+
+def test_persisted_incidents_are_indexed(live_store):
+    assert engine.ingest_incidents(INCIDENTS) == 2
+    assert len(engine.live_crime_index) == 2
+    assert len(live_store.read_from(None, 0)[0]) == 2
+
+
+def test_failed_read_back_still_indexes_the_accepted_incidents(live_store, monkeypatch):
+    read_from, readable = live_store.read_from, []
+
+    def flaky_read_from(*args):
+        if not readable:
+            raise OSError('read failed')
+        return read_from(*args)
+
+    monkeypatch.setattr(live_store, 'read_from', flaky_read_from)
+    assert engine.ingest_incidents(INCIDENTS) == 2
+    assert len(engine.live_crime_index) == 2
+
+    # Once the store is readable again it rebuilds the index instead of adding them twice
+    readable.append(True)
+    assert engine.poll_live_incidents(force=True) == 2
+    assert len(engine.live_crime_index) == 2
+
+
+def test_failed_append_indexes_locally(live_store, monkeypatch):
+    def unwritable(records):
+        raise OSError('disk full')
+
+    monkeypatch.setattr(live_store, 'append', unwritable)
+    assert engine.ingest_incidents(INCIDENTS) == 2
+    assert len(engine.live_crime_index) == 2
+
+
+def test_invalid_coordinates_are_not_accepted(live_store):
+    assert engine.ingest_incidents([{'lat': None, 'lon': 77.5}, {'lat': 95, 'lon': 77.5}]) == 0
+    assert len(engine.live_crime_index) == 0
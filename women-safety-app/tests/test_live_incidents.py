@@ -0,0 +1,58 @@
+import json
+import os
+
+from app.live_incidents import LiveIncidentStore
+
+
+def _records(start, n):
+    return [{'lat': 12.9, 'lon': 77.5, 'n': i} for i in range(start, start + n)]
+
+
+def test_read_from_returns_only_new_records(tmp_path):
+    store = LiveIncidentStore(str(tmp_path / 'live.jsonl'))
+    store.append(_records(0, 3))
+    records, inode, offset, restarted = store.read_from(None, 0)
+    assert [r['n'] for r in records] == [0, 1, 2]
+    assert not restarted
+
+    store.append(_records(3, 2))
+    records, inode, offset, restarted = store.read_from(inode, offset)
+    assert [r['n'] for r in records] == [3, 4]
+    assert not restarted
+    assert store.read_from(inode, offset)[0] == []
+
+
+def test_torn_line_is_left_unread_and_never_swallows_the_next_append(tmp_path):
+    path = tmp_path / 'live.jsonl'
+    store = LiveIncidentStore(str(path))
+    store.append(_records(0, 1))
+    with open(path, 'a', encoding='utf-8') as f:
+        f.write('{"lat": 12.9, "lo')  # crash mid-append
+    records, inode, offset, _ = store.read_from(None, 0)
+    assert [r['n'] for r in records] == [0]
+
+    store.append(_records(1, 1))
+    records, _, _, _ = store.read_from(inode, offset)
+    assert [r['n'] for r in records] == [1]
+
+
+def test_compaction_keeps_the_newest_entries_and_restarts_readers(tmp_path):
+    store = LiveIncidentStore(str(tmp_path / 'live.jsonl'), max_entries=10)
+    store.append(_records(0, 5))
+    _, inode, offset, _ = store.read_from(None, 0)
+
+    store.append(_records(5, 20))
+    records, _, _, restarted = store.read_from(inode, offset)
+    assert restarted
+    assert [r['n'] for r in records] == list(range(15, 25))
+
+
+def test_migrate_legacy_moves_the_json_array(tmp_path):
+    legacy = tmp_path / 'live.json'
+    legacy.write_text(json.dumps(_records(0, 3)), encoding='utf-8')
+    store = LiveIncidentStore(str(tmp_path / 'live.jsonl'), legacy_path=str(legacy))
+
+    assert store.migrate_legacy() == 3
+    assert not os.path.exists(legacy)
+    assert [r['n'] for r in store.read_from(None, 0)[0]] == [0, 1, 2]
+    assert store.migrate_legacy() == 0
@@ -0,0 +1,51 @@
+import time
+
+import app.osrm as osrm
+
+WAYPOINTS = [None, {'lat': 12.95, 'lon': 77.6}, {'lat': 12.96, 'lon': 77.61}]
+
+
+def _fake_osrm(delays, fail_at_deadline=False):
+    """get_route_from_osrm stand-in answering after ``delays[waypoint lat]``"""
+    def fetch(start_lat, start_lon, end_lat, end_lon, waypoint=None, timeout=None, service=None):
+        delay = delays.get(waypoint['lat'] if waypoint else None, 0)
+        if fail_at_deadline:
+            # Like a real request whose deadline-capped read timeout fires
+            read_timeout = timeout[1]
+            if delay >= read_timeout:
+                time.sleep(read_timeout)
+                return None
+        time.sleep(delay)
+        return [{'route': [[start_lat, start_lon], [end_lat, end_lon]], 'waypoint': waypoint}]
+    return fetch
+
+
+def test_results_are_aligned_with_waypoints(monkeypatch):
+    monkeypatch.setattr(osrm, 'get_route_from_osrm', _fake_osrm({None: 0.05, 12.95: 0.0, 12.96: 0.02}))
+    results, skipped = osrm.fetch_routes_concurrently(12.97, 77.59, 12.93, 77.62, WAYPOINTS, deadline=2)
+    assert skipped == []
+    assert [r[0]['waypoint'] for r in results] == WAYPOINTS
+
+
+def test_requests_unfinished_at_the_deadline_are_skipped(monkeypatch):
+    monkeypatch.setattr(osrm, 'get_route_from_osrm', _fake_osrm({12.95: 1.0, 12.96: 1.0}))
+    started = time.monotonic()
+    results, skipped = osrm.fetch_routes_concurrently(12.97, 77.59, 12.93, 77.62, WAYPOINTS, deadline=0.3)
+    assert time.monotonic() - started < 0.9
+    assert results[0] is not None
+    assert skipped == [1, 2]
+
+
+def test_requests_cut_off_by_the_capped_timeout_count_as_skipped(monkeypatch):
+    monkeypatch.setattr(osrm, 'get_route_from_osrm', _fake_osrm({None: 1.0, 12.95: 1.0, 12.96: 1.0},
+                                                                fail_at_deadline=True))
+    results, skipped = osrm.fetch_routes_concurrently(12.97, 77.59, 12.93, 77.62, WAYPOINTS, deadline=0.3)
+    assert results == [None, None, None]
+    assert skipped == [0, 1, 2]
+
+
+def test_failures_before_the_deadline_are_not_skipped(monkeypatch):
+    monkeypatch.setattr(osrm, 'get_route_from_osrm', lambda *args, **kwargs: None)
+    results, skipped = osrm.fetch_routes_concurrently(12.97, 77.59, 12.93, 77.62, WAYPOINTS, deadline=2)
+    assert results == [None, None, None]
+    assert skipped == []
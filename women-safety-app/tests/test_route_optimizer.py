@@ -0,0 +1,13 @@
+from app.route_optimizer import encode_safety_profile
+
+
+def test_safety_profile_has_one_level_per_segment():
+    # 5 samples -> 4 segments scored by the mean of their end points
+    profile = encode_safety_profile([95, 85, 25, 15, 15], spacing_m=50)
+    assert profile == {'spacing_m': 50.0, 'runs': [[9, 1], [5, 1], [2, 1], [1, 1]]}
+    assert sum(count for _, count in profile['runs']) == 4
+
+
+def test_single_sample_route_has_no_segments():
+    assert encode_safety_profile([80], spacing_m=50)['runs'] == []
+    assert encode_safety_profile([], spacing_m=50)['runs'] == []
@@ -0,0 +1,78 @@
+import numpy as np
+
+from app.safety_index import SafetyIndex
+
+
+def _points(n=2000, seed=0):
+    rng = np.random.default_rng(seed)
+    lats = 12.85 + rng.random(n) * 0.2
+    lons = 77.5 + rng.random(n) * 0.2
+    return lats, lons, rng.random(n) * 10
+
+
+def _brute_force(lats, lons, values, q_lat, q_lon, radius):
+    inside = (np.abs(lats - q_lat) < radius) & (np.abs(lons - q_lon) < radius)
+    return inside.sum(), values[inside].sum()
+
+
+def test_aggregate_matches_brute_force_windows():
+    lats, lons, values = _points()
+    index = SafetyIndex(lats, lons, {'score': values}, cell_size=0.005)
+    q_lat, q_lon = np.array([12.9, 12.95, 13.0, 12.0]), np.array([77.55, 77.6, 77.65, 77.0])
+    counts, sums = index.aggregate(q_lat, q_lon, 0.005, ('score',))
+    for i in range(len(q_lat)):
+        count, total = _brute_force(lats, lons, values, q_lat[i], q_lon[i], 0.005)
+        assert counts[i] == count
+        assert np.isclose(sums['score'][i], total)
+
+
+def test_insert_is_visible_before_and_after_compaction():
+    lats, lons, values = _points(500)
+    index = SafetyIndex(lats, lons, {'score': values}, cell_size=0.005, compact_threshold=4)
+    before = index.count([12.9], [77.55], 0.005)[0]
+
+    index.insert([12.9, 12.9001], [77.55, 77.5501], {'score': [1.0, 2.0]})
+    assert index.count([12.9], [77.55], 0.005)[0] == before + 2
+    assert len(index._state.delta_lats) == 2
+
+    index.insert([12.9, 12.9], [77.55, 77.55], {'score': 3.0})
+    assert len(index._state.delta_lats) == 0  # folded into the grid
+    assert index.count([12.9], [77.55], 0.005)[0] == before + 4
+    assert len(index) == 504
+
+
+def test_reset_replaces_points_and_bumps_version():
+    lats, lons, values = _points(100)
+    index = SafetyIndex(lats, lons, {'score': values})
+    version = index.version
+    index.reset([12.9], [77.55], {'score': [5.0]})
+    assert len(index) == 1
+    assert index.version == version + 1
+    assert index.mean('score', [12.9], [77.55], 0.001)[0] == 5.0
+
+
+def test_to_arrays_with_sources_stores_grid_order_only():
+    lats, lons, values = _points(300)
+    lats[7] = np.nan  # dropped from the index
+    index = SafetyIndex(lats, lons, {'score': values}, cell_size=0.005)
+    sources = {'lats': lats, 'lons': lons, 'score': values}
+
+    meta, arrays = index.to_arrays(sources)
+    assert sorted(meta['shared']) == ['lats', 'lons', 'score']
+    assert sorted(arrays) == ['offsets', 'rows']
+
+    restored = SafetyIndex.from_arrays(meta, arrays, sources)
+    for name in ('lats', 'lons', 'offsets'):
+        assert np.array_equal(getattr(restored._state, name), getattr(index._state, name))
+    assert np.array_equal(restored._state.columns['score'], index._state.columns['score'])
+
+
+def test_to_arrays_keeps_points_the_sources_do_not_reproduce():
+    lats, lons, values = _points(300)
+    index = SafetyIndex(lats, lons, {'score': values}, cell_size=0.005)
+    index.insert([12.9], [77.55], {'score': [1.0]})
+
+    meta, arrays = index.to_arrays({'lats': lats, 'lons': lons, 'score': values})
+    assert 'shared' not in meta
+    restored = SafetyIndex.from_arrays(meta, arrays)
+    assert len(restored) == len(index)